@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# audit_ids.py ---
+#
+# Check the programmed project ID and product ID of many project trees
+# at once.  Each tree is laid out as expected by set_project_id.py
+# (mag/, verilog/ and optionally info.yaml).  For every tree, the ID
+# values are read back from the ROM layouts, the ID text block and the
+# RTL top level (as in "set_ids.py -decode") and compared with each
+# other and with the values in info.yaml.
+#
+# The arguments are project trees, or directories to search for project
+# trees.  The trees are divided among a pool of worker processes, and
+# one JSON record per tree is written to the output as each result is
+# available.  The exit status is 1 if any tree is inconsistent.
+#----------------------------------------------------------------------
+
+import os
+import sys
+import json
+import concurrent.futures
+
+import id_rom
+
+def usage():
+    print("Usage:")
+    print("audit_ids.py [-jobs=<n>] <path> [<path> ...]")
+    print("")
+    print("where:")
+    print("    <path> is a project tree or a directory containing project trees.")
+    print("    <n> is the number of worker processes (default is one per CPU).")
+    return 0
+
+def is_project_tree(path):
+    return os.path.isdir(os.path.join(path, 'mag')) and \
+		os.path.isdir(os.path.join(path, 'verilog'))
+
+# Find the project trees at or below a path.  The search does not look
+# inside a directory once it is found to be a project tree.
+
+def find_trees(path):
+    if is_project_tree(path):
+        return [path]
+    trees = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for dirname in list(dirnames):
+            subpath = os.path.join(dirpath, dirname)
+            if dirname.startswith('.'):
+                dirnames.remove(dirname)
+            elif is_project_tree(subpath):
+                trees.append(subpath)
+                dirnames.remove(dirname)
+    return trees
+
+def audit_tree(path):
+    record = {'path': path, 'consistent': True, 'errors': []}
+    try:
+        info = id_rom.read_info_yaml(path) or {}
+        results = id_rom.decode_project(path, list(id_rom.roms))
+    except Exception as e:
+        record['consistent'] = False
+        record['errors'].append(str(e))
+        return record
+
+    for name, result in results.items():
+        rom = id_rom.roms[name]
+        entry = {}
+        for view in ('layout', 'textblock', 'rtl'):
+            if view in result:
+                entry[view] = None if result[view] is None else \
+			id_rom.format_id(name, result[view])
+        errors = list(result['errors'])
+
+        value = info.get(rom['key'])
+        if value is not None:
+            try:
+                expected = id_rom.parse_id(value, rom['width'])[0]
+                entry['info'] = id_rom.format_id(name, expected)
+                if result['consistent'] and result['layout'] != expected:
+                    errors.append('info.yaml ' + rom['key'] + ' is ' + entry['info'])
+            except ValueError:
+                errors.append('info.yaml: cannot parse ' + rom['key'] + ' "' + value + '"')
+
+        record[rom['key']] = entry
+        record['errors'].extend(rom['key'] + ': ' + error for error in errors)
+
+    record['consistent'] = not record['errors']
+    return record
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+    jobs = os.cpu_count() or 1
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    for option in optionlist:
+        if option.startswith('-jobs='):
+            try:
+                jobs = int(option.split('=', 1)[1])
+            except ValueError:
+                print('Error:  Cannot parse ' + option + ' as a number of jobs.')
+                sys.exit(1)
+        else:
+            print('Unknown option ' + option + '.')
+            usage()
+            sys.exit(1)
+
+    if len(arguments) == 0:
+        usage()
+        sys.exit(0)
+
+    trees = []
+    for path in arguments:
+        if not os.path.isdir(path):
+            print('Error:  Path "' + path + '" does not exist or is not readable.')
+            sys.exit(1)
+        trees.extend(find_trees(path))
+
+    failed = 0
+    if jobs > 1 and len(trees) > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(jobs)
+        records = executor.map(audit_tree, trees,
+		chunksize=max(1, len(trees) // (jobs * 8)))
+    else:
+        executor = None
+        records = map(audit_tree, trees)
+
+    for record in records:
+        print(json.dumps(record), flush=True)
+        if not record['consistent']:
+            failed += 1
+
+    if executor:
+        executor.shutdown()
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# bench_ids.py ---
+#
+# Benchmark the ID programming scripts (set_ids.py, and through it
+# set_project_id.py and set_product_id.py, which share id_rom.py) on
+# synthetic project trees.  Each tree holds copies of the project's ROM
+# layouts and text block, an info.yaml file with the ID values, and the
+# RTL top level padded with renamed copies of its modules, so that the
+# effect of the size of panamax.v can be measured.
+#
+# For each tree size and each ID pattern ("zero", "sparse" with a
+# single bit set, and "ones" with every bit set, which moves every via
+# and is the worst case for the layout edits), the following are timed:
+#
+#   program:            set_ids.py on a freshly generated tree
+#   patch:              set_ids.py -patch on an already programmed tree
+#   report:             set_ids.py -report, answered from id_manifest.json
+#   report-rtl:         set_ids.py -report without a manifest (the first
+#                       run builds the RTL index cache, later runs use it)
+#   batch:              set_ids.py -batch over a manifest of trees, as
+#                       trees per second, for each number of jobs
+#
+# The value zero cannot be programmed, so the "zero" pattern is timed
+# only for the report of an unprogrammed tree.  Every run is a separate
+# process, so the times include interpreter start-up, as seen by a
+# user.  Trees are made under a temporary directory, or under the
+# directory given with "-dir=" (for example, a network file system).
+#
+# The results are written as JSON.  With "-baseline=<file>", the median
+# of each measurement is compared against an earlier result file.
+#
+# With "-check", the benchmarks are not run;  instead, a set of checks
+# of the behavior of the ID scripts is run on synthetic trees, and the
+# exit status is 1 if any check fails.
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+import subprocess
+
+import id_rom
+import index_cache
+
+patterns = {
+    'zero': {'project': 0x00000000, 'product': 0x00},
+    'sparse': {'project': 0x00000001, 'product': 0x01},
+    'ones': {'project': 0xFFFFFFFF, 'product': 0xFF},
+}
+
+scriptdir = os.path.dirname(os.path.abspath(__file__))
+
+def usage():
+    print("Usage:")
+    print("bench_ids.py [<options>] [<project_path>]")
+    print("")
+    print("options:")
+    print("    -sizes=<n>,...       RTL top level padding factors (default 1,4)")
+    print("    -patterns=<p>,...    ID patterns, of " + ', '.join(patterns) +
+		" (default all)")
+    print("    -repeat=<n>          runs per measurement (default 5)")
+    print("    -batch=<n>           trees per batch run, 0 to skip (default 20)")
+    print("    -jobs=<n>,...        worker processes for batch runs (default 1,4)")
+    print("    -dir=<path>          make the trees under <path>")
+    print("    -output=<file>       write the results to <file> (default stdout)")
+    print("    -baseline=<file>     compare against an earlier result file")
+    print("    -threshold=<pct>     slowdown reported as a regression (default 10)")
+    print("    -check               run the checks instead of the benchmarks")
+    return 0
+
+#----------------------------------------------------------------------
+# Synthetic project trees
+#----------------------------------------------------------------------
+
+# Read the files of the project that the ID scripts read, as templates
+# for the synthetic trees.  The zero-value copy of a ROM layout is used
+# if the project has been programmed.
+
+def read_sources(project_path):
+    sources = {}
+    for target, paths in id_rom.template_sources(list(id_rom.roms)).items():
+        for path in paths:
+            if os.path.isfile(os.path.join(project_path, path)):
+                with open(os.path.join(project_path, path), 'r') as ifile:
+                    # A file generated from another (the gate-level ROM
+                    # netlists) is represented by its source
+                    if not path.startswith(os.path.splitext(target)[0]):
+                        target = path
+                    sources[target] = ifile.read()
+                break
+    if id_rom.rtl_top not in sources:
+        raise OSError('No file ' + id_rom.rtl_top + ' in ' + project_path)
+    return sources
+
+# Pad the RTL top level with "size - 1" copies of its modules, placed
+# ahead of the originals.  The modules and the ID parameters are
+# renamed in the copies, so the ID scripts must scan past them.
+
+def pad_rtl(vdata, size):
+    if size <= 1:
+        return vdata
+    params = '|'.join(rom['param'] for rom in id_rom.roms.values())
+    copies = []
+    for i in range(1, size):
+        copy = re.sub(r'^(\s*module\s+)(\w+)', r'\1\2_pad' + str(i), vdata, flags=re.M)
+        copy = re.sub(r'\b(' + params + r')\b', r'\1_PAD' + str(i), copy)
+        copies.append(copy)
+    return '\n'.join(copies) + '\n' + vdata
+
+def format_ids(ids):
+    return dict((name, id_rom.format_id(name, value)) for name, value in ids.items())
+
+# Write a synthetic tree at "tree_path".  "ids" gives the values put in
+# info.yaml.
+
+def make_tree(tree_path, sources, size, ids):
+    if os.path.exists(tree_path):
+        shutil.rmtree(tree_path)
+    for target, data in sources.items():
+        if target == id_rom.rtl_top:
+            data = pad_rtl(data, size)
+        filepath = os.path.join(tree_path, target)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'w') as ofile:
+            ofile.write(data)
+    with open(os.path.join(tree_path, 'info.yaml'), 'w') as ofile:
+        for name, value in format_ids(ids).items():
+            ofile.write(id_rom.roms[name]['key'] + ': "' + value + '"\n')
+
+#----------------------------------------------------------------------
+# Timing
+#----------------------------------------------------------------------
+
+# Run set_ids.py with the given arguments and return the wall time.
+
+def run_ids(arguments):
+    command = [sys.executable, os.path.join(scriptdir, 'set_ids.py')] + arguments
+    start = time.perf_counter()
+    proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(' '.join(command) + ' failed:\n' + proc.stdout.decode())
+    return elapsed
+
+def record(results, bench, pattern, size, times, **extra):
+    entry = {'bench': bench, 'pattern': pattern, 'size': size, 'times': times,
+		'median': statistics.median(times), 'min': min(times)}
+    entry.update(extra)
+    results.append(entry)
+    print('%-10s %-7s size %-3d %8.1f ms' % (bench, pattern, size,
+		entry['median'] * 1000) + ''.join('  %s %.4g' % item for item in
+		sorted(extra.items())), file=sys.stderr)
+
+def bench_tree(results, workdir, sources, size, pattern, repeat):
+    ids = patterns[pattern]
+    tree = os.path.join(workdir, 'tree')
+    manifest = os.path.join(tree, id_rom.id_manifest_file)
+
+    if pattern != 'zero':
+        times = []
+        for i in range(0, repeat):
+            make_tree(tree, sources, size, ids)
+            times.append(run_ids([tree]))
+        record(results, 'program', pattern, size, times)
+
+        # Patch between the pattern and its complement, so every run
+        # changes the fields.
+        other = dict((name, value ^ ((1 << id_rom.roms[name]['width']) - 1) or 1)
+		for name, value in ids.items())
+        times = []
+        for i in range(0, repeat):
+            for values in (other, ids):
+                arguments = ['-patch'] + ['-' + name + '=' + value for name, value
+			in format_ids(values).items()] + [tree]
+                times.append(run_ids(arguments))
+        record(results, 'patch', pattern, size, times)
+
+        times = [run_ids(['-report', tree]) for i in range(0, repeat)]
+        record(results, 'report', pattern, size, times)
+        os.unlink(manifest)
+    else:
+        make_tree(tree, sources, size, ids)
+
+    # The report reads the values from info.yaml when it is present
+    os.unlink(os.path.join(tree, 'info.yaml'))
+    times = [run_ids(['-report', tree]) for i in range(0, repeat)]
+    record(results, 'report-rtl', pattern, size, times, cold=times[0])
+
+def bench_batch(results, workdir, sources, size, pattern, count, joblist):
+    ids = patterns[pattern]
+    tree = os.path.join(workdir, 'tree')
+    make_tree(tree, sources, size, ids)
+    manifest = os.path.join(workdir, 'batch.txt')
+    with open(manifest, 'w') as ofile:
+        for i in range(0, count):
+            values = format_ids(ids)
+            ofile.write(values['project'] + ' ' + values['product'] + ' ' +
+			os.path.join(workdir, 'batch', str(i)) + '\n')
+    for jobs in joblist:
+        shutil.rmtree(os.path.join(workdir, 'batch'), ignore_errors=True)
+        elapsed = run_ids(['-batch=' + manifest, '-jobs=' + str(jobs), tree])
+        record(results, 'batch', pattern, size, [elapsed], jobs=jobs,
+		trees=count, throughput=count / elapsed)
+    shutil.rmtree(os.path.join(workdir, 'batch'), ignore_errors=True)
+
+def run_benchmarks(project_path, sizes, patternlist, repeat, count, joblist, basedir=None):
+    sources = read_sources(project_path)
+    results = []
+    workdir = tempfile.mkdtemp(prefix='bench_ids.', dir=basedir)
+    try:
+        for size in sizes:
+            for pattern in patternlist:
+                bench_tree(results, workdir, sources, size, pattern, repeat)
+                if count and pattern != 'zero':
+                    bench_batch(results, workdir, sources, size, pattern, count, joblist)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+	'version': script_version(),
+	'python': platform.python_version(),
+	'platform': platform.platform(),
+	'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+	'filesystem': basedir or tempfile.gettempdir(),
+	'repeat': repeat,
+	'results': results,
+    }
+
+#----------------------------------------------------------------------
+# Checks.  Each check is run in an empty directory, and raises
+# RuntimeError (as run_ids() does) if it fails.
+#----------------------------------------------------------------------
+
+def read_tree_file(tree_path, target):
+    with open(os.path.join(tree_path, target), 'r') as ifile:
+        return ifile.read()
+
+# A variant in the store is personalized again when the project's
+# templates change, instead of being linked from the old variant.
+
+def check_store_templates(workdir, sources):
+    tree = os.path.join(workdir, 'tree')
+    make_tree(tree, sources, 1, patterns['sparse'])
+    values = format_ids(patterns['sparse'])
+    manifest = os.path.join(workdir, 'batch.txt')
+    marker = '// changed template\n'
+    for i in range(0, 2):
+        if i > 0:
+            with open(os.path.join(tree, id_rom.rtl_top), 'a') as ofile:
+                ofile.write(marker)
+        with open(manifest, 'w') as ofile:
+            ofile.write(values['project'] + ' ' + values['product'] + ' ' +
+			os.path.join(workdir, 'batch', str(i)) + '\n')
+        run_ids(['-batch=' + manifest, '-store=' + os.path.join(workdir, 'store'), tree])
+    for i in range(0, 2):
+        vdata = read_tree_file(os.path.join(workdir, 'batch', str(i)), id_rom.rtl_top)
+        if vdata.endswith(marker) != (i > 0):
+            raise RuntimeError('batch tree ' + str(i) + ' was not made from the ' +
+			('changed' if i > 0 else 'original') + ' template')
+
+# Patching a tree that was programmed without a zero-value copy of its
+# layouts (such as a batch output tree) keeps a zero-value copy, so that
+# the tree can then be programmed in full.
+
+def check_patch_programmed(workdir, sources):
+    tree = os.path.join(workdir, 'tree')
+    make_tree(tree, sources, 1, patterns['sparse'])
+    output = os.path.join(workdir, 'batch', '0')
+    manifest = os.path.join(workdir, 'batch.txt')
+    for name, ids in (('ones', patterns['ones']), ('sparse', patterns['sparse'])):
+        values = format_ids(ids)
+        with open(manifest, 'w') as ofile:
+            ofile.write(values['project'] + ' ' + values['product'] + ' ' + output + '\n')
+        shutil.rmtree(output, ignore_errors=True)
+        run_ids(['-batch=' + manifest, tree])
+
+        values = format_ids(patterns['sparse' if name == 'ones' else 'ones'])
+        run_ids(['-patch'] + ['-' + key + '=' + value for key, value in values.items()] +
+		[output])
+        for rname, rom in id_rom.roms.items():
+            magdata = read_tree_file(output, 'mag/' + rom['cell'] + '_zero.mag')
+            if id_rom.decode_layout(magdata, rname)[0] != 0:
+                raise RuntimeError(rom['cell'] + '_zero.mag of a ' + name +
+			' tree is not zero-valued')
+        values = format_ids(ids)
+        run_ids(['-' + key + '=' + value for key, value in values.items()] + [output])
+        run_ids(['-decode', output])
+
+checks = [
+    check_store_templates,
+    check_patch_programmed,
+]
+
+def run_checks(project_path, basedir=None):
+    sources = read_sources(project_path)
+    failed = 0
+    for check in checks:
+        workdir = tempfile.mkdtemp(prefix='bench_ids.', dir=basedir)
+        try:
+            check(workdir, sources)
+            print('Passed:  ' + check.__name__)
+        except (OSError, RuntimeError) as e:
+            print('Failed:  ' + check.__name__ + ':  ' + str(e))
+            failed += 1
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return failed
+
+# Identify the version of the scripts being measured:  the git commit
+# if available, and a hash of id_rom.py in any case.
+
+def script_version():
+    version = {'id_rom': index_cache.file_hash(os.path.join(scriptdir, 'id_rom.py'))[:12]}
+    try:
+        proc = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=scriptdir,
+		stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        if proc.returncode == 0:
+            version['commit'] = proc.stdout.decode().strip()
+    except OSError:
+        pass
+    return version
+
+#----------------------------------------------------------------------
+# Compare against a baseline result file.  Returns the number of
+# measurements slower than the baseline by more than "threshold"
+# percent.
+#----------------------------------------------------------------------
+
+def result_key(entry):
+    return (entry['bench'], entry['pattern'], entry['size'], entry.get('jobs'))
+
+def compare_baseline(report, baseline, threshold):
+    old = dict((result_key(entry), entry) for entry in baseline['results'])
+    regressions = 0
+    for entry in report['results']:
+        key = result_key(entry)
+        if key not in old:
+            continue
+        ratio = entry['median'] / old[key]['median']
+        flag = ''
+        if ratio > 1 + threshold / 100:
+            flag = '  REGRESSION'
+            regressions += 1
+        print('%-10s %-7s size %-3d%s  %8.1f ms -> %8.1f ms  (%+.0f%%)%s' % (key[0],
+		key[1], key[2], '' if key[3] is None else ' jobs %d' % key[3],
+		old[key]['median'] * 1000, entry['median'] * 1000,
+		(ratio - 1) * 100, flag))
+    return regressions
+
+#----------------------------------------------------------------------
+
+def parse_list(value, convert=int):
+    return [convert(item) for item in value.split(',') if item]
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > 1:
+        print('Wrong number of arguments given to bench_ids.py.')
+        usage()
+        sys.exit(1)
+
+    project_path = arguments[0] if arguments else os.getcwd()
+    sizes = [1, 4]
+    patternlist = list(patterns)
+    repeat = 5
+    count = 20
+    joblist = [1, 4]
+    basedir = None
+    outfile = None
+    baselinefile = None
+    threshold = 10
+    checkmode = False
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        try:
+            if key == '-sizes' and value:
+                sizes = parse_list(value)
+            elif key == '-patterns' and value:
+                patternlist = parse_list(value, str)
+                for pattern in patternlist:
+                    if pattern not in patterns:
+                        raise ValueError(pattern)
+            elif key == '-repeat' and value:
+                repeat = int(value)
+            elif key == '-batch' and value:
+                count = int(value)
+            elif key == '-jobs' and value:
+                joblist = parse_list(value)
+            elif key == '-dir' and value:
+                basedir = value
+            elif key == '-output' and value:
+                outfile = value
+            elif key == '-baseline' and value:
+                baselinefile = value
+            elif key == '-threshold' and value:
+                threshold = float(value)
+            elif key == '-check':
+                checkmode = True
+            else:
+                print('Unknown option "' + option + '"')
+                usage()
+                sys.exit(1)
+        except ValueError:
+            print('Error:  Bad value in option "' + option + '"')
+            sys.exit(1)
+
+    if checkmode:
+        try:
+            sys.exit(1 if run_checks(project_path, basedir) else 0)
+        except OSError as e:
+            print('Error:  ' + str(e))
+            sys.exit(1)
+
+    if repeat < 1:
+        print('Error:  The number of runs must be at least 1.')
+        sys.exit(1)
+
+    try:
+        report = run_benchmarks(project_path, sizes, patternlist, repeat, count,
+		joblist, basedir)
+    except (OSError, RuntimeError) as e:
+        print('Error:  ' + str(e))
+        sys.exit(1)
+
+    if outfile:
+        with open(outfile, 'w') as ofile:
+            json.dump(report, ofile, indent=1)
+    else:
+        print(json.dumps(report, indent=1))
+
+    if baselinefile:
+        with open(baselinefile, 'r') as ifile:
+            baseline = json.load(ifile)
+        if compare_baseline(report, baseline, threshold):
+            sys.exit(1)
+    sys.exit(0)
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# def_index.py ---
+#
+# Streaming reader and spatial index for the padframe DEF file
+# (def/panamax.def).  The DEF file is read one statement at a time and
+# is never held in memory as a whole.  The result is an index of:
+#
+#   pins:        pin name -> net, direction, use, placement and shapes
+#   components:  instance name -> cell name, placement and orientation
+#   nets:        net name (regular and special) -> list of item numbers
+#   items:       list of shapes (kind, name, layer, x1, y1, x2, y2) for
+#		 pin shapes, component origins, wire segments and vias
+#   grid:        bucket (gx, gy) -> list of item numbers, for finding
+#		 the shapes at or near a point
+#
+# All coordinates in the index are in DEF database units;  the query
+# routines and the command line take microns.  The index is cached on
+# disk next to the DEF file (see index_cache.py).
+#
+# From the command line, the pin positions can be checked against the
+# pad centers listed in doc/padframe.txt with "-padframe=<file>".
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+
+import index_cache
+
+# Version of the index format, for the cache
+index_version = 3
+
+# Size of the spatial index buckets, in microns
+grid_microns = 50
+
+# Sections of the DEF file that contain lists of items
+item_sections = ('VIAS', 'COMPONENTS', 'PINS', 'SPECIALNETS', 'NETS',
+		'NONDEFAULTRULES', 'BLOCKAGES', 'REGIONS', 'GROUPS', 'FILLS')
+
+def usage():
+    print("Usage:")
+    print("def_index.py [<options>] <def_file>")
+    print("")
+    print("options:")
+    print("    -pin=<name>          print the placement and shapes of a pin")
+    print("    -net=<name>          print the shapes of a net")
+    print("    -at=<x>,<y>          print the shapes at or near a point (in microns)")
+    print("    -radius=<r>          distance from the point to search (in microns)")
+    print("    -layer=<layer>       only find shapes on this layer")
+    print("    -padframe=<file>     check pad pin positions against doc/padframe.txt")
+    print("    -tolerance=<um>      allowed pad position error along the side for -padframe\n                         (default 1)")
+    print("    -nocache             do not read or write the index cache")
+    return 0
+
+#----------------------------------------------------------------------
+# Generate the statements of a DEF file as (section, tokens) pairs.
+# A statement is the list of tokens up to and including ";".  Section
+# headers (e.g., "COMPONENTS 539 ;") are reported with section None.
+#----------------------------------------------------------------------
+
+def def_statements(filepath):
+    section = None
+    tokens = []
+    with open(filepath, 'r') as ifile:
+        for line in ifile:
+            if line.lstrip().startswith('#'):
+                continue
+            for token in line.split():
+                if tokens == ['END']:
+                    # "END <section>" and "END DESIGN" have no ";"
+                    tokens = []
+                    if token == 'DESIGN':
+                        return
+                    section = None
+                    continue
+                tokens.append(token)
+                if token == ';':
+                    if section is None and tokens[0] in item_sections:
+                        yield None, tokens
+                        section = tokens[0]
+                    else:
+                        yield section, tokens
+                    tokens = []
+
+#----------------------------------------------------------------------
+# Transform a point relative to a placed object, by DEF orientation.
+#----------------------------------------------------------------------
+
+orient_transforms = {
+    'N':  (1, 0, 0, 1),
+    'S':  (-1, 0, 0, -1),
+    'W':  (0, -1, 1, 0),
+    'E':  (0, 1, -1, 0),
+    'FN': (-1, 0, 0, 1),
+    'FS': (1, 0, 0, -1),
+    'FW': (0, 1, 1, 0),
+    'FE': (0, -1, -1, 0),
+}
+
+def transform_rect(rect, origin, orient):
+    a, b, c, d = orient_transforms[orient]
+    x1, y1, x2, y2 = rect
+    xa = a * x1 + b * y1
+    ya = c * x1 + d * y1
+    xb = a * x2 + b * y2
+    yb = c * x2 + d * y2
+    return (origin[0] + min(xa, xb), origin[1] + min(ya, yb),
+		origin[0] + max(xa, xb), origin[1] + max(ya, yb))
+
+# Return the tokens of "( x y )" starting at position i, as a point and
+# the position following the closing parenthesis.  A "*" is replaced by
+# the corresponding coordinate of "last".
+
+def read_point(tokens, i, last=None):
+    values = []
+    i += 1
+    while tokens[i] != ')':
+        values.append(tokens[i])
+        i += 1
+    x = last[0] if values[0] == '*' else int(values[0])
+    y = last[1] if values[1] == '*' else int(values[1])
+    return (x, y), i + 1
+
+#----------------------------------------------------------------------
+# Statement parsers.  Each adds to the index and to its list of items.
+#----------------------------------------------------------------------
+
+def add_item(index, kind, name, layer, rect):
+    index['items'].append((kind, name, layer) + tuple(rect))
+    return len(index['items']) - 1
+
+def parse_via(index, tokens):
+    rects = []
+    i = 2
+    while i < len(tokens):
+        if tokens[i] == 'RECT':
+            layer = tokens[i + 1]
+            p1, i = read_point(tokens, i + 2)
+            p2, i = read_point(tokens, i)
+            rects.append((layer, p1 + p2))
+        else:
+            i += 1
+    index['vias'][tokens[1]] = rects
+
+def parse_component(index, tokens):
+    name, cell = tokens[1], tokens[2]
+    comp = {'cell': cell, 'status': None, 'origin': None, 'orient': None}
+    i = 3
+    while i < len(tokens):
+        if tokens[i] in ('PLACED', 'FIXED', 'COVER'):
+            comp['status'] = tokens[i]
+            comp['origin'], i = read_point(tokens, i + 1)
+            comp['orient'] = tokens[i]
+        i += 1
+    index['components'][name] = comp
+    if comp['origin']:
+        add_item(index, 'component', name, None, comp['origin'] + comp['origin'])
+
+def parse_pin(index, tokens):
+    # A pin with several ports may be given as several statements
+    name = tokens[1]
+    pin = index['pins'].setdefault(name,
+		{'net': None, 'direction': None, 'use': None, 'ports': [],
+		'shapes': []})
+    newports = len(pin['ports'])
+    port = None
+    i = 2
+    while i < len(tokens):
+        keyword = tokens[i]
+        if keyword in ('NET', 'DIRECTION', 'USE'):
+            pin[keyword.lower()] = tokens[i + 1]
+            i += 2
+        elif keyword == 'PORT' or (keyword in ('LAYER', 'PLACED', 'FIXED', 'COVER')
+			and port is None):
+            port = {'layers': [], 'origin': None, 'orient': None}
+            pin['ports'].append(port)
+            i += 1 if keyword == 'PORT' else 0
+        elif keyword == 'LAYER':
+            layer = tokens[i + 1]
+            i += 2
+            while tokens[i] != '(':
+                i += 2		# MASK or SPACING/DESIGNRULEWIDTH values
+            p1, i = read_point(tokens, i)
+            p2, i = read_point(tokens, i)
+            port['layers'].append((layer, p1 + p2))
+        elif keyword in ('PLACED', 'FIXED', 'COVER'):
+            port['origin'], i = read_point(tokens, i + 1)
+            port['orient'] = tokens[i]
+            i += 1
+        else:
+            i += 1
+
+    for port in pin['ports'][newports:]:
+        if port['origin'] is None:
+            continue
+        for layer, rect in port['layers']:
+            pin['shapes'].append(add_item(index, 'pin', name, layer,
+			transform_rect(rect, port['origin'], port['orient'])))
+
+def parse_rule(index, tokens):
+    widths = {}
+    i = 2
+    while i < len(tokens) - 3:
+        if tokens[i] == 'LAYER' and tokens[i + 2] == 'WIDTH':
+            widths[tokens[i + 1]] = int(tokens[i + 3])
+            i += 4
+        else:
+            i += 1
+    index['rules'][tokens[1]] = widths
+
+# Add the wire segments and vias of a routing statement starting at
+# position i (the layer name).  Returns the position after the route.
+
+def parse_route(index, name, tokens, i, special):
+    layer = tokens[i]
+    i += 1
+    width = 0
+    if special and tokens[i] not in ('(', '+'):
+        width = int(tokens[i])
+        i += 1
+    last = None
+    while i < len(tokens) and tokens[i] not in ('NEW', ';'):
+        token = tokens[i]
+        if token == '(':
+            point, i = read_point(tokens, i, last)
+            if last is not None:
+                hw = width // 2
+                rect = (min(last[0], point[0]) - hw, min(last[1], point[1]) - hw,
+			max(last[0], point[0]) + hw, max(last[1], point[1]) + hw)
+                index['nets'][name].append(add_item(index, 'wire', name, layer, rect))
+            last = point
+        elif token == 'TAPERRULE':
+            width = index['rules'].get(tokens[i + 1], {}).get(layer, width)
+            i += 2
+        elif token == 'TAPER':
+            i += 1
+        elif token == '+':
+            if tokens[i + 1] in ('SHAPE', 'STYLE', 'MASK'):
+                i += 3
+            else:
+                break
+        elif token in ('SHAPE', 'STYLE', 'MASK'):
+            i += 2
+        elif token == 'RECT':
+            p1, i = read_point(tokens, i + 1)
+            p2, i = read_point(tokens, i)
+            rect = (last[0] + p1[0], last[1] + p1[1], last[0] + p2[0], last[1] + p2[1])
+            index['nets'][name].append(add_item(index, 'wire', name, layer, rect))
+        elif token == 'VIRTUAL':
+            point, i = read_point(tokens, i + 1, last)
+            last = point
+        elif last is not None:
+            # Via at the last point
+            vianame = token
+            i += 1
+            if i < len(tokens) and tokens[i] in ('N', 'S', 'E', 'W', 'FN', 'FS', 'FE', 'FW'):
+                i += 1
+            rects = index['vias'].get(vianame)
+            if rects:
+                for vlayer, vrect in rects:
+                    index['nets'][name].append(add_item(index, 'via', name,
+				vlayer, transform_rect(vrect, last, 'N')))
+            else:
+                index['nets'][name].append(add_item(index, 'via', name,
+			vianame, last + last))
+        else:
+            i += 1
+    return i
+
+def parse_net(index, tokens, special):
+    name = tokens[1]
+    net = index['nets'].setdefault(name, [])
+    connections = index['connections'].setdefault(name, [])
+    i = 2
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '(' and i + 2 < len(tokens):
+            connections.append((tokens[i + 1], tokens[i + 2]))
+            while tokens[i] != ')':
+                i += 1
+            i += 1
+        elif token in ('ROUTED', 'FIXED', 'COVER', 'NOSHIELD', 'NEW'):
+            i = parse_route(index, name, tokens, i + 1, special)
+        else:
+            i += 1
+
+#----------------------------------------------------------------------
+# Read a DEF file and return its index.
+#----------------------------------------------------------------------
+
+def build_index(filepath):
+    index = {
+	'units': 1000,
+	'busbitchars': '[]',
+	'diearea': None,
+	'vias': {},
+	'components': {},
+	'pins': {},
+	'rules': {},
+	'nets': {},
+	'connections': {},
+	'items': [],
+	'grid': {},
+    }
+    for section, tokens in def_statements(filepath):
+        if section is None:
+            if tokens[:3] == ['UNITS', 'DISTANCE', 'MICRONS']:
+                index['units'] = int(tokens[3])
+            elif tokens[0] == 'BUSBITCHARS':
+                index['busbitchars'] = tokens[1].strip('"')
+            elif tokens[0] == 'DIEAREA':
+                p1, i = read_point(tokens, 1)
+                p2, i = read_point(tokens, i)
+                index['diearea'] = p1 + p2
+        elif tokens[0] != '-':
+            continue
+        elif section == 'VIAS':
+            parse_via(index, tokens)
+        elif section == 'COMPONENTS':
+            parse_component(index, tokens)
+        elif section == 'PINS':
+            parse_pin(index, tokens)
+        elif section == 'NONDEFAULTRULES':
+            parse_rule(index, tokens)
+        elif section in ('SPECIALNETS', 'NETS'):
+            parse_net(index, tokens, section == 'SPECIALNETS')
+
+    # Bucket the items by grid position
+    gridsize = grid_microns * index['units']
+    grid = index['grid']
+    for n, item in enumerate(index['items']):
+        for gx in range(item[3] // gridsize, item[5] // gridsize + 1):
+            for gy in range(item[4] // gridsize, item[6] // gridsize + 1):
+                grid.setdefault((gx, gy), []).append(n)
+    return index
+
+def read_index(filepath, usecache=True):
+    return index_cache.cached(filepath, 'defindex', index_version, build_index,
+		usecache)
+
+#----------------------------------------------------------------------
+# Queries.  Coordinates and distances are in microns.
+#----------------------------------------------------------------------
+
+def to_microns(index, item):
+    units = index['units']
+    return item[:3] + tuple(v / units for v in item[3:])
+
+# Return the items within "radius" of point (x, y), optionally only
+# those on one layer.
+
+def query(index, x, y, layer=None, radius=0):
+    units = index['units']
+    gridsize = grid_microns * units
+    px, py, r = round(x * units), round(y * units), round(radius * units)
+    found = []
+    seen = set()
+    for gx in range((px - r) // gridsize, (px + r) // gridsize + 1):
+        for gy in range((py - r) // gridsize, (py + r) // gridsize + 1):
+            for n in index['grid'].get((gx, gy), []):
+                if n in seen:
+                    continue
+                seen.add(n)
+                item = index['items'][n]
+                if layer and item[2] != layer:
+                    continue
+                if (item[3] - r <= px <= item[5] + r and
+				item[4] - r <= py <= item[6] + r):
+                    found.append(n)
+    return [to_microns(index, index['items'][n]) for n in sorted(found)]
+
+def pin_shapes(index, name):
+    pin = index['pins'].get(name)
+    return [to_microns(index, index['items'][n]) for n in pin['shapes']] if pin else []
+
+def net_shapes(index, name):
+    return [to_microns(index, index['items'][n]) for n in index['nets'].get(name, [])]
+
+# Return the pin shapes on "layer" as a list of (pin name, x1, y1, x2, y2)
+# in microns.
+
+def layer_pins(index, layer):
+    rects = []
+    for name, pin in index['pins'].items():
+        for n in pin['shapes']:
+            item = index['items'][n]
+            if item[2] == layer:
+                rects.append((name,) + to_microns(index, item)[3:])
+    return rects
+
+#----------------------------------------------------------------------
+# Read the pad center positions from doc/padframe.txt.  Returns a list
+# of (side, axis, position) for the pad centers along each side, where
+# axis is the coordinate that varies along the side, and a dictionary
+# of side -> list of the row centers across the side, in microns.
+# The bottom row has two:  one for the SIO pads and one for the rest.
+#----------------------------------------------------------------------
+
+def read_padframe(filepath):
+    with open(filepath, 'r') as ifile:
+        text = ifile.read()
+
+    rows = {}
+    for side, kind, axis, value in re.findall(
+		r'^(Bottom row|Left side|Right side|Top row)( SIO)? pad ([XY]) center = ([\d.]+)um',
+		text, re.MULTILINE):
+        rows.setdefault(side.split()[0], []).append(float(value))
+
+    pads = []
+    for side, axis, values in re.findall(
+		r'^(Bottom|Left|Right|Top) (?:row pad|side) ([XY]) centers.*:\n((?:[\d., ]+\n)+)',
+		text, re.MULTILINE):
+        for value in re.findall(r'[\d.]+\d', values):
+            pads.append((side, axis, float(value)))
+    return pads, rows
+
+# Match each pad center to a pin on "layer".  The pin shapes are the
+# bond pads, whose center is not on the row center for every pad cell
+# (the GPIO and OVT pads are offset by up to about 2um across the side),
+# so across the side the row center only has to fall inside the pin
+# shape.  Along the side the nearest such pin is taken.  Returns a list
+# of (side, x, y, pin name, distance along the side).
+
+def check_padframe(index, pads, rows, layer='met5'):
+    rects = layer_pins(index, layer)
+    results = []
+    for side, axis, position in pads:
+        best = None
+        for row in rows.get(side, []):
+            for name, x1, y1, x2, y2 in rects:
+                if axis == 'X':
+                    across, low, high = (y1 <= row <= y2), x1, x2
+                else:
+                    across, low, high = (x1 <= row <= x2), y1, y2
+                if not across:
+                    continue
+                dist = abs((low + high) / 2 - position)
+                if best is None or dist < best[1]:
+                    best = (name, dist, row)
+        row = best[2] if best else rows.get(side, [0])[0]
+        x, y = (position, row) if axis == 'X' else (row, position)
+        results.append((side, x, y) + (best[:2] if best else (None, None)))
+    return results
+
+#----------------------------------------------------------------------
+
+def print_items(items):
+    for kind, name, layer, x1, y1, x2, y2 in items:
+        print('%-9s %-40s %-8s (%g %g) (%g %g)' % (kind, name, layer or '-',
+		x1, y1, x2, y2))
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) != 1:
+        print('Wrong number of arguments given to def_index.py.')
+        usage()
+        sys.exit(1)
+
+    deffile = arguments[0]
+    usecache = True
+    pinname = None
+    netname = None
+    point = None
+    radius = 0
+    layer = None
+    padframe = None
+    tolerance = 1.0
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        try:
+            if key == '-nocache':
+                usecache = False
+            elif key == '-pin' and value:
+                pinname = value
+            elif key == '-net' and value:
+                netname = value
+            elif key == '-at' and value:
+                point = tuple(float(v) for v in value.split(','))
+                if len(point) != 2:
+                    raise ValueError(value)
+            elif key == '-radius' and value:
+                radius = float(value)
+            elif key == '-layer' and value:
+                layer = value
+            elif key == '-padframe' and value:
+                padframe = value
+            elif key == '-tolerance' and value:
+                tolerance = float(value)
+            else:
+                print('Unknown option "' + option + '"')
+                usage()
+                sys.exit(1)
+        except ValueError:
+            print('Error:  Bad value in option "' + option + '"')
+            sys.exit(1)
+
+    if not os.path.isfile(deffile):
+        print('Error:  No DEF file ' + deffile + '.')
+        sys.exit(1)
+
+    index = read_index(deffile, usecache)
+
+    if not (pinname or netname or point or padframe):
+        print('Units:       ' + str(index['units']) + ' per micron')
+        print('Vias:        ' + str(len(index['vias'])))
+        print('Components:  ' + str(len(index['components'])))
+        print('Pins:        ' + str(len(index['pins'])))
+        print('Nets:        ' + str(len(index['nets'])))
+        print('Shapes:      ' + str(len(index['items'])))
+
+    status = 0
+    if pinname:
+        pin = index['pins'].get(pinname)
+        if not pin:
+            print('Error:  No pin ' + pinname + ' in ' + deffile + '.')
+            status = 1
+        else:
+            print('Pin ' + pinname + ':  net ' + str(pin['net']) + ', direction ' +
+			str(pin['direction']) + ', use ' + str(pin['use']))
+            print_items(pin_shapes(index, pinname))
+
+    if netname:
+        if netname not in index['nets']:
+            print('Error:  No net ' + netname + ' in ' + deffile + '.')
+            status = 1
+        else:
+            print_items(net_shapes(index, netname))
+
+    if point:
+        print_items(query(index, point[0], point[1], layer, radius))
+
+    if padframe:
+        pads, rows = read_padframe(padframe)
+        results = check_padframe(index, pads, rows)
+        bad = 0
+        for side, x, y, name, dist in results:
+            if dist is None or dist > tolerance:
+                bad += 1
+                print('Mismatch:  ' + side + ' pad at (%g, %g):  ' % (x, y) +
+			('nearest pin ' + name + ' is %g um away' % dist if name
+			else 'no pin found'))
+        print('Checked ' + str(len(results)) + ' pad positions, ' + str(bad) +
+			' mismatches.')
+        if bad:
+            status = 1
+
+    sys.exit(status)
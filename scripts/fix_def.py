@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+
+#----------------------------------------------------------------------
+#
+# fix_def.py ---
+#
+# Correct the placement of the components in the padframe DEF file
+# (def/panamax.def) from the layout (mag/panamax.mag), without running
+# magic (see run_make_def.sh).  In DEF, a component is placed at the
+# lower left corner of its abutment box after the orientation is
+# applied.  The placement of each component is computed from the "use"
+# and "transform" records of the layout, following the hierarchy
+# through the cells that were flattened when the DEF was written (such
+# as the "connects" cells, whose constant_block instances are
+# components of the DEF under new names), and from the abutment box of
+# the component cell, taken from:
+#
+#   1. the SIZE and ORIGIN of the macro in a LEF file given with
+#      "-lef=<file>", or
+#   2. the FIXED_BBOX property of the cell layout, or if it has none,
+#      its bounding box (as recorded in the "use" record).  Cells under
+#      $PDKPATH are read only if PDKPATH is set in the environment.
+#   3. with "-usebox", the bounding box in the "use" record, for cells
+#      whose layout is not found.  The bounding box of a cell is not in
+#      general its abutment box, so these placements are approximate,
+#      and a warning is given.
+#
+# Components whose abutment box is not known are left unchanged.  The
+# I/O cells of the padframe are PDK cells, whose layouts are not in the
+# project, so their LEF (from the PDK) must be given with "-lef=<file>"
+# for them to be placed.  If no LEF macro sizes are read (no -lef=<file>
+# given, or no MACRO with a SIZE in the files given), the script gives a
+# warning and exits with an error, without changing the DEF, so that a
+# check made without the LEF does not pass.
+# Components that are flattened cells in the layout are matched to the
+# DEF by cell name and nearest position.
+#
+# The DEF file is streamed twice:  once to read the COMPONENTS section,
+# and once to copy it, rewriting only the placement of the components
+# that are misplaced and passing every other line through unchanged,
+# so the memory used does not depend on the size of the NETS section.
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+import tempfile
+
+import def_index
+import mag_index
+
+def usage():
+    print("Usage:")
+    print("fix_def.py [<options>] [<path_to_project>]")
+    print("")
+    print("options:")
+    print("    -def=<file>          DEF file (default def/panamax.def)")
+    print("    -mag=<file>          layout (default mag/panamax.mag)")
+    print("    -lef=<file>          LEF file giving macro sizes (may be repeated);  needed")
+    print("                         for the PDK I/O cells (an error if none are read)")
+    print("    -usebox              use the bounding box of cells whose layout is not found")
+    print("                         (approximate;  not the abutment box)")
+    print("    -output=<file>       write the corrected DEF to <file> (default in place)")
+    print("    -check               list the misplaced components and exit")
+    print("    -nocache             do not read or write the index cache")
+    print("")
+    print("  If <path_to_project> is not given, then it is assumed to be the cwd.")
+    return 0
+
+#----------------------------------------------------------------------
+# Read the macro boxes of a LEF file, as name -> (x1, y1, x2, y2) in
+# microns, relative to the cell origin.
+#----------------------------------------------------------------------
+
+def read_lef(filepath, macros):
+    name = None
+    origin = (0.0, 0.0)
+    with open(filepath, 'r') as ifile:
+        for line in ifile:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0] == 'MACRO':
+                name = tokens[1]
+                origin = (0.0, 0.0)
+            elif name and tokens[0] == 'ORIGIN':
+                origin = (float(tokens[1]), float(tokens[2]))
+            elif name and tokens[0] == 'SIZE':
+                width, height = float(tokens[1]), float(tokens[3])
+                macros[name] = (-origin[0], -origin[1], width - origin[0],
+			height - origin[1])
+            elif tokens[0] == 'END' and tokens[1:] == [name]:
+                name = None
+    return macros
+
+#----------------------------------------------------------------------
+# Read the units and components of the DEF file, stopping at the end
+# of the COMPONENTS section.
+#----------------------------------------------------------------------
+
+def read_components(filepath):
+    index = {'units': 1000, 'components': {}, 'items': []}
+    for section, tokens in def_index.def_statements(filepath):
+        if section is None:
+            if tokens[:3] == ['UNITS', 'DISTANCE', 'MICRONS']:
+                index['units'] = int(tokens[3])
+            elif index['components'] and tokens[0] != 'COMPONENTS':
+                break
+        elif section == 'COMPONENTS':
+            if tokens[0] == '-':
+                def_index.parse_component(index, tokens)
+        elif index['components']:
+            break
+    return index['units'], index['components']
+
+#----------------------------------------------------------------------
+# Find the placement of every instance of the cells in "defcells",
+# looking through instances of other cells.  Returns a list of
+# (instance path, cell, transform, abutment box), where the transform
+# is to the coordinates of the top cell and the box is in the units of
+# the top cell, or None if not known.
+#----------------------------------------------------------------------
+
+orient_names = dict((v, k) for k, v in def_index.orient_transforms.items())
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+def orientation(t):
+    return orient_names.get(tuple(sign(v) for v in (t[0], t[1], t[3], t[4])))
+
+def abutment_box(cells, cell, n, cellname, libdir, macros, usebox):
+    child = mag_index.load_cell(cells, mag_index.subcell_dir(cell, libdir, cellname),
+		cellname)
+    if cellname in macros:
+        scale = mag_index.microns(cell, 1)
+        return tuple(int(round(v / scale)) for v in macros[cellname])
+    if child and child['fixed_bbox']:
+        scale = (child['magscale'][0] * cell['magscale'][1] /
+			(child['magscale'][1] * cell['magscale'][0]))
+        return tuple(v * scale for v in child['fixed_bbox'])
+    if child or usebox:
+        return tuple(cell['uses']['box'][n * 4:n * 4 + 4])
+    return None
+
+def placements(cells, libdir, cell, defcells, macros, usebox, t=(1, 0, 0, 0, 1, 0),
+		path=''):
+    found = []
+    unresolved = []
+    for n in range(len(cell['uses']['name'])):
+        cellname = mag_index.instance_cellname(cell, n)
+        name = path + cell['uses']['name'][n]
+        ct = mag_index.compose(t, mag_index.instance_transform(cell, n))
+        if cellname in defcells:
+            box = abutment_box(cells, cell, n, cellname, libdir, macros, usebox)
+            found.append((name, cellname, ct, box and mag_index.transform_rect(ct, box)))
+            continue
+        childdir = mag_index.subcell_dir(cell, libdir, cellname)
+        child = mag_index.load_cell(cells, childdir, cellname)
+        if child is None:
+            unresolved.append(name)
+            continue
+        scale = (child['magscale'][0] * cell['magscale'][1] /
+			(child['magscale'][1] * cell['magscale'][0]))
+        if scale != 1:
+            ct = mag_index.compose(ct, (scale, 0, 0, 0, scale, 0))
+        cfound, cunresolved = placements(cells, childdir, child, defcells, macros,
+			usebox, ct, name + '/')
+        found.extend(cfound)
+        unresolved.extend(cunresolved)
+    return found, unresolved
+
+#----------------------------------------------------------------------
+# Match the instances to the DEF components:  by name where the name is
+# a component, and otherwise to the nearest unmatched component of the
+# same cell.  Returns component name -> (origin, orientation) for each
+# component whose placement is known, in DEF units.
+#----------------------------------------------------------------------
+
+def match_components(components, found, dbu):
+    targets = {}
+    nearest = {}
+    for name, cellname, t, rect in found:
+        place = None
+        if rect is not None:
+            place = ((int(round(rect[0] * dbu)), int(round(rect[1] * dbu))), orientation(t))
+        if name in components and components[name]['cell'] == cellname:
+            targets[name] = place
+        else:
+            origin = (int(round(t[2] * dbu)), int(round(t[5] * dbu)))
+            nearest.setdefault(cellname, []).append((origin, place))
+
+    for cellname, instances in nearest.items():
+        free = [name for name, comp in components.items()
+		if comp['cell'] == cellname and name not in targets and comp['origin']]
+        pairs = sorted((abs(components[name]['origin'][0] - origin[0]) +
+		abs(components[name]['origin'][1] - origin[1]), i, name)
+		for i, (origin, place) in enumerate(instances) for name in free)
+        used = set()
+        for dist, i, name in pairs:
+            if i in used or name in targets:
+                continue
+            used.add(i)
+            targets[name] = instances[i][1]
+    return dict((name, place) for name, place in targets.items() if place is not None)
+
+#----------------------------------------------------------------------
+# Copy the DEF file, rewriting the placement of the components in
+# "fixes" (component name -> (origin, orientation)).
+#----------------------------------------------------------------------
+
+placerex = re.compile(r'\+\s*(PLACED|FIXED|COVER)\s*\(\s*-?\d+\s+-?\d+\s*\)\s*(\w+)')
+
+def rewrite_def(infile, outfile, fixes):
+    def replace(statement):
+        tokens = statement.split()
+        place = fixes.get(tokens[1]) if len(tokens) > 1 and tokens[0] == '-' else None
+        if place is None:
+            return statement
+        (x, y), orient = place
+        return placerex.sub(lambda m: '+ ' + m.group(1) + ' ( ' + str(x) + ' ' +
+		str(y) + ' ) ' + orient, statement, count=1)
+
+    insection = False
+    statement = ''
+    with open(infile, 'r') as ifile, open(outfile, 'w') as ofile:
+        for line in ifile:
+            tokens = line.split()
+            if not insection:
+                ofile.write(line)
+                if tokens[:1] == ['COMPONENTS']:
+                    insection = True
+                continue
+            if tokens[:2] == ['END', 'COMPONENTS']:
+                ofile.write(replace(statement) + line)
+                statement = ''
+                insection = False
+                continue
+            statement += line
+            if ';' in tokens:
+                ofile.write(replace(statement))
+                statement = ''
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > 1:
+        print('Wrong number of arguments given to fix_def.py.')
+        usage()
+        sys.exit(1)
+
+    project_path = arguments[0] if arguments else os.getcwd()
+    deffile = 'def/panamax.def'
+    magfile = 'mag/panamax.mag'
+    leffiles = []
+    outfile = None
+    usebox = False
+    checkmode = False
+    usecache = True
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-def' and value:
+            deffile = value
+        elif key == '-mag' and value:
+            magfile = value
+        elif key == '-lef' and value:
+            leffiles.append(value)
+        elif key == '-output' and value:
+            outfile = value
+        elif key == '-usebox':
+            usebox = True
+        elif key == '-check':
+            checkmode = True
+        elif key == '-nocache':
+            usecache = False
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    deffile = os.path.join(project_path, deffile)
+    magfile = os.path.join(project_path, magfile)
+    for filepath in [deffile, magfile] + leffiles:
+        if not os.path.isfile(filepath):
+            print('Error:  No file ' + filepath + '.')
+            sys.exit(1)
+
+    macros = {}
+    for leffile in leffiles:
+        read_lef(leffile, macros)
+
+    units, components = read_components(deffile)
+    libdir = os.path.dirname(magfile)
+    cells = {}
+    top = mag_index.read_mag(magfile, usecache)
+    cells[os.path.splitext(os.path.basename(magfile))[0]] = top
+    defcells = set(comp['cell'] for comp in components.values())
+    found, unresolved = placements(cells, libdir, top, defcells, macros, usebox)
+    targets = match_components(components, found, units * mag_index.microns(top, 1))
+
+    fixes = {}
+    for name, place in targets.items():
+        comp = components[name]
+        if (comp['origin'], comp['orient']) != place:
+            fixes[name] = place
+            if checkmode:
+                print('Misplaced:  ' + name + ' (' + comp['cell'] + ') at (%g, %g) %s, should be (%g, %g) %s' %
+			(comp['origin'][0] / units, comp['origin'][1] / units, comp['orient'],
+			place[0][0] / units, place[0][1] / units, place[1]))
+
+    unknown = sorted(set(components[name]['cell'] for name in components
+		if name not in targets))
+    print('Components:  ' + str(len(components)) + ', ' + str(len(targets)) +
+		' with a known abutment box, ' + str(len(fixes)) + ' misplaced.')
+    if unknown:
+        print('No abutment box (left unchanged) for cells:  ' + ', '.join(unknown))
+        print('Give the LEF file of these cells (e.g., the PDK I/O cells) with -lef=<file>.')
+    if usebox:
+        approximate = [name for name in targets if components[name]['cell'] not in macros
+		and cells.get(components[name]['cell']) is None]
+        if approximate:
+            print('Warning:  ' + str(len(approximate)) + ' components (' +
+			str(len([name for name in approximate if name in fixes])) +
+			' misplaced) are placed from the bounding box of the cell (-usebox),' +
+			' not its abutment box;  these placements are approximate.',
+			file=sys.stderr)
+    if unresolved:
+        print('Warning:  ' + str(len(unresolved)) + ' instances of cells not found.',
+		file=sys.stderr)
+
+    if not macros:
+        print('Warning:  No LEF macro sizes were read' + (' from ' +
+			', '.join(leffiles) if leffiles else ' (no -lef=<file> given)') +
+			', so the I/O cells cannot be checked or placed;  nothing is changed.',
+			file=sys.stderr)
+        sys.exit(1)
+    if checkmode:
+        sys.exit(1 if fixes else 0)
+    if not fixes and not outfile:
+        print('No changes to ' + deffile + '.')
+        sys.exit(0)
+
+    outfile = outfile or deffile
+    fd, tmpfile = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(outfile)),
+		prefix='.' + os.path.basename(outfile) + '.')
+    os.close(fd)
+    try:
+        rewrite_def(deffile, tmpfile, fixes)
+        os.replace(tmpfile, outfile)
+    except BaseException:
+        if os.path.exists(tmpfile):
+            os.unlink(tmpfile)
+        raise
+    print('Wrote ' + outfile + ' with ' + str(len(fixes)) + ' components moved.')
+    sys.exit(0)
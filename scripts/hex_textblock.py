@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# hex_textblock.py ---
+#
+# Write a magic layout cell drawing a string of hex digits with the
+# glyphs of mag/hexdigits/, painted flat (no glyph subcells), in the
+# same style and spacing as the project ID text block.  This draws any
+# hex string, for example the product ID, which has no text block of
+# its own in the padframe.  The ID text block itself is written flat by
+# set_ids.py (or set_project_id.py) with the "-flatten" option.
+#
+# The positions of the digits are recorded in the "ID_DIGITS" property
+# of the cell, and the cell can be read back with "-decode".
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+
+import id_rom
+
+def usage():
+    print("Usage:")
+    print("hex_textblock.py [<options>] <hex_string> [<project_path>]")
+    print("hex_textblock.py -decode <mag_file> [<project_path>]")
+    print("")
+    print("options:")
+    print("    -output=<file>       write the cell to <file> (default stdout)")
+    print("    -decode              print the hex string drawn by a flattened cell")
+    return 0
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) < 1 or len(arguments) > 2:
+        print('Wrong number of arguments given to hex_textblock.py.')
+        usage()
+        sys.exit(1)
+
+    project_path = arguments[1] if len(arguments) > 1 else os.getcwd()
+    outfile = None
+    decodemode = False
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-output' and value:
+            outfile = value
+        elif key == '-decode':
+            decodemode = True
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    try:
+        glyphs = id_rom.load_glyphs(os.path.join(project_path, id_rom.hexdigits_dir))
+        if decodemode:
+            with open(arguments[0], 'r') as ifile:
+                text, errors = id_rom.decode_flat_text(ifile.read(), glyphs)
+            for error in errors:
+                print('Error:  ' + error)
+            if text is None:
+                sys.exit(1)
+            print(text)
+            sys.exit(0)
+
+        if not re.fullmatch('[0-9A-Fa-f]+', arguments[0]):
+            print('Error:  "' + arguments[0] + '" is not a string of hex digits.')
+            sys.exit(1)
+        magdata = id_rom.text_cell(glyphs, arguments[0])
+    except (OSError, id_rom.IdRomError) as e:
+        print('Error:  ' + str(e))
+        sys.exit(1)
+
+    if outfile:
+        id_rom.write_file(outfile, magdata)
+    else:
+        sys.stdout.write(magdata)
+    sys.exit(0)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+
+#----------------------------------------------------------------------
+#
+# id_daemon.py ---
+#
+# Serve ID programming requests on a local UNIX socket, so that a
+# program that personalizes many projects (or one project many times)
+# does not start an interpreter and read the zero-value templates for
+# every request.  The templates of each project are read on its first
+# request and kept (see id_rom.warm_templates()), so a request costs
+# only the edit and the write of the personalized files.
+#
+# Each request is a line of JSON, and is answered by a line of JSON.
+# A request has the keys:
+#
+#   op:       "program" (the default), "ping" or "stop".
+#   project:  path to the project top level (default the project given
+#             when the daemon was started).  Give absolute paths, as
+#             relative ones are taken from the daemon's directory.
+#   ids:      ID values keyed by info.yaml key, e.g.
+#             {"project_id": "12345678", "product_id": "5A"}.
+#   patch, flatten, output:  as for id_rom.program_ids().
+#
+# The answer to "program" is the result of id_rom.program_ids(), with
+# the time taken in seconds added as "time".  Requests are handled one
+# at a time, in order.  Other programs can use send_request().
+#----------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import socketserver
+
+import id_rom
+
+def usage():
+    print("Usage:")
+    print("id_daemon.py [-socket=<path>] [-profile[=<file>]] [<path_to_project>]")
+    print("id_daemon.py -request=<json> [-socket=<path>] [<path_to_project>]")
+    print("id_daemon.py -stop [-socket=<path>] [<path_to_project>]")
+    print("")
+    print("options:")
+    print("    -socket=<path>   socket to listen on (default <path_to_project>/" +
+		default_socket + ").")
+    print("    -request=<json>  send one request to a running daemon and print")
+    print("                     the answer.")
+    print("    -stop            stop a running daemon.")
+    print("    -profile[=<file>]  write the time and file I/O of each request")
+    print("                     as lines of JSON to <file> (default the standard")
+    print("                     error).")
+    print("")
+    print("  If <path_to_project> is not given, then it is assumed to be the cwd.")
+    return 0
+
+default_socket = '.cache/id_rom.sock'
+
+#----------------------------------------------------------------------
+# Client side:  Send one request and return the answer.
+#----------------------------------------------------------------------
+
+def send_request(sockpath, request):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(sockpath)
+        sock.sendall((json.dumps(request) + '\n').encode())
+        with sock.makefile('rb') as ifile:
+            line = ifile.readline()
+    if not line:
+        raise OSError('No answer from ' + sockpath + '.')
+    return json.loads(line)
+
+#----------------------------------------------------------------------
+# Server side
+#----------------------------------------------------------------------
+
+def handle_request(request, project_path):
+    op = request.get('op', 'program')
+    if op in ('ping', 'stop'):
+        return {'ok': True}
+    elif op != 'program':
+        return {'ok': False, 'errors': [{'code': 'request',
+		'message': 'Unknown operation ' + str(op) + '.'}]}
+
+    project = request.get('project', project_path)
+    start = time.perf_counter()
+    with id_rom.profile_step('total', mode='daemon', project=project):
+        result = id_rom.program_ids(project, request.get('ids', {}),
+		bool(request.get('patch')), bool(request.get('flatten')),
+		request.get('output'))
+    result['time'] = round(time.perf_counter() - start, 6)
+    return result
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            request = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('request is not a JSON object')
+            except ValueError as e:
+                request = None
+                answer = {'ok': False, 'errors': [{'code': 'request',
+			'message': 'Cannot parse request:  ' + str(e)}]}
+            else:
+                try:
+                    answer = handle_request(request, self.server.project_path)
+                except Exception as e:
+                    # Keep serving;  the error is reported to the client
+                    answer = {'ok': False, 'errors': [{'code': 'internal',
+			'message': type(e).__name__ + ':  ' + str(e)}]}
+            self.wfile.write((json.dumps(answer) + '\n').encode())
+            self.wfile.flush()
+            if request and request.get('op') == 'stop':
+                self.server.stopping = True
+                break
+
+# Remove a socket left behind by a daemon that did not exit cleanly.
+# Returns False if a daemon is listening on the socket.
+
+def clear_socket(sockpath):
+    if not os.path.exists(sockpath):
+        return True
+    try:
+        send_request(sockpath, {'op': 'ping'})
+        return False
+    except (OSError, ValueError):
+        os.unlink(sockpath)
+        return True
+
+def serve(project_path, sockpath):
+    os.makedirs(os.path.dirname(os.path.abspath(sockpath)), exist_ok=True)
+    if not clear_socket(sockpath):
+        print('Error:  A daemon is already listening on ' + sockpath + '.')
+        return 1
+
+    # Read the templates of the default project before the first request
+    if os.path.isdir(project_path):
+        id_rom.warm_templates(project_path, list(id_rom.roms))
+
+    # Only the owner may connect
+    umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(sockpath, RequestHandler)
+    finally:
+        os.umask(umask)
+    server.project_path = project_path
+    server.stopping = False
+
+    def terminate(signum, frame):
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, terminate)
+
+    print('Listening on ' + sockpath + '.')
+    sys.stdout.flush()
+    try:
+        while not server.stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(sockpath):
+            os.unlink(sockpath)
+    return 0
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > 1:
+        print("Wrong number of arguments given to id_daemon.py.")
+        usage()
+        sys.exit(1)
+
+    project_path = arguments[0] if arguments else os.getcwd()
+    sockpath = None
+    request = None
+
+    for option in optionlist:
+        optname = option[1:].split('=', 1)[0]
+        optvalue = option.split('=', 1)[1] if '=' in option else None
+        if optname == 'socket' and optvalue:
+            sockpath = optvalue
+        elif optname == 'request' and optvalue:
+            try:
+                request = json.loads(optvalue)
+            except ValueError as e:
+                print('Error:  Cannot parse request:  ' + str(e))
+                sys.exit(1)
+        elif option == '-stop':
+            request = {'op': 'stop'}
+        elif optname == 'profile':
+            id_rom.profile_enable(optvalue or '-')
+        else:
+            print('Unknown option ' + option + '.')
+            usage()
+            sys.exit(1)
+
+    if not sockpath:
+        sockpath = os.path.join(project_path, default_socket)
+
+    if request is not None:
+        try:
+            answer = send_request(sockpath, request)
+        except (OSError, ValueError) as e:
+            print('Error:  Cannot reach daemon on ' + sockpath + ':  ' + str(e))
+            sys.exit(1)
+        print(json.dumps(answer, indent=1))
+        sys.exit(0 if answer.get('ok') else 1)
+
+    sys.exit(serve(project_path, sockpath))
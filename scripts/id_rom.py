@@ -0,0 +1,2157 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# id_rom.py ---
+#
+# Routines shared by set_project_id.py, set_product_id.py and
+# set_ids.py for programming the project ID and product ID ROM blocks.
+# The programming routines operate on file contents held in memory and
+# return the modified contents, so that a set of zero-value templates
+# can be read once and used to generate any number of personalized
+# copies.  Each ROM is described by an entry in the "roms" table below,
+# and all ROMs are programmed together in one pass over each file.
+#
+# Other programs can import this module and call program_ids(), which
+# returns a result dictionary with structured errors in place of the
+# messages and exit status of the scripts.  id_daemon.py serves the same
+# call over a local socket.
+#
+# See set_project_id.py for the layout map of the ROM vias.
+#----------------------------------------------------------------------
+
+import os
+import sys
+import re
+import json
+import hashlib
+import mmap
+import shutil
+import tempfile
+import time
+import contextlib
+import concurrent.futures
+
+import id_store
+import verilog_index
+from index_cache import file_hash
+
+# Coordinate pairs in microns for the zero position on each bit
+project_id_coords = (
+	(2.870, 3.910), (2.870, 9.430), (4.250, 3.910), (4.250, 9.430),
+	(5.630, 3.910), (5.630, 9.430), (7.010, 3.910), (7.010, 9.430),
+	(8.390, 3.910), (8.390, 9.430), (9.770, 3.910), (9.770, 9.430),
+	(12.070, 3.910), (12.070, 9.430), (13.450, 3.910), (13.450, 9.430),
+	(14.830, 3.910), (14.830, 9.430), (16.670, 3.910), (16.670, 9.430),
+	(18.050, 3.910), (18.050, 9.430), (19.430, 3.910), (19.430, 9.430),
+	(20.810, 3.910), (20.810, 9.430), (22.190, 3.910), (22.190, 9.430),
+	(24.030, 3.910), (24.030, 9.430), (25.410, 3.910), (25.410, 9.430))
+
+product_id_coords = (
+	(2.870, 3.910), (4.250, 3.910), (5.630, 3.910), (7.010, 3.910),
+	(8.390, 3.910), (9.770, 3.910), (12.070, 3.910), (13.450, 3.910))
+
+class IdRomError(Exception):
+    pass
+
+#----------------------------------------------------------------------
+# Convert a hex string to an integer and a string of bits, LSB first.
+# Raises ValueError if the string is not a valid hex number that fits
+# in the given number of bits.
+#----------------------------------------------------------------------
+
+def parse_id(value, width):
+    id_int = int('0x' + value, 0)
+    if id_int < 0 or id_int >= (1 << width):
+        raise ValueError('ID value ' + value + ' does not fit in ' + str(width) + ' bits')
+    id_bits = '{0:0{1}b}'.format(id_int, width)[::-1]
+    return id_int, id_bits
+
+#----------------------------------------------------------------------
+# Return the via rectangle for a bit in magic internal units (200 per
+# micron), in either the zero position or the one position.
+# Contact is 0.17 x 0.17, so add and subtract 0.085 to get the corner
+# positions.  For "one" bits, the X position is moved 0.69 microns to
+# the left.
+#----------------------------------------------------------------------
+
+def via_rect(coords, one=False):
+    xum, yum = coords
+    xllum = xum - 0.085
+    yllum = yum - 0.085
+    xurum = xum + 0.085
+    yurum = yum + 0.085
+    if one:
+        xllum -= 0.69
+        xurum -= 0.69
+
+    return (int(round(xllum * 200)), int(round(yllum * 200)),
+		int(round(xurum * 200)), int(round(yurum * 200)))
+
+#----------------------------------------------------------------------
+# Index the rectangles of a magic database by layer and by exact
+# coordinates.  The index maps layer name to a dictionary that maps
+# the coordinate tuple (xll, yll, xur, yur) to a list of the (start,
+# end) offsets of the coordinate text on each "rect" line having those
+# coordinates.  Only the paint sections are indexed.  Indexes are kept
+# in a small cache keyed by the file contents, so that programming
+# many IDs from the same template parses the template only once.
+#----------------------------------------------------------------------
+
+rectrex = re.compile(r'^(?:<< ([^ ]+) >>|rect (-?\d+) (-?\d+) (-?\d+) (-?\d+))$', re.M)
+
+rect_index_cache = {}
+
+def index_rects(magdata):
+    index = rect_index_cache.get(magdata)
+    if index is not None:
+        return index
+
+    index = {}
+    layerdict = None
+    for rmatch in rectrex.finditer(magdata):
+        if rmatch.group(1):
+            layerdict = index.setdefault(rmatch.group(1), {})
+        elif layerdict is not None:
+            rect = tuple(int(rmatch.group(i)) for i in range(2, 6))
+            layerdict.setdefault(rect, []).append((rmatch.start(2), rmatch.end(5)))
+
+    if len(rect_index_cache) >= 8:
+        rect_index_cache.clear()
+    rect_index_cache[magdata] = index
+    return index
+
+#----------------------------------------------------------------------
+# Replace text at a set of (start, end, text) positions in one pass.
+#----------------------------------------------------------------------
+
+def splice(data, edits):
+    parts = []
+    last = 0
+    for start, end, text in sorted(edits):
+        parts.append(data[last:start])
+        parts.append(text)
+        last = end
+    parts.append(data[last:])
+    return ''.join(parts)
+
+#----------------------------------------------------------------------
+# Instrumentation:  When enabled by the "-profile" option or by the
+# ID_ROM_PROFILE environment variable (naming the output file, or "-"
+# for the standard error), each step records its wall time, the bytes
+# read and written and the files touched, and writes the record as one
+# line of JSON when the step ends.  Steps may be nested;  the counts of
+# a step are included in those of the step enclosing it.  Records are
+# written with a single append, so that worker processes in batch mode
+# can share the output file.  When not enabled, the cost is one test
+# per step and per file access.
+#----------------------------------------------------------------------
+
+profile_env = 'ID_ROM_PROFILE'
+profile_path = os.environ.get(profile_env) or None
+profile_fd = None
+profile_pid = None
+profile_current = None
+
+def profile_enable(path):
+    global profile_path
+    profile_path = path
+    # Pass the setting on to any worker processes
+    os.environ[profile_env] = path
+
+# Record a file access in the current step.
+
+def profile_io(filepath, read=0, written=0):
+    if profile_current is None:
+        return
+    profile_current['read_bytes'] += read
+    profile_current['written_bytes'] += written
+    profile_current['files'].add(filepath)
+
+def profile_write(record):
+    global profile_fd, profile_pid
+    line = (json.dumps(record, sort_keys=True) + '\n').encode()
+    if profile_path == '-':
+        sys.stderr.flush()
+        os.write(sys.stderr.fileno(), line)
+        return
+    if profile_fd is None or profile_pid != os.getpid():
+        profile_fd = os.open(profile_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        profile_pid = os.getpid()
+    os.write(profile_fd, line)
+
+# Context manager timing one step.  Keyword arguments are added to the
+# record of the step and of the steps nested in it (e.g., the path of
+# the tree being written).
+
+@contextlib.contextmanager
+def profile_step(name, **context):
+    global profile_current
+    if profile_path is None:
+        yield
+        return
+    outer = profile_current
+    if outer is not None:
+        context = dict(outer['context'], **context)
+    record = {'read_bytes': 0, 'written_bytes': 0, 'files': set(), 'context': context}
+    profile_current = record
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start
+        profile_current = outer
+        if outer is not None:
+            outer['read_bytes'] += record['read_bytes']
+            outer['written_bytes'] += record['written_bytes']
+            outer['files'].update(record['files'])
+        record.update(record.pop('context'))
+        record.update({'step': name, 'wall': round(wall, 6), 'pid': os.getpid(),
+		'files': sorted(record['files'])})
+        profile_write(record)
+
+#----------------------------------------------------------------------
+# Step 1:  Move the via for each "one" bit in the ROM layout.
+# "magdata" is the zero-value layout.  Returns the programmed layout.
+# The via must appear exactly once on "layer" in the zero position and
+# the one position must be empty, or else the bit is rejected.
+#----------------------------------------------------------------------
+
+def program_layout(magdata, coords, id_bits, debugmode=False, layer='viali'):
+    vias = index_rects(magdata).get(layer, {})
+    errors = []
+    edits = []
+    for i in range(0, len(coords)):
+        # Ignore any zero bits.
+        if id_bits[i] == '0':
+            continue
+
+        oldrect = via_rect(coords[i])
+        newrect = via_rect(coords[i], True)
+
+        # Diagnostic
+        if debugmode:
+            print('Bit ' + str(i) + ':')
+            print('Old rect = "' + layer + ' {0} {1} {2} {3}"'.format(*oldrect))
+            print('New rect = "' + layer + ' {0} {1} {2} {3}"'.format(*newrect))
+
+        positions = vias.get(oldrect, [])
+        if len(positions) == 0:
+            errors.append('via not found for bit position ' + str(i))
+        elif len(positions) > 1 or newrect in vias:
+            errors.append('ambiguous via for bit position ' + str(i))
+        else:
+            start, end = positions[0]
+            edits.append((start, end, '{0} {1} {2} {3}'.format(*newrect)))
+
+    if errors:
+        raise IdRomError('; '.join(errors))
+    return splice(magdata, edits)
+
+#----------------------------------------------------------------------
+# Step 2:  Set the value of the ID parameters in the RTL top level.
+# The hex digits of each parameter (e.g., "PROJECT_ID") are located by
+# their [offset, length] in the file, keyed by parameter name, and are
+# all replaced in one pass.  The scan for the parameters is cheaper
+# than loading and refreshing a cached position would be;  patch mode
+# keeps the byte offsets of its fields (see scan_fields()).
+#----------------------------------------------------------------------
+
+def rtl_fields(vdata):
+    fields = {}
+    for rom in roms.values():
+        idrex = re.compile('parameter ' + rom['param'] + ' = ' +
+		str(rom['width']) + "'h([0-9A-F]+);")
+        imatch = idrex.search(vdata)
+        if imatch:
+            fields[rom['param']] = [imatch.start(1), len(imatch.group(1))]
+    return fields
+
+# Set the ID parameters named in "values" (a dictionary of hex strings
+# keyed by parameter name) at the positions "fields".
+
+def set_rtl_parameters(vdata, values, fields):
+    edits = []
+    for param, id_value in values.items():
+        if param not in fields:
+            raise IdRomError('No parameter ' + param + ' found in ' + rtl_top + '.')
+        offset, length = fields[param]
+        edits.append((offset, offset + length, id_value))
+    return splice(vdata, edits)
+
+#----------------------------------------------------------------------
+# Step 3:  Generate the gate-level netlist of a ROM from the structure
+# of its RTL module (verilog/rtl/<cell>.v):  the array of conb_1 cells
+# and the decap cells.  The conb_1 cell of each bit drives the output
+# bit from its HI output for a "one" bit and from its LO output for a
+# "zero" bit, and its other output is left on the "high" or "low" wire
+# of the RTL.  A template is made once for each RTL source, holding the
+# text of each conb_1 instance for both values of its bit, so that the
+# netlist for any ID is made by joining the pieces.
+#----------------------------------------------------------------------
+
+gl_template_cache = {}
+
+def gl_template(vdata, name):
+    key = (name, vdata)
+    template = gl_template_cache.get(key)
+    if template is not None:
+        return template
+
+    rom = roms[name]
+    module = verilog_index.parse_verilog_text(vdata).get(rom['cell'])
+    if module is None:
+        raise IdRomError('No module ' + rom['cell'] + ' found.')
+    power = [port for port in module['ports']
+		if module['portinfo'][port]['direction'] == 'inout']
+
+    # The constant cell array is the instance driving the "low" wire
+    conb = None
+    for inst in module['instances']:
+        if rom['lowname'] in inst['connections'].values():
+            conb = inst
+    if conb is None or conb['range'] is None:
+        raise IdRomError('No array of cells driving ' + rom['lowname'] + ' found.')
+    lopin = [pin for pin, net in conb['connections'].items() if net == rom['lowname']][0]
+    hipins = [pin for pin, net in conb['connections'].items()
+		if pin != lopin and net in module['wires']]
+    width = abs(conb['range'][0] - conb['range'][1]) + 1
+    if len(hipins) != 1 or width != rom['width']:
+        raise IdRomError('Instance ' + conb['name'] + ' is not an array of ' +
+		str(rom['width']) + ' constant cells.')
+    hipin = hipins[0]
+    highname = conb['connections'][hipin]
+    signal = rom['signal']
+
+    def power_pins(inst, last):
+        pins = ['        .' + pin + '(' + net + ')' for pin, net in
+		sorted(inst['connections'].items()) if net in power]
+        if not pins:
+            return []
+        return ['`ifdef USE_POWER_PINS', ',\n'.join(pins) + ('' if last else ','), '`endif']
+
+    def instances(inst):
+        if inst['range'] is None:
+            return [inst['name']]
+        low = min(inst['range'])
+        return ['\\' + inst['name'] + '[' + str(low + i) + '] '
+		for i in range(abs(inst['range'][0] - inst['range'][1]) + 1)]
+
+    # Header:  the comments ahead of the module (the license) and the
+    # port and wire declarations
+
+    lines = []
+    for line in vdata.splitlines():
+        if not line.startswith('//'):
+            break
+        lines.append(line)
+    lines.append('')
+    lines.append('// Gate-level netlist of ' + rom['cell'] + ' for ' + rom['param'] +
+		' = ' + str(rom['width']) + "'h")
+    head = '\n'.join(lines)
+    lines = ['', '// generated by id_rom.py from verilog/rtl/' + rom['cell'] + '.v.', '',
+		'`default_nettype none', 'module ' + rom['cell'] + ' (']
+    if power:
+        lines.extend(['`ifdef USE_POWER_PINS'] + ['    ' + port + ',' for port in power] +
+		['`endif'])
+    ports = [port for port in module['ports'] if port not in power]
+    lines.extend(['    ' + port + (',' if i < len(ports) - 1 else '')
+		for i, port in enumerate(ports)])
+    lines.append(');')
+
+    def declaration(kind, name, wrange):
+        return '    ' + kind + ' ' + ('[' + str(wrange[0]) + ':' + str(wrange[1]) + '] '
+		if wrange else '') + name + ';'
+
+    if power:
+        lines.extend(['`ifdef USE_POWER_PINS'] + [declaration(module['portinfo'][port]['direction'],
+		port, None) for port in power] + ['`endif'])
+    for port in ports:
+        info = module['portinfo'][port]
+        lines.append(declaration(info['direction'], port, info['range']))
+    lines.append('')
+    for wire, wrange in module['wires'].items():
+        lines.append(declaration('wire', wire, wrange))
+    lines.append('')
+    postvalue = '\n'.join(lines) + '\n'
+
+    # One instance of the constant cell array per bit, for each value
+
+    bits = []
+    for i, instname in enumerate(instances(conb)):
+        pieces = []
+        for one in (False, True):
+            hinet = signal if one else highname
+            lonet = rom['lowname'] if one else signal
+            lines = ['    ' + conb['cell'] + ' ' + instname + ' (']
+            lines.extend(power_pins(conb, False))
+            lines.append('        .' + hipin + '(' + hinet + '[' + str(i) + ']),')
+            lines.append('        .' + lopin + '(' + lonet + '[' + str(i) + '])')
+            lines.append('    );')
+            pieces.append('\n'.join(lines) + '\n')
+        bits.append(tuple(pieces))
+
+    # All other instances (the decap cells) are copied with their
+    # power connections
+
+    lines = []
+    for inst in module['instances']:
+        if inst is conb:
+            continue
+        for instname in instances(inst):
+            lines.append('    ' + inst['cell'] + ' ' + instname + ' (')
+            lines.extend(power_pins(inst, True))
+            lines.append('    );')
+    lines.extend(['', 'endmodule', '`default_nettype wire'])
+    tail = '\n' + '\n'.join(lines) + '\n'
+
+    template = {'head': head, 'postvalue': postvalue, 'bits': bits, 'tail': tail}
+    if len(gl_template_cache) >= 8:
+        gl_template_cache.clear()
+    gl_template_cache[key] = template
+    return template
+
+def program_gl_netlist(vdata, name, id_value):
+    template = gl_template(vdata, name)
+    id_bits = parse_id(id_value, roms[name]['width'])[1]
+    return template['head'] + id_value + template['postvalue'] + \
+		''.join(template['bits'][i][id_bits[i] == '1'] for i in range(0, len(id_bits))) + \
+		template['tail']
+
+#----------------------------------------------------------------------
+# Step 4:  Point each "alphaX_n" digit of the ID text block at the
+# hex digit glyph cell for the corresponding digit of the ID value.
+# Digit 0 is the least significant digit.
+#----------------------------------------------------------------------
+
+def program_textblock(magdata, id_value):
+    ndigits = len(id_value)
+    outlines = []
+    digit = 0
+    wasseen = {}
+    for line in magdata.splitlines():
+        if 'alphaX_' in line and digit < ndigits:
+            dchar = id_value[ndigits - 1 - digit].upper()
+            oline = re.sub('alpha_[0-9A-F]', 'alpha_' + dchar, line)
+            # Add path reference if cell was not previously found in the file
+            if dchar not in wasseen:
+                if 'hexdigits' not in oline:
+                    oline += ' hexdigits'
+            outlines.append(oline)
+            wasseen[dchar] = True
+            digit += 1
+        else:
+            outlines.append(line)
+
+    if digit == 0:
+        raise IdRomError('No digits were replaced in the layout.')
+    elif digit < ndigits:
+        raise IdRomError('Only ' + str(digit) + ' digits were replaced in the layout.')
+    return '\n'.join(outlines) + '\n'
+
+#----------------------------------------------------------------------
+# ROM descriptors.  Each entry describes one ID ROM block in the
+# padframe;  adding another ROM requires only a new entry here.
+#
+#   key:        key holding the ID value in the project info.yaml file
+#   label:      description used in messages
+#   width:      number of bits in the ID
+#   param:      name of the ID parameter in the RTL top level
+#   coords:     coordinate table of the via zero positions
+#   layer:      magic layer of the programming vias
+#   gdslayer:   GDS (layer, datatype) of the programming via cuts
+#   cell:       name of the ROM cell (mag/<cell>.mag, verilog/rtl/<cell>.v,
+#               and the generated verilog/gl/<cell>.v)
+#   signal:     name of the ROM output bus
+#   lowname:    name of the wire connected to the LO outputs in the RTL
+#   textblock:  name of the layout cell displaying the ID, or None
+#----------------------------------------------------------------------
+
+roms = {
+    'project': {
+	'key': 'project_id',
+	'label': 'project ID',
+	'width': 32,
+	'param': 'PROJECT_ID',
+	'coords': project_id_coords,
+	'layer': 'viali',
+	'gdslayer': (67, 44),
+	'cell': 'project_id_rom_32bit',
+	'signal': 'project_id',
+	'lowname': 'proj_id_low',
+	'textblock': 'project_id_textblock',
+    },
+    'product': {
+	'key': 'product_id',
+	'label': 'product ID',
+	'width': 8,
+	'param': 'PRODUCT_ID',
+	'coords': product_id_coords,
+	'layer': 'viali',
+	'gdslayer': (67, 44),
+	'cell': 'product_id_rom_8bit',
+	'signal': 'product_id',
+	'lowname': 'prod_id_low',
+	'textblock': None,
+    },
+}
+
+# The RTL top level holding the ID parameters of all ROMs
+rtl_top = 'verilog/rtl/panamax.v'
+
+# Format an ID value as a hex string of the full width of the ROM.
+
+def format_id(name, id_int):
+    return '{0:0{1}X}'.format(id_int, roms[name]['width'] // 4)
+
+#----------------------------------------------------------------------
+# Return the files that are read for programming the named ROMs, as a
+# dictionary keyed by the path of the programmed file relative to the
+# project top level.  Each value is a list of the files to read, in
+# order of preference (the zero-value backup of a ROM layout is used
+# in preference to the layout itself, and the gate-level netlist is
+# made from the RTL module of the ROM).
+#----------------------------------------------------------------------
+
+def template_sources(names):
+    sources = {}
+    for name in names:
+        rom = roms[name]
+        magfile = 'mag/' + rom['cell'] + '.mag'
+        sources[magfile] = ['mag/' + rom['cell'] + '_zero.mag', magfile]
+        # The gate-level netlist is generated from the RTL module
+        sources['verilog/gl/' + rom['cell'] + '.v'] = ['verilog/rtl/' + rom['cell'] + '.v']
+        if rom['textblock']:
+            tbfile = 'mag/' + rom['textblock'] + '.mag'
+            sources[tbfile] = ['mag/' + rom['textblock'] + '_zero.mag', tbfile]
+    sources[rtl_top] = [rtl_top]
+    return sources
+
+def read_templates(project_path, names, targets=None):
+    templates = {}
+    with profile_step('read'):
+        for target, sources in template_sources(names).items():
+            if targets is not None and target not in targets:
+                continue
+            for source in sources:
+                sourcepath = os.path.join(project_path, source)
+                if os.path.isfile(sourcepath):
+                    with open(sourcepath, 'r') as ifile:
+                        templates[target] = ifile.read()
+                    profile_io(sourcepath, read=len(templates[target]))
+                    break
+    return templates
+
+#----------------------------------------------------------------------
+# Templates kept between calls, for a long-running process (see
+# id_daemon.py).  The cache is keyed by project path and by target, and
+# holds the size and modification time of each source file up to the
+# one that was read, so that a target is read again only when a
+# preferred source appears or the source read has changed.  Files that
+# this process writes itself are put back in the cache with their new
+# contents, so programming a project in place does not make its RTL top
+# level (which is its own template) be read again.  At most 8 projects
+# are kept.
+#----------------------------------------------------------------------
+
+template_cache = {}
+
+def source_stats(project_path, sources):
+    stats = []
+    for source in sources:
+        try:
+            st = os.stat(os.path.join(project_path, source))
+        except OSError:
+            stats.append(None)
+            continue
+        stats.append((st.st_size, st.st_mtime_ns))
+        break
+    return stats
+
+def warm_templates(project_path, names):
+    key = os.path.abspath(project_path)
+    if key not in template_cache and len(template_cache) >= 8:
+        template_cache.clear()
+    cache = template_cache.setdefault(key, {})
+    templates = {}
+    for target, sources in template_sources(names).items():
+        stats = source_stats(project_path, sources)
+        entry = cache.get(target)
+        if entry is None or entry['stats'] != stats:
+            data = None
+            if stats[-1] is not None:
+                sourcepath = os.path.join(project_path, sources[len(stats) - 1])
+                with profile_step('read'):
+                    with open(sourcepath, 'r') as ifile:
+                        data = ifile.read()
+                    profile_io(sourcepath, read=len(data))
+            entry = {'stats': stats, 'data': data}
+            cache[target] = entry
+        if entry['data'] is not None:
+            templates[target] = entry['data']
+    return templates
+
+# Record the files of a project written from "outputs" that are their
+# own templates.
+
+def refresh_templates(project_path, names, outputs):
+    cache = template_cache.get(os.path.abspath(project_path))
+    if cache is None:
+        return
+    for target, sources in template_sources(names).items():
+        if target in outputs:
+            stats = source_stats(project_path, sources)
+            if len(stats) == len(sources) and sources[-1] == target:
+                cache[target] = {'stats': stats, 'data': outputs[target]}
+
+#----------------------------------------------------------------------
+# Compute the programmed contents of every file for a set of ID values.
+# "ids" is a dictionary of ID values (integers) keyed by ROM name.
+# Every ROM is programmed in a single pass over each file, so that the
+# RTL top level is processed only once no matter how many ROMs are set.
+# "log", if given, is called with a progress message for each step.
+# If "glyphs" (see load_glyphs()) is given, the text blocks are written
+# flattened.  If "targets" is given, only the files it lists are made.
+# Returns a dictionary of file contents keyed by relative path.
+#----------------------------------------------------------------------
+
+def personalize(templates, ids, debugmode=False, log=None, glyphs=None, targets=None):
+    names = [name for name in roms if name in ids]
+    labels = ' and '.join(roms[name]['label'] for name in names)
+    outputs = {}
+
+    for name in names:
+        if ids[name] == 0:
+            raise IdRomError('Value zero is an invalid ' + roms[name]['label'] + '.')
+
+    def get_template(target):
+        if target not in templates:
+            raise IdRomError('No file ' + target + ' found.')
+        return templates[target]
+
+    def wanted(target):
+        return targets is None or target in targets
+
+    if log:
+        log('Step 1:  Modify layout of the ' + ' and '.join(roms[name]['cell']
+		for name in names) + ' subcell' + ('s' if len(names) > 1 else ''))
+    with profile_step('layout'):
+        for name in names:
+            rom = roms[name]
+            target = 'mag/' + rom['cell'] + '.mag'
+            if not wanted(target):
+                continue
+            id_bits = parse_id(format_id(name, ids[name]), rom['width'])[1]
+            try:
+                outputs[target] = program_layout(get_template(target), rom['coords'],
+			id_bits, debugmode, rom['layer'])
+            except IdRomError as e:
+                raise IdRomError(target + ': ' + str(e))
+
+    if log:
+        log('Step 2:  Add ' + labels + ' parameter to source verilog.')
+    with profile_step('rtl'):
+        if wanted(rtl_top):
+            vdata = get_template(rtl_top)
+            outputs[rtl_top] = set_rtl_parameters(vdata, dict((roms[name]['param'],
+			format_id(name, ids[name])) for name in names),
+			rtl_fields(vdata))
+
+    if log:
+        log('Step 3:  Generate ' + labels + ' gate-level verilog.')
+    with profile_step('gl'):
+        for name in names:
+            rom = roms[name]
+            target = 'verilog/gl/' + rom['cell'] + '.v'
+            if not wanted(target):
+                continue
+            if target not in templates:
+                if log:
+                    log('No file verilog/rtl/' + rom['cell'] + '.v found;  skipping.')
+                continue
+            try:
+                outputs[target] = program_gl_netlist(templates[target], name,
+			format_id(name, ids[name]))
+            except IdRomError as e:
+                raise IdRomError('verilog/rtl/' + rom['cell'] + '.v: ' + str(e))
+
+    textnames = [name for name in names if roms[name]['textblock']]
+    if textnames:
+        if log:
+            log('Step 4:  Add ' + ' and '.join(roms[name]['label']
+			for name in textnames) + ' text to top level layout.')
+        with profile_step('textblock'):
+            for name in textnames:
+                rom = roms[name]
+                target = 'mag/' + rom['textblock'] + '.mag'
+                if not wanted(target):
+                    continue
+                outputs[target] = program_textblock(get_template(target),
+			format_id(name, ids[name]))
+                if glyphs:
+                    outputs[target] = flatten_textblock(outputs[target], glyphs)
+
+    return outputs
+
+#----------------------------------------------------------------------
+# Write a file only if its contents differ from "data", so that files
+# (and their modification times) are left untouched when programming
+# is repeated with the same values.  The file is written to a temporary
+# file in the same directory and renamed into place, so that it is never
+# seen partially written.  Returns True if the file was written.
+#----------------------------------------------------------------------
+
+def write_file(filepath, data):
+    bdata = data.encode()
+    try:
+        if os.path.getsize(filepath) == len(bdata):
+            with open(filepath, 'rb') as ifile:
+                profile_io(filepath, read=len(bdata))
+                if ifile.read() == bdata:
+                    return False
+    except OSError:
+        pass
+
+    dirname = os.path.dirname(filepath) or '.'
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmppath = tempfile.mkstemp(dir=dirname,
+		prefix='.' + os.path.basename(filepath) + '.')
+    try:
+        with os.fdopen(fd, 'wb') as ofile:
+            ofile.write(bdata)
+        if os.path.exists(filepath) and os.stat(filepath).st_nlink == 1:
+            shutil.copymode(filepath, tmppath)
+        else:
+            # New file, or a link to a shared (read-only) store object
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmppath, 0o666 & ~umask)
+        os.replace(tmppath, filepath)
+        profile_io(filepath, written=len(bdata))
+    except BaseException:
+        if os.path.exists(tmppath):
+            os.unlink(tmppath)
+        raise
+    return True
+
+# Write the personalized files under "output_dir".  Returns the list of
+# files that were changed.
+
+def write_outputs(output_dir, outputs):
+    changed = []
+    with profile_step('write'):
+        for target, data in outputs.items():
+            if write_file(os.path.join(output_dir, target), data):
+                changed.append(target)
+    return changed
+
+#----------------------------------------------------------------------
+# Program the named ROMs of a project in place.  The zero-value layout
+# of each ROM is saved as <cell>_zero.mag the first time it is
+# programmed (see zero_template()), and every later run programs from
+# it, so the result depends only on the ID values.  The gate-level
+# netlist of each ROM is generated from its RTL module.
+# With "flatten", the text block is written with the glyph paint in
+# place of the glyph cells (see flatten_textblock()), and its original
+# is kept as <textblock>_zero.mag in the same way.  Returns the list of
+# files that were changed.
+#----------------------------------------------------------------------
+
+def flatten_glyphs(project_path, flatten):
+    return load_glyphs(os.path.join(project_path, hexdigits_dir)) if flatten else None
+
+#----------------------------------------------------------------------
+# Return the zero-value contents of a ROM layout ("kind" "layout") or of
+# an unflattened ID text block ("kind" "textblock"), to be kept as its
+# _zero.mag template:  the file itself if it holds the value zero, and
+# otherwise the file with each via moved back to its zero position or
+# each digit pointed back at the "0" glyph.  Raises IdRomError if the
+# file cannot be decoded.
+#----------------------------------------------------------------------
+
+def zero_template(magdata, kind, name):
+    if kind == 'layout':
+        value, errors = decode_layout(magdata, name)
+        if value is None:
+            raise IdRomError('; '.join(errors))
+        if value == 0:
+            return magdata
+        rom = roms[name]
+        vias = index_rects(magdata).get(rom['layer'], {})
+        edits = []
+        for coords in rom['coords']:
+            for start, end in vias.get(via_rect(coords, True), []):
+                edits.append((start, end, '{0} {1} {2} {3}'.format(*via_rect(coords))))
+        return splice(magdata, edits)
+
+    value, errors = decode_textblock(magdata, name)
+    if value is None:
+        raise IdRomError('; '.join(errors))
+    if value == 0:
+        return magdata
+    edits = []
+    for n, gmatch in enumerate(glyphrex.finditer(magdata)):
+        edits.append((gmatch.start(1), gmatch.end(1), '0'))
+        # Only the first use of the glyph cell gives its path
+        rest = gmatch.group(3).replace(' hexdigits', '')
+        edits.append((gmatch.start(3), gmatch.end(3), rest + (' hexdigits' if n == 0 else '')))
+    return splice(magdata, edits)
+
+# Keep the zero-value copy <cell>_zero.mag of a layout of a project, if
+# there is none yet.  Returns True if the copy was made.
+
+def keep_zero_template(project_path, target, kind, name):
+    filepath = os.path.join(project_path, target)
+    backup = filepath[:-4] + '_zero.mag'
+    if os.path.isfile(backup) or not os.path.isfile(filepath):
+        return False
+    with open(filepath, 'r') as ifile:
+        magdata = ifile.read()
+    profile_io(filepath, read=len(magdata))
+    try:
+        zdata = zero_template(magdata, kind, name)
+    except IdRomError as e:
+        raise IdRomError(target + ':  cannot make the zero-value copy ' +
+		os.path.basename(backup) + ':  ' + str(e))
+    write_file(backup, zdata)
+    profile_io(backup, written=len(zdata))
+    return True
+
+# "templates", if given, are the zero-value templates already read from
+# the project (see warm_templates()).
+
+def program_project(project_path, ids, debugmode=False, log=None, flatten=False,
+		templates=None):
+    for subdir in ('verilog', 'mag'):
+        if not os.path.isdir(os.path.join(project_path, subdir)):
+            raise IdRomError('No directory ' + os.path.join(project_path, subdir) + ' found.')
+
+    names = [name for name in roms if name in ids]
+    created = False
+    for name in names:
+        targets = [('mag/' + roms[name]['cell'] + '.mag', 'layout')]
+        if flatten and roms[name]['textblock']:
+            targets.append(('mag/' + roms[name]['textblock'] + '.mag', 'textblock'))
+        for target, kind in targets:
+            if keep_zero_template(project_path, target, kind, name):
+                created = True
+    if templates is None:
+        templates = read_templates(project_path, names)
+    elif created:
+        templates = warm_templates(project_path, names)
+    outputs = personalize(templates, ids, debugmode, log,
+		flatten_glyphs(project_path, flatten))
+
+    changed = write_outputs(project_path, outputs)
+    refresh_templates(project_path, names, outputs)
+    write_id_manifest(project_path, ids, outputs)
+    return changed
+
+#----------------------------------------------------------------------
+# Patch mode:  Change the ID values of an already-programmed project
+# by rewriting only the bytes of the fields that hold the ID, in place
+# through mmap.  The fields are:  the hex digits of each ID parameter
+# in the RTL top level, the coordinates of each via rect in the ROM
+# layouts, and the glyph character of each digit in the text block.
+#
+# The byte offsets of the fields are found by scanning each file once
+# and are kept in a cache file in the project, keyed by file size and
+# modification time, together with a hash of the file with its fields
+# removed.  The contents of each field are checked before it is
+# overwritten, and the file is rescanned if the check fails.  A file is
+# rewritten in full (as in program_project()) only when a new field
+# value does not have the same length as the old one.  The gate-level
+# netlists are generated from their RTL modules (see gl_template()),
+# and the manifest records each patched file by the hash of the file
+# without its fields and by the patched field values, so that no file
+# is read in full once its fields are known.
+#----------------------------------------------------------------------
+
+field_cache_file = '.cache/id_fields.json'
+
+# Return the list of (target, kind, name) for the files patched when
+# programming the named ROMs.  "kind" selects the field scanner.
+
+def patch_targets(names):
+    targets = []
+    for name in names:
+        rom = roms[name]
+        targets.append(('mag/' + rom['cell'] + '.mag', 'layout', name))
+        if rom['textblock']:
+            targets.append(('mag/' + rom['textblock'] + '.mag', 'textblock', name))
+    targets.append((rtl_top, 'rtl', None))
+    return targets
+
+#----------------------------------------------------------------------
+# Scan the contents of a file (decoded as latin-1, so that character
+# offsets are byte offsets) for the ID fields.  Returns a dictionary
+# mapping field name to [offset, length] (plus, for text block digits,
+# a flag indicating whether the line gives the "hexdigits" path).
+#----------------------------------------------------------------------
+
+glyphrex = re.compile(r'^use alpha_([0-9A-F]) +alphaX_([0-9]+)(.*)$', re.M)
+
+def scan_fields(data, kind, name):
+    fields = {}
+    if kind == 'rtl':
+        fields = rtl_fields(data)
+    elif kind == 'layout':
+        rom = roms[name]
+        vias = index_rects(data).get(rom['layer'], {})
+        for i in range(0, len(rom['coords'])):
+            positions = vias.get(via_rect(rom['coords'][i]), []) + \
+			vias.get(via_rect(rom['coords'][i], True), [])
+            if len(positions) == 1:
+                start, end = positions[0]
+                fields['bit' + str(i)] = [start, end - start]
+    elif kind == 'textblock':
+        for gmatch in glyphrex.finditer(data):
+            fields['digit' + gmatch.group(2)] = [gmatch.start(1), 1,
+			'hexdigits' in gmatch.group(3)]
+    return fields
+
+# Return the new contents of each field for a set of ID values.
+
+def field_values(kind, name, ids):
+    values = {}
+    if kind == 'rtl':
+        for rname in ids:
+            values[roms[rname]['param']] = format_id(rname, ids[rname])
+    elif kind == 'layout':
+        rom = roms[name]
+        id_bits = parse_id(format_id(name, ids[name]), rom['width'])[1]
+        for i in range(0, len(rom['coords'])):
+            values['bit' + str(i)] = '{0} {1} {2} {3}'.format(
+			*via_rect(rom['coords'][i], id_bits[i] == '1'))
+    elif kind == 'textblock':
+        id_value = format_id(name, ids[name])
+        for i in range(0, len(id_value)):
+            values['digit' + str(i)] = id_value[len(id_value) - 1 - i]
+    return values
+
+# Check that the old contents of a field are of the expected form.
+
+def field_valid(kind, name, fname, old):
+    if kind == 'layout':
+        coords = roms[name]['coords'][int(fname[3:])]
+        return old in ('{0} {1} {2} {3}'.format(*via_rect(coords)),
+			'{0} {1} {2} {3}'.format(*via_rect(coords, True)))
+    return re.fullmatch('[0-9A-F]+', old) is not None
+
+def read_field_cache(project_path):
+    try:
+        cachepath = os.path.join(project_path, field_cache_file)
+        with open(cachepath, 'r') as ifile:
+            profile_io(cachepath, read=os.fstat(ifile.fileno()).st_size)
+            return json.load(ifile)
+    except (OSError, ValueError):
+        return {}
+
+def write_field_cache(project_path, cache):
+    cachepath = os.path.join(project_path, field_cache_file)
+    os.makedirs(os.path.dirname(cachepath), exist_ok=True)
+    with open(cachepath, 'w') as ofile:
+        json.dump(cache, ofile)
+        profile_io(cachepath, written=ofile.tell())
+
+def cache_entry(filepath, fields, masked):
+    st = os.stat(filepath)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'fields': fields,
+		'masked': masked}
+
+# Hash of the contents of a file (decoded as latin-1) with its fields
+# removed.  It does not change when the fields are patched.
+
+def masked_hash(data, fields):
+    return hashlib.sha256(splice(data, [(field[0], field[0] + field[1], '')
+		for field in fields.values()]).encode('latin-1')).hexdigest()
+
+def scan_entry(filepath, data, kind, name):
+    fields = scan_fields(data, kind, name)
+    return cache_entry(filepath, fields, masked_hash(data, fields))
+
+#----------------------------------------------------------------------
+# Patch the fields of one file in place.  Returns the number of fields
+# changed (zero if the file already holds the values, in which case it
+# is not written) and the contents of every field after patching, or
+# None if the file must instead be rewritten in full.
+#----------------------------------------------------------------------
+
+def patch_file(filepath, kind, name, ids, entry):
+    values = field_values(kind, name, ids)
+    with open(filepath, 'r+b') as ofile:
+        with mmap.mmap(ofile.fileno(), 0) as mm:
+            contents = {}
+            for fname, field in entry['fields'].items():
+                offset, length = field[0], field[1]
+                old = mm[offset:offset + length].decode('latin-1')
+                if len(old) != length or not field_valid(kind, name, fname, old):
+                    return None
+                contents[fname] = old
+
+            edits = []
+            for fname, value in values.items():
+                if fname not in entry['fields'] or len(value) != entry['fields'][fname][1]:
+                    return None
+                if contents[fname] != value:
+                    edits.append((entry['fields'][fname][0], value))
+                    contents[fname] = value
+
+            # Every glyph cell must be given a path where it first appears
+            if kind == 'textblock':
+                wasseen = {}
+                for i in range(0, len(values)):
+                    dchar = values['digit' + str(i)]
+                    if dchar not in wasseen and not entry['fields']['digit' + str(i)][2]:
+                        return None
+                    wasseen[dchar] = True
+
+            for offset, value in edits:
+                mm[offset:offset + len(value)] = value.encode('latin-1')
+            if edits:
+                mm.flush()
+            profile_io(filepath, read=sum(len(value) for value in contents.values()),
+			written=sum(len(value) for offset, value in edits))
+    return len(edits), contents
+
+def patch_project(project_path, ids, debugmode=False, log=None, flatten=False):
+    for subdir in ('verilog', 'mag'):
+        if not os.path.isdir(os.path.join(project_path, subdir)):
+            raise IdRomError('No directory ' + os.path.join(project_path, subdir) + ' found.')
+
+    names = [name for name in roms if name in ids]
+    for name in names:
+        if ids[name] == 0:
+            raise IdRomError('Value zero is an invalid ' + roms[name]['label'] + '.')
+
+    cache = read_field_cache(project_path)
+    oldcache = json.dumps(cache, sort_keys=True)
+    fallback = []
+    changed = []
+    digests = {}
+    records = {}
+    for target, kind, name in patch_targets(names):
+        filepath = os.path.join(project_path, target)
+        if not os.path.isfile(filepath):
+            raise IdRomError('No file ' + target + ' found.')
+
+        # A file linked from a store (see id_store.py) is shared with
+        # other trees, so patch a private copy of it.
+        if os.stat(filepath).st_nlink > 1:
+            id_store.unshare(filepath)
+            profile_io(filepath, read=os.path.getsize(filepath),
+			written=os.path.getsize(filepath))
+
+        # A flattened text block has no digit fields, and is rewritten
+        if flatten and kind == 'textblock':
+            keep_zero_template(project_path, target, kind, name)
+            fallback.append(target)
+            continue
+
+        with profile_step('patch', target=target):
+            # Keep a copy of the zero-value layout
+            if kind == 'layout':
+                keep_zero_template(project_path, target, kind, name)
+
+            st = os.stat(filepath)
+            entry = cache.get(target)
+            for attempt in range(0, 2):
+                if not entry or 'masked' not in entry or entry['size'] != st.st_size or \
+			entry['mtime_ns'] != st.st_mtime_ns or attempt > 0:
+                    with open(filepath, 'r', encoding='latin-1') as ifile:
+                        data = ifile.read()
+                    profile_io(filepath, read=len(data))
+                    entry = scan_entry(filepath, data, kind, name)
+                result = patch_file(filepath, kind, name, ids, entry)
+                if result is not None:
+                    nedits, contents = result
+                    cache[target] = cache_entry(filepath, entry['fields'], entry['masked'])
+                    digests[target] = entry['masked']
+                    records[target] = dict((fname, [entry['fields'][fname][0], value])
+				for fname, value in contents.items())
+                    if nedits > 0:
+                        changed.append(target)
+                        if log:
+                            log('Patched ' + target + ' in place.')
+                    break
+            else:
+                fallback.append(target)
+
+    # Make the gate-level netlists, which are generated from their RTL
+    # modules, and the files whose fields could not be patched in place
+    targets = ['verilog/gl/' + roms[name]['cell'] + '.v' for name in names] + fallback
+    with profile_step('rewrite'):
+        outputs = personalize(read_templates(project_path, names, targets), ids, debugmode,
+		glyphs=flatten_glyphs(project_path, flatten), targets=targets)
+
+    kinds = dict((target, (kind, name)) for target, kind, name in patch_targets(names))
+    with profile_step('write'):
+        for target, data in outputs.items():
+            filepath = os.path.join(project_path, target)
+            if write_file(filepath, data):
+                changed.append(target)
+                if log:
+                    log('Wrote ' + target + '.')
+            digests[target] = hashlib.sha256(data.encode()).hexdigest()
+            if target in kinds:
+                cache[target] = scan_entry(filepath, data.encode().decode('latin-1'),
+			*kinds[target])
+
+    if json.dumps(cache, sort_keys=True) != oldcache:
+        write_field_cache(project_path, cache)
+    targets = [target for target, kind, name in patch_targets(names)] + \
+		[target for target in outputs if target not in kinds]
+    write_id_manifest(project_path, ids, targets, digests, records)
+    return changed
+
+#----------------------------------------------------------------------
+# ID patches:  The changes made by programming a set of ID values,
+# described as a short list of edits rather than as rewritten files,
+# so that one personalization can be replayed on many trees (or on
+# cells already loaded in magic).  Each edit is one of:
+#
+#   via:        move the programming via of one bit of a ROM cell from
+#               "from" to "to" (rectangles in magic internal units);
+#               a via already at "to" is left alone.
+#   glyph:      point the digit use "use" of a text block cell at the
+#               hex digit glyph cell "glyph".
+#   parameter:  set the ID parameter "param" of the RTL top level.
+#
+# Every bit and digit is listed, so that the edits do not depend on
+# the values previously programmed.  The gate-level netlists follow
+# from the ID values, which are recorded with the edits.
+#----------------------------------------------------------------------
+
+id_patch_version = 1
+
+def id_patch(ids):
+    names = [name for name in roms if name in ids]
+    edits = []
+    for name in names:
+        rom = roms[name]
+        id_value = format_id(name, ids[name])
+        id_bits = parse_id(id_value, rom['width'])[1]
+        for i in range(0, len(rom['coords'])):
+            one = (id_bits[i] == '1')
+            edits.append({'edit': 'via', 'cell': rom['cell'], 'layer': rom['layer'],
+			'bit': i, 'from': list(via_rect(rom['coords'][i], not one)),
+			'to': list(via_rect(rom['coords'][i], one))})
+        if rom['textblock']:
+            for i in range(0, len(id_value)):
+                edits.append({'edit': 'glyph', 'cell': rom['textblock'],
+			'use': 'alphaX_' + str(i),
+			'glyph': 'alpha_' + id_value[len(id_value) - 1 - i]})
+    for name in names:
+        edits.append({'edit': 'parameter', 'file': rtl_top, 'param': roms[name]['param'],
+			'value': str(roms[name]['width']) + "'h" + format_id(name, ids[name])})
+    return {
+	'version': id_patch_version,
+	'ids': dict((roms[name]['key'], format_id(name, ids[name])) for name in names),
+	'edits': edits,
+    }
+
+# Return the ID values (integers keyed by ROM name) of a patch file.
+
+def read_id_patch(filepath):
+    with open(filepath, 'r') as ifile:
+        patch = json.load(ifile)
+    if patch.get('version') != id_patch_version:
+        raise IdRomError('Patch ' + filepath + ' has unknown version ' +
+			str(patch.get('version')) + '.')
+    ids = {}
+    for name, rom in roms.items():
+        if rom['key'] in patch['ids']:
+            try:
+                ids[name] = parse_id(patch['ids'][rom['key']], rom['width'])[0]
+            except ValueError as e:
+                raise IdRomError('Patch ' + filepath + ': ' + str(e))
+    return ids
+
+#----------------------------------------------------------------------
+# Write a patch as a magic Tcl script that applies the layout edits to
+# the cells loaded in a running magic session (run from the project
+# "mag" directory).  Each via is selected at its old position and moved
+# by the 0.69um offset between positions;  a via that is not there is
+# not selected, so the move does nothing.  Each digit use is replaced
+# in place by its new glyph cell.  The RTL parameters are given in
+# comments.  Nothing is saved;  use "writeall" afterwards to keep the
+# changes.
+#----------------------------------------------------------------------
+
+def magic_um(value):
+    return '{0:.3f}um'.format(value / 200)
+
+def id_patch_script(patch):
+    lines = ['# ID patch: ' + ' '.join(key + '=' + value for key, value in
+			sorted(patch['ids'].items()))]
+    for edit in patch['edits']:
+        if edit['edit'] == 'parameter':
+            lines.append('# ' + edit['file'] + ': parameter ' + edit['param'] +
+			' = ' + edit['value'] + ';')
+    lines.append('set idpatch_top [cellname list window]')
+    if any(edit['edit'] == 'glyph' for edit in patch['edits']):
+        lines.append('addpath hexdigits')
+
+    cell = None
+    for edit in patch['edits']:
+        if edit['edit'] == 'parameter':
+            continue
+        if edit['cell'] != cell:
+            cell = edit['cell']
+            lines.append('load ' + cell)
+            lines.append('select clear')
+        if edit['edit'] == 'via':
+            offset = edit['to'][0] - edit['from'][0]
+            lines.append('box values ' + ' '.join(magic_um(value) for value in edit['from']))
+            lines.append('select area ' + edit['layer'])
+            lines.append('move ' + ('e ' if offset > 0 else 'w ') + magic_um(abs(offset)))
+            lines.append('select clear')
+        elif edit['edit'] == 'glyph':
+            lines.append('select cell ' + edit['use'])
+            lines.append('replace ' + edit['glyph'])
+            lines.append('select clear')
+    lines.append('load $idpatch_top')
+    return '\n'.join(lines) + '\n'
+
+# Format a patch as JSON with one edit per line.
+
+def id_patch_json(patch):
+    return '{"version": ' + json.dumps(patch['version']) + ', "ids": ' + \
+		json.dumps(patch['ids'], sort_keys=True) + ',\n "edits": [\n  ' + \
+		',\n  '.join(json.dumps(edit) for edit in patch['edits']) + '\n]}\n'
+
+# Write a patch to a file, as a magic script if the file name ends in
+# ".tcl" and as JSON otherwise.  A file name of "-" writes JSON to the
+# standard output.
+
+def write_id_patch(filepath, patch):
+    if filepath == '-':
+        sys.stdout.write(id_patch_json(patch))
+    elif filepath.endswith('.tcl'):
+        write_file(filepath, id_patch_script(patch))
+    else:
+        write_file(filepath, id_patch_json(patch))
+
+#----------------------------------------------------------------------
+# Personalization manifest:  After programming, a small JSON file
+# (id_manifest.json in the project top level) records the programmed
+# ID values and the size, modification time and SHA-256 hash of every
+# file that was written.  "-report" answers from the manifest as long
+# as the files still match it, checking only size and modification
+# time unless those have changed, in which case the hash decides.
+#----------------------------------------------------------------------
+
+id_manifest_file = 'id_manifest.json'
+
+def file_record(filepath, data=None, digest=None, fields=None):
+    st = os.stat(filepath)
+    if digest is not None:
+        pass
+    elif data is None:
+        digest = file_hash(filepath)
+        profile_io(filepath, read=st.st_size)
+    else:
+        digest = hashlib.sha256(data.encode()).hexdigest()
+    record = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+    if fields is not None:
+        record['fields'] = fields
+    return record
+
+def read_id_manifest(project_path):
+    try:
+        manifestpath = os.path.join(project_path, id_manifest_file)
+        with open(manifestpath, 'r') as ifile:
+            profile_io(manifestpath, read=os.fstat(ifile.fileno()).st_size)
+            return json.load(ifile)
+    except (OSError, ValueError):
+        return None
+
+# Record the ID values and the files written for them.  "outputs" is
+# either a list of files or a dictionary of their contents, keyed by
+# path relative to the project top level.  "digests", if given, holds
+# the known hashes of the files.  "fields", if given, holds for a file
+# patched in place (see patch_project()) the [offset, value] of each of
+# its fields, keyed by field name, and its digest is then the hash of
+# the file without the fields (see masked_hash()).
+
+def write_id_manifest(project_path, ids, outputs, digests=None, fields=None):
+    with profile_step('manifest'):
+        manifest = read_id_manifest(project_path) or {'ids': {}, 'files': {}}
+        for name in ids:
+            manifest['ids'][roms[name]['key']] = format_id(name, ids[name])
+        for target in outputs:
+            data = outputs[target] if isinstance(outputs, dict) else None
+            manifest['files'][target] = file_record(os.path.join(project_path, target), data,
+			digests.get(target) if digests else None,
+			fields.get(target) if fields else None)
+        write_file(os.path.join(project_path, id_manifest_file),
+		json.dumps(manifest, indent=1, sort_keys=True))
+
+# Return the manifest and the list of recorded files that no longer
+# match it.  Returns (None, []) if there is no manifest.
+
+def check_id_manifest(project_path):
+    manifest = read_id_manifest(project_path)
+    if manifest is None:
+        return None, []
+    drifted = []
+    for target, record in sorted(manifest['files'].items()):
+        filepath = os.path.join(project_path, target)
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            drifted.append(target)
+            continue
+        if st.st_size == record['size'] and st.st_mtime_ns == record['mtime_ns']:
+            continue
+        if st.st_size != record['size']:
+            drifted.append(target)
+            continue
+        profile_io(filepath, read=st.st_size)
+        if 'fields' in record:
+            with open(filepath, 'r', encoding='latin-1') as ifile:
+                data = ifile.read()
+            fields = record['fields']
+            if any(data[offset:offset + len(value)] != value
+			for offset, value in fields.values()) or \
+			masked_hash(data, dict((fname, [offset, len(value)])
+			for fname, (offset, value) in fields.items())) != record['sha256']:
+                drifted.append(target)
+        elif file_hash(filepath) != record['sha256']:
+            drifted.append(target)
+    return manifest, drifted
+
+#----------------------------------------------------------------------
+# Batch mode:  Read the zero-value templates from the project once,
+# then write the personalized files for each line of a manifest into
+# the output directory given on that line.  Only the files that depend
+# on the ID values are written;  the output directory mirrors the
+# project's mag/ and verilog/ layout.
+#
+# With a store (see id_store.py), each output directory is instead a
+# complete tree of the project, made of links to the objects of the
+# store.  The project files are added to the store once, and the
+# personalized files once for each distinct set of ID values.
+#----------------------------------------------------------------------
+
+def read_manifest(manifest):
+    entries = []
+    with open(manifest, 'r') as ifile:
+        for lineno, line in enumerate(ifile.read().splitlines(), 1):
+            line = line.split('#')[0].replace(',', ' ').strip()
+            if not line:
+                continue
+            fields = line.split()
+            if len(fields) != 3:
+                raise ValueError(manifest + ' line ' + str(lineno) +
+			': expected <project_id> <product_id> <output_dir>')
+            entries.append(tuple(fields))
+    return entries
+
+# Worker processes receive the templates once, at start-up.
+
+batch_templates = None
+batch_glyphs = None
+batch_store = None
+
+def batch_init(templates, glyphs=None, store=None):
+    global batch_templates, batch_glyphs, batch_store
+    batch_templates = templates
+    batch_glyphs = glyphs
+    batch_store = store
+
+# Key of a variant in the store:  the ID values, whether the text block
+# is flattened, and a hash of the templates (and glyphs) it was made
+# from, so that a variant is made again when the project changes.
+
+def templates_key(templates, glyphs=None):
+    sha = hashlib.sha256()
+    for target in sorted(templates):
+        sha.update(target.encode() + b'\0' + templates[target].encode() + b'\0')
+    if glyphs is not None:
+        sha.update(json.dumps(glyphs, sort_keys=True).encode())
+    return sha.hexdigest()[:16]
+
+def variant_key(ids, flatten, templates):
+    return '_'.join(name + '_' + format_id(name, ids[name]) for name in roms
+		if name in ids) + ('_flat' if flatten else '') + '_' + templates
+
+def store_tree(store, ids, output_dir):
+    key = variant_key(ids, batch_glyphs is not None, store['templates'])
+    variant = id_store.read_variant(store, key)
+    if variant is None:
+        outputs = personalize(batch_templates, ids, glyphs=batch_glyphs)
+        variant = id_store.write_variant(store, key, outputs)
+    files = dict(store['base'])
+    files.update(variant)
+    with profile_step('link'):
+        id_store.materialize(store, files, output_dir, store['method'])
+    write_id_manifest(output_dir, ids, list(variant), variant)
+
+def batch_entry(entry):
+    project_id_value, product_id_value, output_dir = entry
+    try:
+        ids = {'project': parse_id(project_id_value, roms['project']['width'])[0]}
+        if product_id_value != '-':
+            ids['product'] = parse_id(product_id_value, roms['product']['width'])[0]
+        with profile_step('tree', project=output_dir):
+            if batch_store:
+                store_tree(batch_store, ids, output_dir)
+            else:
+                outputs = personalize(batch_templates, ids, glyphs=batch_glyphs)
+                write_outputs(output_dir, outputs)
+                write_id_manifest(output_dir, ids, outputs)
+    except (ValueError, OSError, IdRomError) as e:
+        return output_dir + ': ' + str(e)
+    return None
+
+# "storedir", if given, is the store directory, and "method" the way
+# that files are linked from it ("hard", "reflink" or "copy").
+
+def run_batch(project_path, manifest, jobs=1, flatten=False, storedir=None, method='hard'):
+    entries = read_manifest(manifest)
+    templates = read_templates(project_path, list(roms))
+    glyphs = flatten_glyphs(project_path, flatten)
+
+    store = None
+    if storedir:
+        store = id_store.open_store(storedir)
+        store['method'] = method
+        # The output trees may be inside the project;  do not import them
+        exclude = [entry[2] for entry in entries] + [id_manifest_file]
+        with profile_step('import'):
+            base = id_store.import_base(store, project_path, exclude)
+        # Give each tree the zero-value templates, so that it can be
+        # programmed again
+        for target, sources in template_sources(list(roms)).items():
+            if len(sources) > 1 and sources[0] not in base and target in base:
+                base[sources[0]] = base[target]
+        store['base'] = base
+        store['templates'] = templates_key(templates, glyphs)
+
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(jobs,
+		initializer=batch_init, initargs=(templates, glyphs, store)) as executor:
+            results = list(executor.map(batch_entry, entries,
+			chunksize=max(1, len(entries) // (jobs * 4))))
+    else:
+        batch_init(templates, glyphs, store)
+        results = [batch_entry(entry) for entry in entries]
+
+    errors = [result for result in results if result]
+    for error in errors:
+        print('Error:  ' + error)
+    print('Personalized ' + str(len(entries) - len(errors)) + ' of ' +
+		str(len(entries)) + ' trees.')
+    return len(errors)
+
+#----------------------------------------------------------------------
+# Library entry point:  Program the IDs of a project, and return the
+# outcome as a dictionary instead of printing it and exiting.
+#
+#   project_path:  the project top level directory.
+#   ids:           ID values keyed by ROM name ("project") or by info.yaml
+#                  key ("project_id"), each given as a hex string or as
+#                  an integer.
+#   patch:         rewrite only the ID fields in place (as "-patch").
+#   flatten:       write the ID text block flattened (as "-flatten").
+#   output_dir:    if given, write the personalized files (and their
+#                  manifest) under this directory, leaving the project
+#                  unchanged.
+#
+# Templates are taken from warm_templates(), so repeated calls in one
+# process read each template only once.  The result has the keys:
+#
+#   ok:       True if the IDs were programmed.
+#   ids:      the ID values as hex strings, keyed by info.yaml key.
+#   changed:  the files that were changed, relative to the tree written.
+#   errors:   a list of {"code": ..., "message": ...}, where "code" is
+#             one of "value" (an ID value is invalid), "project" (the
+#             project is missing or incomplete) or "io" (a file could
+#             not be read or written).
+#----------------------------------------------------------------------
+
+def program_ids(project_path, ids, patch=False, flatten=False, output_dir=None,
+		debugmode=False, log=None):
+    result = {'ok': False, 'ids': {}, 'changed': [], 'errors': []}
+
+    def error(code, message):
+        result['errors'].append({'code': code, 'message': message})
+        return result
+
+    if not isinstance(ids, dict):
+        return error('value', 'ID values must be given as a dictionary keyed by ID.')
+    keys = dict((rom['key'], name) for name, rom in roms.items())
+    values = {}
+    for key, value in ids.items():
+        name = keys.get(key, key)
+        if name not in roms:
+            return error('value', 'Unknown ID ' + str(key) + '.')
+        rom = roms[name]
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            return error('value', 'The ' + rom['label'] + ' must be an integer or a hex string.')
+        try:
+            if isinstance(value, int):
+                parse_id('{0:X}'.format(value), rom['width'])
+                values[name] = value
+            else:
+                values[name] = parse_id(value, rom['width'])[0]
+        except ValueError:
+            return error('value', 'Cannot parse ' + rom['label'] + ' "' + str(value) +
+			'" as a ' + str(rom['width'] // 4) + '-digit hex number.')
+        if values[name] == 0:
+            return error('value', 'Value zero is an invalid ' + rom['label'] + '.')
+        result['ids'][rom['key']] = format_id(name, values[name])
+    if not values:
+        return error('value', 'No ID value given.')
+
+    if not os.path.isdir(project_path):
+        return error('project', 'Project path "' + project_path +
+			'" does not exist or is not readable.')
+
+    names = [name for name in roms if name in values]
+    try:
+        if output_dir:
+            outputs = personalize(warm_templates(project_path, names), values,
+			debugmode, log, flatten_glyphs(project_path, flatten))
+            result['changed'] = write_outputs(output_dir, outputs)
+            write_id_manifest(output_dir, values, outputs)
+        elif patch:
+            result['changed'] = patch_project(project_path, values, debugmode, log, flatten)
+        else:
+            result['changed'] = program_project(project_path, values, debugmode, log,
+			flatten, warm_templates(project_path, names))
+    except IdRomError as e:
+        return error('project', str(e))
+    except OSError as e:
+        return error('io', str(e))
+
+    result['ok'] = True
+    return result
+
+#----------------------------------------------------------------------
+# Read the key:value pairs of the project info.yaml file.  Returns None
+# if there is no info.yaml file.
+#----------------------------------------------------------------------
+
+def read_info_yaml(project_path):
+    infopath = os.path.join(project_path, 'info.yaml')
+    if not os.path.isfile(infopath):
+        return None
+    info = {}
+    with open(infopath, 'r') as ifile:
+        profile_io(infopath, read=os.fstat(ifile.fileno()).st_size)
+        for line in ifile.read().splitlines():
+            kvpair = line.split(':')
+            if len(kvpair) == 2:
+                key = kvpair[0].strip()
+                value = kvpair[1].strip()
+                if key not in info:
+                    info[key] = value.strip('"\'')
+    return info
+
+# Recover the value of an ID parameter from the RTL top level.  Returns
+# None if the parameter was not found.
+
+def rtl_parameter_value(vdata, name):
+    rom = roms[name]
+    idrex = re.compile('parameter ' + rom['param'] + ' = ' + str(rom['width']) +
+		"'h([0-9A-F]+);")
+    imatch = idrex.search(vdata)
+    if imatch:
+        return int('0x' + imatch.group(1), 0)
+    return None
+
+# The same, from the structural index of the RTL file (which is cached,
+# so that the file is not scanned again until it changes).  Returns None
+# if the parameter is not found or does not have the expected width.
+
+def read_rtl_parameter(filepath, name):
+    rom = roms[name]
+    profile_io(filepath)
+    modules = verilog_index.read_verilog(filepath)
+    module, parameter = verilog_index.find_parameter(modules, rom['param'], 'panamax')
+    if parameter is None:
+        return None
+    imatch = re.match(str(rom['width']) + "'h([0-9A-Fa-f]+)$", parameter['value'])
+    if imatch:
+        return int('0x' + imatch.group(1), 0)
+    return None
+
+#----------------------------------------------------------------------
+# Read the geometry of a hex digit glyph cell (mag/hexdigits/alpha_<c>.mag).
+# Returns a dictionary mapping layer name to a list of rects in lambda
+# (0.01um), applying the "magscale" of the file if it has one.
+#----------------------------------------------------------------------
+
+def read_glyph(magpath):
+    with open(magpath, 'r') as ifile:
+        magdata = ifile.read()
+    profile_io(magpath, read=len(magdata))
+    scale = (1, 1)
+    smatch = re.search(r'^magscale (\d+) (\d+)$', magdata, re.M)
+    if smatch:
+        scale = (int(smatch.group(1)), int(smatch.group(2)))
+    glyph = {}
+    for layer, rects in index_rects(magdata).items():
+        if layer in ('properties', 'end', 'checkpaint'):
+            continue
+        glyph[layer] = sorted(tuple(v * scale[0] // scale[1] for v in rect)
+		for rect in rects for position in rects[rect])
+    return glyph
+
+#----------------------------------------------------------------------
+# Flattened text:  The sixteen glyphs of a hex digit directory are read
+# once per process and kept in memory.  Text is drawn by painting the
+# glyph rects, moved into place, instead of using the glyph cells, so
+# that tools reading the layout have no glyph subcells to find and
+# load.  The position of each digit (its lower left corner, in lambda)
+# is recorded in the cell property "ID_DIGITS", least significant digit
+# first, so that the text can be read back.
+#----------------------------------------------------------------------
+
+hexdigits_dir = 'mag/hexdigits'
+hexchars = '0123456789ABCDEF'
+
+glyph_cache = {}
+
+def load_glyphs(hexdir):
+    glyphs = glyph_cache.get(hexdir)
+    if glyphs is None:
+        glyphs = {}
+        for dchar in hexchars:
+            magpath = os.path.join(hexdir, 'alpha_' + dchar + '.mag')
+            if not os.path.isfile(magpath):
+                raise IdRomError('No glyph file ' + magpath + ' found.')
+            glyphs[dchar] = read_glyph(magpath)
+        glyph_cache[hexdir] = glyphs
+    return glyphs
+
+# Spacing and position of the digits of project_id_textblock, used for
+# text that is not drawn over an existing text block.
+
+text_pitch = 2125
+text_origin = (328, 326)
+
+def text_positions(ndigits):
+    return [(text_origin[0] + (ndigits - 1 - i) * text_pitch, text_origin[1])
+		for i in range(0, ndigits)]
+
+# Return the paint of a hex string as a dictionary mapping layer name
+# to a list of rects.  "positions" gives the lower left corner of each
+# digit, least significant digit first.
+
+def render_text(glyphs, text, positions=None):
+    text = text.upper()
+    if positions is None:
+        positions = text_positions(len(text))
+    paint = {}
+    for i, (x, y) in enumerate(positions):
+        dchar = text[len(text) - 1 - i]
+        if dchar not in glyphs:
+            raise IdRomError('No glyph for character "' + dchar + '".')
+        for layer, rects in glyphs[dchar].items():
+            paint.setdefault(layer, []).extend((r[0] + x, r[1] + y, r[2] + x, r[3] + y)
+			for r in rects)
+    return paint
+
+def paint_lines(paint):
+    lines = []
+    for layer in sorted(paint):
+        lines.append('<< ' + layer + ' >>')
+        lines.extend('rect {0} {1} {2} {3}'.format(*rect) for rect in sorted(paint[layer]))
+    return lines
+
+def digits_property(positions):
+    return 'string ID_DIGITS ' + ' '.join('{0} {1}'.format(x, y) for x, y in positions)
+
+# Replace the glyph uses of a text block (as written by
+# program_textblock()) with the glyph paint.  Returns the new contents.
+
+def flatten_textblock(magdata, glyphs):
+    lines = magdata.splitlines()
+    outlines = []
+    digits = {}
+    insert = None
+    i = 0
+    while i < len(lines):
+        gmatch = glyphrex.match(lines[i])
+        if not gmatch:
+            if lines[i] == '<< end >>':
+                break
+            outlines.append(lines[i])
+            i += 1
+            continue
+        if insert is None:
+            insert = len(outlines)
+        transform = None
+        i += 1
+        while i < len(lines) and not lines[i].startswith(('use ', '<< ')):
+            if lines[i].startswith('transform '):
+                transform = [int(v) for v in lines[i].split()[1:]]
+            i += 1
+        if transform is None or transform[0:2] != [1, 0] or transform[3:5] != [0, 1]:
+            raise IdRomError('Glyph use alphaX_' + gmatch.group(2) + ' is not an unrotated placement.')
+        digits[int(gmatch.group(2))] = (gmatch.group(1), (transform[2], transform[5]))
+
+    if sorted(digits) != list(range(0, len(digits))) or not digits:
+        raise IdRomError('Text block digits are missing or not numbered from zero.')
+    text = ''.join(digits[n][0] for n in range(len(digits) - 1, -1, -1))
+    positions = [digits[n][1] for n in range(0, len(digits))]
+    outlines[insert:insert] = paint_lines(render_text(glyphs, text, positions))
+    if '<< properties >>' not in outlines:
+        outlines.append('<< properties >>')
+    outlines.append(digits_property(positions))
+    outlines.append('<< end >>')
+    return '\n'.join(outlines) + '\n'
+
+# Write a new layout cell drawing a hex string.
+
+def text_cell(glyphs, text, tech='sky130A'):
+    positions = text_positions(len(text))
+    lines = ['magic', 'tech ' + tech, 'timestamp ' + str(int(time.time()))]
+    lines.extend(paint_lines(render_text(glyphs, text, positions)))
+    lines.extend(['<< properties >>', digits_property(positions), '<< end >>'])
+    return '\n'.join(lines) + '\n'
+
+# Read the digits of flattened text back from the paint.  The rects of
+# each glyph layer within the box of a digit must be exactly those of
+# one glyph.  Returns the text (or None) and a list of error messages.
+
+def decode_flat_text(magdata, glyphs):
+    pmatch = re.search(r'^string ID_DIGITS ((?:-?\d+ -?\d+ ?)+)$', magdata, re.M)
+    if not pmatch:
+        return None, ['no glyph uses or ID_DIGITS property']
+    values = [int(v) for v in pmatch.group(1).split()]
+    positions = list(zip(values[0::2], values[1::2]))
+
+    layers = set(layer for glyph in glyphs.values() for layer in glyph)
+    rects = index_rects(magdata)
+    allrects = [r for glyph in glyphs.values() for lrects in glyph.values() for r in lrects]
+    extent = (min(r[0] for r in allrects), min(r[1] for r in allrects),
+		max(r[2] for r in allrects), max(r[3] for r in allrects))
+
+    text = ''
+    errors = []
+    for i, (x, y) in enumerate(positions):
+        found = dict((layer, sorted((r[0] - x, r[1] - y, r[2] - x, r[3] - y)
+		for r in rects.get(layer, {}) for position in rects[layer][r]
+		if r[0] >= x + extent[0] and r[2] <= x + extent[2] and
+		r[1] >= y + extent[1] and r[3] <= y + extent[3]))
+		for layer in layers)
+        found = dict((layer, lrects) for layer, lrects in found.items() if lrects)
+        matches = [dchar for dchar in hexchars if glyphs[dchar] == found]
+        if len(matches) != 1:
+            errors.append('digit ' + str(i) + ' does not match a glyph')
+            dchar = '?'
+        else:
+            dchar = matches[0]
+        text = dchar + text
+    return (None if errors else text), errors
+
+#----------------------------------------------------------------------
+# Readback:  Recover the programmed ID values from the layout and the
+# RTL, using the via coordinate tables in reverse.  Each via of a ROM
+# layout must be found in exactly one of its zero or one positions.
+# The text block digits are read from the "alphaX_n" glyph uses.
+#----------------------------------------------------------------------
+
+# Decode a ROM layout.  Returns the value (or None if any bit could not
+# be decoded) and a list of error messages.
+
+def decode_layout(magdata, name):
+    rom = roms[name]
+    vias = index_rects(magdata).get(rom['layer'], {})
+    id_int = 0
+    errors = []
+    for i in range(0, len(rom['coords'])):
+        zero = len(vias.get(via_rect(rom['coords'][i]), []))
+        one = len(vias.get(via_rect(rom['coords'][i], True), []))
+        if zero + one != 1:
+            errors.append('bit ' + str(i) + ' has ' + str(zero) +
+			' via(s) in the zero position and ' + str(one) +
+			' in the one position')
+        elif one:
+            id_int |= (1 << i)
+    return (None if errors else id_int), errors
+
+# Decode the text block.  Returns the value (or None if the digits are
+# missing or not numbered consecutively from zero) and a list of error
+# messages.  A flattened text block is read using the glyphs in the
+# directory "hexdir".
+
+def decode_textblock(magdata, name, hexdir=None):
+    ndigits = roms[name]['width'] // 4
+    digits = {}
+    for gmatch in glyphrex.finditer(magdata):
+        digits[int(gmatch.group(2))] = gmatch.group(1)
+    if not digits and hexdir and 'ID_DIGITS' in magdata:
+        try:
+            text, errors = decode_flat_text(magdata, load_glyphs(hexdir))
+        except IdRomError as e:
+            return None, [str(e)]
+        if text is not None and len(text) != ndigits:
+            errors.append('expected ' + str(ndigits) + ' digits, found ' + str(len(text)))
+        return (None if errors else int(text, 16)), errors
+    if sorted(digits) != list(range(0, ndigits)):
+        return None, ['expected digits alphaX_0 to alphaX_' + str(ndigits - 1) +
+		', found ' + str(len(digits))]
+    return int(''.join(digits[i] for i in range(ndigits - 1, -1, -1)), 16), []
+
+#----------------------------------------------------------------------
+# Decode every view of the named ROMs in a project.  Returns a
+# dictionary keyed by ROM name, each entry holding the decoded value
+# (or None) of the "layout", "textblock" (if the ROM has one) and "rtl"
+# views, a list of "errors", and "consistent", which is True if all
+# views decoded and agree.
+#----------------------------------------------------------------------
+
+def decode_project(project_path, names):
+    contents = {}
+    def read_view(target):
+        if target not in contents:
+            try:
+                with open(os.path.join(project_path, target), 'r') as ifile:
+                    contents[target] = ifile.read()
+                profile_io(os.path.join(project_path, target), read=len(contents[target]))
+            except OSError:
+                contents[target] = None
+        return contents[target]
+
+    results = {}
+    for name in names:
+        rom = roms[name]
+        result = {'errors': []}
+        views = [('layout', 'mag/' + rom['cell'] + '.mag', decode_layout)]
+        if rom['textblock']:
+            views.append(('textblock', 'mag/' + rom['textblock'] + '.mag',
+			lambda magdata, name: decode_textblock(magdata, name,
+			os.path.join(project_path, hexdigits_dir))))
+        views.append(('rtl', rtl_top, None))
+
+        for view, target, decoder in views:
+            filepath = os.path.join(project_path, target)
+            if not os.path.isfile(filepath):
+                result[view] = None
+                result['errors'].append(target + ': file not found')
+            elif decoder:
+                result[view], errors = decoder(read_view(target), name)
+                result['errors'].extend(target + ': ' + error for error in errors)
+            else:
+                result[view] = read_rtl_parameter(filepath, name)
+                if result[view] is None:
+                    result['errors'].append(target + ': no ' + rom['param'] + ' parameter')
+
+        values = set(result[view] for view, target, decoder in views)
+        if len(values) > 1 and None not in values:
+            result['errors'].append('views disagree: ' + ', '.join(view + '=' +
+			format_id(name, result[view]) for view, target, decoder in views))
+        result['consistent'] = not result['errors']
+        results[name] = result
+    return results
+
+#----------------------------------------------------------------------
+# Command-line handling shared by set_project_id.py, set_product_id.py
+# and set_ids.py.  "names" is the list of ROMs handled by the script.
+# Returns the exit status.
+#----------------------------------------------------------------------
+
+def usage(names, progname):
+    single = (len(names) == 1)
+    print("Usage:")
+    if single:
+        print(progname + " [<" + roms[names[0]]['key'] + "_value>] [<path_to_project>]")
+    else:
+        print(progname + ' ' + ' '.join('[-' + name + '=<' + roms[name]['key'] +
+		'_value>]' for name in names) + ' [<path_to_project>]')
+    print(progname + " -batch=<manifest> [-jobs=<n>] [-store=<dir>] [<path_to_project>]")
+    print("")
+    print("options:")
+    print("    -report  print the ID value(s) and exit.")
+    print("    -patch   rewrite only the ID fields of the files in place.")
+    print("    -decode  read the ID value(s) back from the layout, text block")
+    print("             and RTL, and check that they agree.")
+    print("    -debug   print the via positions changed.")
+    print("    -flatten write the ID text block with the glyph shapes painted in")
+    print("             place of the hex digit glyph cells.")
+    print("    -emit=<file>  write the changes as a patch instead of changing the")
+    print("             project:  a magic script if <file> ends in .tcl, to be")
+    print("             sourced in magic from the project mag directory, and")
+    print("             JSON otherwise (\"-\" for the standard output).")
+    print("    -apply=<file>  take the ID value(s) from a JSON patch.")
+    print("    -profile[=<file>]  write the time and file I/O of each step as")
+    print("             lines of JSON to <file> (default the standard error).")
+    print("")
+    print("where:")
+    for name in names:
+        print("    <" + roms[name]['key'] + "_value>   is a character string of " +
+		str(roms[name]['width'] // 4) + " hex digits,")
+    print("    <path_to_project> is the path to the project top level directory.")
+    print("    <manifest> is a file with one line per personalized tree:")
+    print("        <project_id_value> <product_id_value> <output_dir>")
+    print("    <n> is the number of worker processes to use in batch mode.")
+    print("    <dir> is a content-addressed store (see id_store.py);  each output")
+    print("        directory is made a complete tree linked from the store, by")
+    print("        hard links unless -link=reflink or -link=copy is given.")
+    print("")
+    print("  If an ID value is not given, then it must exist in the info.yaml file.")
+    print("  If <path_to_project> is not given, then it is assumed to be the cwd.")
+    print("  In batch mode, a <product_id_value> of \"-\" leaves the product ID unset.")
+    print("  Setting " + profile_env + "=<file> in the environment is the same as -profile.")
+    return 0
+
+def main(names, argv, progname):
+    single = (len(names) == 1)
+    optionlist = []
+    arguments = []
+
+    debugmode = False
+    reportmode = False
+    patchmode = False
+    decodemode = False
+    flatten = False
+    batchfile = None
+    storedir = None
+    linkmethod = 'hard'
+    jobs = 1
+    emitfile = None
+    values = {}
+
+    for option in argv:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > (2 if single else 1):
+        print("Wrong number of arguments given to " + progname + ".")
+        usage(names, progname)
+        return 0
+
+    for option in optionlist:
+        optname = option[1:].split('=', 1)[0]
+        optvalue = option.split('=', 1)[1] if '=' in option else None
+        if option == '-debug':
+            debugmode = True
+        elif option == '-report':
+            reportmode = True
+        elif option == '-patch':
+            patchmode = True
+        elif option == '-decode':
+            decodemode = True
+        elif option == '-flatten':
+            flatten = True
+        elif optname == 'profile':
+            profile_enable(optvalue or '-')
+        elif optname == 'batch' and optvalue:
+            batchfile = optvalue
+        elif optname == 'store' and optvalue:
+            storedir = optvalue
+        elif optname == 'link' and optvalue in id_store.link_methods:
+            linkmethod = optvalue
+        elif optname == 'emit' and optvalue:
+            emitfile = optvalue
+        elif optname == 'apply' and optvalue:
+            try:
+                patchids = read_id_patch(optvalue)
+            except (ValueError, OSError, IdRomError) as e:
+                print('Error:  Cannot read patch ' + optvalue + ':  ' + str(e))
+                return 1
+            for name in names:
+                if name in patchids:
+                    values[name] = format_id(name, patchids[name])
+        elif optname == 'jobs' and optvalue:
+            try:
+                jobs = int(optvalue)
+            except ValueError:
+                print('Error:  Cannot parse ' + option + ' as a number of jobs.')
+                return 1
+        elif optname in names and not single and optvalue:
+            values[optname] = optvalue
+        else:
+            print('Unknown option ' + option + '.')
+            usage(names, progname)
+            return 1
+
+    if batchfile:
+        mode = 'batch'
+    elif decodemode or reportmode:
+        mode = 'decode' if decodemode else 'report'
+    elif emitfile:
+        mode = 'emit'
+    else:
+        mode = 'patch' if patchmode else 'program'
+
+    with profile_step('total', mode=mode):
+        if batchfile:
+            if len(arguments) > 1:
+                print("Wrong number of arguments given to " + progname + ".")
+                usage(names, progname)
+                return 0
+            project_path = arguments[0] if arguments else os.getcwd()
+            if not os.path.isdir(project_path):
+                print('Error:  Project path "' + project_path + '" does not exist or is not readable.')
+                return 1
+            try:
+                errors = run_batch(project_path, batchfile, jobs, flatten, storedir,
+			linkmethod)
+            except (ValueError, OSError, IdRomError) as e:
+                print('Error:  ' + str(e))
+                return 1
+            return 1 if errors else 0
+
+        project_path = None
+
+        if single and len(arguments) > 0:
+            # The first argument is either the ID value or the project path
+            try:
+                parse_id(arguments[0], roms[names[0]]['width'])
+                values[names[0]] = arguments[0]
+            except ValueError:
+                project_path = arguments[0]
+
+        if len(arguments) == 0:
+            project_path = os.getcwd()
+        elif len(arguments) == 2:
+            project_path = arguments[1]
+        elif project_path == None:
+            project_path = arguments[0] if not single else os.getcwd()
+
+        if not os.path.isdir(project_path):
+            print('Error:  Project path "' + project_path + '" does not exist or is not readable.')
+            return 1
+
+        # In decode mode, read the values back from each view and check
+        # that they agree.
+
+        if decodemode:
+            status = 0
+            for name, result in decode_project(project_path, names).items():
+                line = roms[name]['key'] + ':'
+                for view in ('layout', 'textblock', 'rtl'):
+                    if view in result:
+                        value = result[view]
+                        line += '  ' + view + ' ' + ('?' if value is None else format_id(name, value))
+                print(line)
+                for error in result['errors']:
+                    print('Error:  ' + error)
+                if not result['consistent']:
+                    status = 1
+            return status
+
+        # In report mode, answer from the personalization manifest if the
+        # programmed files have not changed since it was written.  If they
+        # have, warn and recover the values from the RTL top level.
+
+        info = read_info_yaml(project_path)
+        if reportmode:
+            manifest, drifted = check_id_manifest(project_path)
+            if manifest and not drifted:
+                if all(roms[name]['key'] in manifest['ids'] for name in names):
+                    for name in names:
+                        id_int = int('0x' + manifest['ids'][roms[name]['key']], 0)
+                        if single:
+                            print(str(id_int))
+                        else:
+                            print(roms[name]['key'] + ': ' + str(id_int))
+                    return 0
+            elif drifted:
+                print('Warning:  ' + ', '.join(drifted) + ' changed since the IDs were programmed.',
+			file=sys.stderr)
+                info = None
+                values = {}
+
+        # Fill in values not given on the command line from info.yaml, or
+        # (in report mode) from the RTL top level.
+
+        rtl_missing = False
+        ids = {}
+        for name in names:
+            rom = roms[name]
+            value = values.get(name)
+            if value is None and info is not None:
+                value = info.get(rom['key'])
+                if value is None and single:
+                    print('Error:  No ' + rom['key'] + ' key:value pair found in project info.yaml.')
+                    return 1
+
+            if value is not None:
+                try:
+                    ids[name] = parse_id(value, rom['width'])[0]
+                except ValueError:
+                    print('Error:  Cannot parse ' + rom['label'] + ' "' + value +
+			'" as a ' + str(rom['width'] // 4) + '-digit hex number.')
+                    return 1
+
+            elif reportmode:
+                # Check if the ID has a non-zero value in panamax.v
+                rtl_top_path = os.path.join(project_path, rtl_top)
+                if os.path.isfile(rtl_top_path):
+                    ids[name] = read_rtl_parameter(rtl_top_path, name) or 0
+                else:
+                    if not rtl_missing:
+                        print('Error:  Cannot find top-level RTL ' + rtl_top_path + '.  Is this script being run in the project directory?')
+                    rtl_missing = True
+                    ids[name] = 0
+
+        if not ids:
+            print('Error:  No info.yaml file and no ID argument given.')
+            return 1
+
+        if reportmode:
+            for name in names:
+                if name not in ids:
+                    continue
+                if single:
+                    print(str(ids[name]))
+                else:
+                    print(roms[name]['key'] + ': ' + str(ids[name]))
+            return 0
+
+        for name in ids:
+            if ids[name] == 0:
+                print('Value zero is an invalid ' + roms[name]['label'] + '.  Exiting.')
+                return 1
+
+        # In emit mode, write the edits as a patch and leave the tree alone
+
+        if emitfile:
+            try:
+                write_id_patch(emitfile, id_patch(ids))
+            except OSError as e:
+                print('Error:  ' + str(e))
+                return 1
+            return 0
+
+        for name in ids:
+            print('Setting ' + roms[name]['label'] + ' to: ' + format_id(name, ids[name]))
+
+        result = program_ids(project_path, ids, patchmode, flatten,
+		debugmode=debugmode, log=print)
+        if not result['ok']:
+            for error in result['errors']:
+                print('Error:  ' + error['message'])
+            print('There were errors in processing.  Ending process.')
+            return 1
+
+        changed = result['changed']
+        for target in changed:
+            print('Changed:  ' + target)
+        if not changed:
+            print('No changes;  all files already hold these values.')
+        print('Done!')
+        return 0
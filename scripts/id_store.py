@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# id_store.py ---
+#
+# Content-addressed store for personalized padframe trees.  Only a few
+# files differ between the trees of different ID values (the ROM
+# layouts, the ID text block and the RTL top level), so instead of
+# copying the whole project for each tree, every file is kept once in
+# the store, named by the SHA-256 hash of its contents:
+#
+#   <store>/objects/<xx>/<hash>     file contents (read-only)
+#   <store>/bases/<key>.json        hash of each file of a project tree,
+#                                   with its size and modification time
+#   <store>/variants/<ids>.json     hash of each personalized file, for
+#                                   each set of ID values and templates
+#
+# A tree is made by linking each file to its object:  as a hard link if
+# possible, else as a reflink (copy-on-write clone) on file systems
+# that support it, else as a copy.  Trees for the same ID values share
+# the objects of their personalized files, and are personalized only
+# once.  Objects are made read-only so that an editor cannot change
+# every tree at once;  id_rom.py replaces (rather than rewrites) a file
+# with other links.
+#
+# The batch mode of set_ids.py uses the store with "-store=<dir>".  From
+# the command line, this script reports the contents of a store.
+#----------------------------------------------------------------------
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from index_cache import file_hash
+
+# Linux ioctl for cloning a file (copy-on-write)
+FICLONE = 0x40049409
+
+link_methods = ('hard', 'reflink', 'copy')
+
+def usage():
+    print("Usage:")
+    print("id_store.py <store_dir>")
+    print("")
+    print("Print the number and size of the objects, bases and variants")
+    print("in the store, and the space saved by linking.")
+    return 0
+
+def open_store(storedir):
+    for subdir in ('objects', 'bases', 'variants'):
+        os.makedirs(os.path.join(storedir, subdir), exist_ok=True)
+    return {'path': os.path.abspath(storedir)}
+
+def object_path(store, sha):
+    return os.path.join(store['path'], 'objects', sha[:2], sha)
+
+def read_json(filepath):
+    try:
+        with open(filepath, 'r') as ifile:
+            return json.load(ifile)
+    except (OSError, ValueError):
+        return None
+
+def write_json(filepath, data):
+    fd, tmppath = tempfile.mkstemp(dir=os.path.dirname(filepath), prefix='.tmp.')
+    with os.fdopen(fd, 'w') as ofile:
+        json.dump(data, ofile, indent=0, sort_keys=True)
+    os.replace(tmppath, filepath)
+
+#----------------------------------------------------------------------
+# Adding objects.  A new object is written to a temporary file and
+# renamed into place, so that concurrent writers of the same contents
+# do not conflict.
+#----------------------------------------------------------------------
+
+def add_object(store, sha, source=None, data=None, mode=0o644):
+    objpath = object_path(store, sha)
+    if os.path.exists(objpath):
+        return objpath
+    os.makedirs(os.path.dirname(objpath), exist_ok=True)
+    fd, tmppath = tempfile.mkstemp(dir=os.path.dirname(objpath), prefix='.tmp.')
+    try:
+        with os.fdopen(fd, 'wb') as ofile:
+            if data is not None:
+                ofile.write(data)
+            else:
+                with open(source, 'rb') as ifile:
+                    shutil.copyfileobj(ifile, ofile)
+        os.chmod(tmppath, mode & 0o555)
+        os.replace(tmppath, objpath)
+    except BaseException:
+        if os.path.exists(tmppath):
+            os.unlink(tmppath)
+        raise
+    return objpath
+
+def add_data(store, data):
+    bdata = data.encode() if isinstance(data, str) else data
+    sha = hashlib.sha256(bdata).hexdigest()
+    add_object(store, sha, data=bdata)
+    return sha
+
+#----------------------------------------------------------------------
+# Import a project tree as a base.  Returns a dictionary of relative
+# path -> hash for every file, skipping hidden files and directories
+# and the paths in "exclude".  Files whose size and modification time
+# match the last import are not read again.
+#----------------------------------------------------------------------
+
+def import_base(store, project_path, exclude=()):
+    project_path = os.path.abspath(project_path)
+    key = hashlib.sha256(project_path.encode()).hexdigest()[:16]
+    basefile = os.path.join(store['path'], 'bases', key + '.json')
+    old = read_json(basefile) or {}
+    oldfiles = old.get('files', {})
+
+    files = {}
+    skip = set(os.path.abspath(os.path.join(project_path, path)) for path in exclude)
+    skip.add(store['path'])
+    for dirpath, dirnames, filenames in os.walk(project_path):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and
+			os.path.join(dirpath, d) not in skip)
+        for filename in sorted(filenames):
+            filepath = os.path.join(dirpath, filename)
+            if filename.startswith('.') or filepath in skip or \
+			not os.path.isfile(filepath):
+                continue
+            relpath = os.path.relpath(filepath, project_path)
+            st = os.stat(filepath)
+            record = oldfiles.get(relpath)
+            if record and record[0] == st.st_size and record[1] == st.st_mtime_ns and \
+			os.path.exists(object_path(store, record[2])):
+                files[relpath] = record
+                continue
+            sha = file_hash(filepath)
+            add_object(store, sha, source=filepath, mode=st.st_mode)
+            files[relpath] = [st.st_size, st.st_mtime_ns, sha]
+
+    if files != oldfiles:
+        write_json(basefile, {'path': project_path, 'files': files})
+    return dict((relpath, record[2]) for relpath, record in files.items())
+
+#----------------------------------------------------------------------
+# Variants:  the hashes of the personalized files for one set of ID
+# values, keyed by the formatted ID values and a hash of the templates
+# (e.g., "project_12345678_product_9A_<hash>").
+#----------------------------------------------------------------------
+
+def variant_path(store, key):
+    return os.path.join(store['path'], 'variants', key + '.json')
+
+def read_variant(store, key):
+    variant = read_json(variant_path(store, key))
+    if variant is None:
+        return None
+    for sha in variant.values():
+        if not os.path.exists(object_path(store, sha)):
+            return None
+    return variant
+
+def write_variant(store, key, outputs):
+    variant = dict((target, add_data(store, data)) for target, data in outputs.items())
+    write_json(variant_path(store, key), variant)
+    return variant
+
+#----------------------------------------------------------------------
+# Make a tree at "dest" from a dictionary of relative path -> hash.
+# Each file is linked (see link_file()) and replaces any other file of
+# the same name;  files already linked to their object are left alone.
+# Returns the method used for the last file linked ("hard", "reflink"
+# or "copy"), or None if nothing was linked.
+#----------------------------------------------------------------------
+
+def reflink(source, dest):
+    if fcntl is None:
+        raise OSError('reflink not supported')
+    with open(source, 'rb') as ifile, open(dest, 'wb') as ofile:
+        fcntl.ioctl(ofile.fileno(), FICLONE, ifile.fileno())
+
+def link_file(source, dest, method='hard'):
+    methods = link_methods[link_methods.index(method):]
+    for method in methods:
+        try:
+            if method == 'hard':
+                os.link(source, dest)
+            elif method == 'reflink':
+                reflink(source, dest)
+            else:
+                shutil.copyfile(source, dest)
+            break
+        except OSError:
+            if os.path.exists(dest):
+                os.unlink(dest)
+            if method == methods[-1]:
+                raise
+    return method
+
+def materialize(store, files, dest, method='hard'):
+    used = None
+    for relpath, sha in sorted(files.items()):
+        objpath = object_path(store, sha)
+        filepath = os.path.join(dest, relpath)
+        try:
+            if os.path.samefile(objpath, filepath):
+                continue
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        tmppath = os.path.join(os.path.dirname(filepath),
+		'.' + os.path.basename(filepath) + '.' + str(os.getpid()))
+        used = link_file(objpath, tmppath, method)
+        if used != 'hard':
+            # A copy is not shared;  make it writable like any other file
+            os.chmod(tmppath, os.stat(objpath).st_mode | 0o200)
+        os.replace(tmppath, filepath)
+    return used
+
+# Replace a linked file with a private, writable copy of itself.
+
+def unshare(filepath):
+    tmppath = os.path.join(os.path.dirname(filepath),
+		'.' + os.path.basename(filepath) + '.' + str(os.getpid()))
+    shutil.copyfile(filepath, tmppath)
+    os.chmod(tmppath, os.stat(filepath).st_mode | 0o200)
+    os.replace(tmppath, filepath)
+
+#----------------------------------------------------------------------
+# Report the contents of a store.
+#----------------------------------------------------------------------
+
+def store_stats(store):
+    objects = 0
+    size = 0
+    linked = 0
+    for dirpath, dirnames, filenames in os.walk(os.path.join(store['path'], 'objects')):
+        for filename in filenames:
+            if filename.startswith('.'):
+                continue
+            st = os.stat(os.path.join(dirpath, filename))
+            objects += 1
+            size += st.st_size
+            linked += st.st_size * (st.st_nlink - 1)
+    bases = len(os.listdir(os.path.join(store['path'], 'bases')))
+    variants = len(os.listdir(os.path.join(store['path'], 'variants')))
+    return {'objects': objects, 'bytes': size, 'linked_bytes': linked,
+		'bases': bases, 'variants': variants}
+
+if __name__ == '__main__':
+
+    if len(sys.argv) != 2 or sys.argv[1].startswith('-'):
+        usage()
+        sys.exit(1)
+
+    if not os.path.isdir(os.path.join(sys.argv[1], 'objects')):
+        print('Error:  No store at ' + sys.argv[1] + '.')
+        sys.exit(1)
+
+    stats = store_stats(open_store(sys.argv[1]))
+    print('Objects:    %d (%d bytes)' % (stats['objects'], stats['bytes']))
+    print('Bases:      %d' % stats['bases'])
+    print('Variants:   %d' % stats['variants'])
+    print('Linked:     %d bytes in trees share the objects' % stats['linked_bytes'])
+    sys.exit(0)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# index_cache.py ---
+#
+# On-disk cache for the parsed indexes of the large design files (DEF,
+# magic, verilog, SPICE).  The index of a file is saved with pickle in
+# a ".cache" directory next to the file, together with the size,
+# modification time and SHA-256 hash of the file it was made from.
+# The index is reused if the size and modification time of the file
+# are unchanged or, failing that, if its hash is unchanged.
+#
+# Indexes must be built from plain Python types (and the array module)
+# only, so that they can be loaded by any script.
+#----------------------------------------------------------------------
+
+import os
+import pickle
+import hashlib
+
+def file_hash(filepath):
+    sha = hashlib.sha256()
+    with open(filepath, 'rb') as ifile:
+        for block in iter(lambda: ifile.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def cache_path(filepath, kind):
+    dirname, basename = os.path.split(os.path.abspath(filepath))
+    return os.path.join(dirname, '.cache', basename + '.' + kind + '.pickle')
+
+#----------------------------------------------------------------------
+# Return the cached index of kind "kind" for a file, or None if there
+# is no valid cached index.  "version" is the version of the index
+# format;  a cached index of any other version is ignored.
+#----------------------------------------------------------------------
+
+def load(filepath, kind, version):
+    try:
+        with open(cache_path(filepath, kind), 'rb') as ifile:
+            entry = pickle.load(ifile)
+        st = os.stat(filepath)
+    except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError):
+        return None
+
+    if entry.get('version') != version or entry['size'] != st.st_size:
+        return None
+    if entry['mtime_ns'] != st.st_mtime_ns:
+        if file_hash(filepath) != entry['sha256']:
+            return None
+        # Same contents;  record the new time so the hash is not needed again
+        store(filepath, kind, version, entry['data'], entry['sha256'])
+    return entry['data']
+
+def store(filepath, kind, version, data, sha256=None):
+    st = os.stat(filepath)
+    entry = {
+	'version': version,
+	'size': st.st_size,
+	'mtime_ns': st.st_mtime_ns,
+	'sha256': sha256 or file_hash(filepath),
+	'data': data,
+    }
+    cachefile = cache_path(filepath, kind)
+    try:
+        os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+        tmpfile = cachefile + '.' + str(os.getpid())
+        with open(tmpfile, 'wb') as ofile:
+            pickle.dump(entry, ofile, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpfile, cachefile)
+    except OSError:
+        # The cache is an optimization only;  ignore unwritable directories
+        pass
+
+#----------------------------------------------------------------------
+# Return the index of a file, from the cache if possible, or else by
+# calling "builder" with the file name and saving the result.
+#----------------------------------------------------------------------
+
+def cached(filepath, kind, version, builder, usecache=True):
+    if usecache:
+        data = load(filepath, kind, version)
+        if data is not None:
+            return data
+    data = builder(filepath)
+    if usecache:
+        store(filepath, kind, version, data)
+    return data
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+
+#----------------------------------------------------------------------
+#
+# lvs_plan.py ---
+#
+# Plan an incremental LVS run.  The canonical hash of every subcircuit
+# of the extracted layout netlist (netlist/layout/panamax.spice, see
+# spice_index.read_hashes()) is compared against the hashes saved after
+# the last clean LVS run, and only the cells whose LVS result may have
+# changed are compared again.  A cell is stale if its hash changed (a
+# change to the ports of a subcell changes the hash of every cell that
+# uses it) or if it is new.  A stale cell that has no counterpart in
+# the reference netlists is flattened into its parents by netgen, so
+# each of its parents is stale in its place.  A stale cell below
+# another stale cell is compared as part of it, and is not listed
+# separately.
+#
+# The reference cells are found from the "readnet" lines of the full
+# LVS script (lvs/panamax.tcl):  the modules of the verilog files and
+# the subcircuits of the SPICE files.  A library that is not installed
+# is taken to hold the cells named with its file name as prefix (e.g.,
+# sky130_fd_sc_hd.spice holds the sky130_fd_sc_hd__* cells).
+#
+# The plan is written as a netgen script (default
+# lvs/panamax_incr.tcl) that reads the same netlists as the full script
+# and runs "lvs" on each stale cell, writing <cell>_comp.out.  After a
+# clean run, "-update" saves the current hashes as the new baseline
+# (default lvs/lvs_baseline.json).  Only the layout side is planned;
+# after a change to the reference netlists, run the full LVS.
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+
+import spice_index
+
+def usage():
+    print("Usage:")
+    print("lvs_plan.py [<options>] [<path_to_project>]")
+    print("")
+    print("options:")
+    print("    -netlist=<file>      extracted netlist (default netlist/layout/panamax.spice)")
+    print("    -lvs=<file>          full netgen script (default lvs/panamax.tcl)")
+    print("    -baseline=<file>     hashes of the last clean run (default lvs/lvs_baseline.json)")
+    print("    -script=<file>       netgen script to write (default lvs/panamax_incr.tcl)")
+    print("    -update              save the current hashes as the baseline")
+    print("    -nocache             do not read or write the index cache")
+    print("")
+    print("  If <path_to_project> is not given, then it is assumed to be the cwd.")
+    print("  Files are relative to <path_to_project>.")
+    return 0
+
+baseline_version = 1
+
+readnetrex = re.compile(r'^\s*(?:set\s+\S+\s+\[)?readnet\s+(spice|verilog)\s+(\S+?)\]?(?:\s+\S+)?\s*$')
+lvsrex = re.compile(r'^\s*lvs\s+"\S+\s+(\S+)"\s+"\S+\s+\S+"\s+(\S+)')
+subcktrex = re.compile(r'^\.subckt\s+(\S+)', re.I | re.M)
+modulerex = re.compile(r'^\s*module\s+([A-Za-z_][\w$]*)', re.M)
+
+#----------------------------------------------------------------------
+# Read the full netgen script.  Returns the lines that read the
+# netlists, the setup file argument and the top cell of its "lvs"
+# command, and the names (lower case) and name prefixes of the cells of
+# the reference netlists.
+#----------------------------------------------------------------------
+
+def read_lvs_script(filepath):
+    lvsdir = os.path.dirname(os.path.abspath(filepath))
+    variables = {
+	'PDK_PATH': os.environ.get('PDK_PATH', '/usr/share/pdk'),
+	'PDK': os.environ.get('PDK', 'sky130A'),
+    }
+    setup = []
+    top = None
+    setupfile = None
+    refcells = set()
+    prefixes = []
+    with open(filepath, 'r') as ifile:
+        lines = ifile.read().splitlines()
+    for line in lines:
+        lmatch = lvsrex.match(line)
+        if lmatch:
+            top = lmatch.group(1)
+            setupfile = lmatch.group(2)
+            continue
+        if line.lstrip().startswith('lvs '):
+            continue
+        setup.append(line)
+
+        rmatch = readnetrex.match(line)
+        if not rmatch or '$circuit1' in line or 'circuit1 ' in line:
+            continue
+        netfile = re.sub(r'\$\{?(\w+)\}?', lambda m: variables.get(m.group(1), m.group(0)),
+			rmatch.group(2))
+        netpath = os.path.join(lvsdir, netfile)
+        if netfile == '/dev/null':
+            continue
+        elif os.path.isfile(netpath):
+            with open(netpath, 'r', errors='replace') as nfile:
+                data = nfile.read()
+            rex = subcktrex if rmatch.group(1) == 'spice' else modulerex
+            refcells.update(name.lower() for name in rex.findall(data))
+        else:
+            prefixes.append(os.path.splitext(os.path.basename(netfile))[0].lower() + '__')
+    return setup, top, setupfile, refcells, prefixes
+
+#----------------------------------------------------------------------
+# Return the cells to compare, children first, given the hashes of the
+# netlist and of the baseline.
+#----------------------------------------------------------------------
+
+def plan(hashes, baseline, top, refcells, prefixes):
+    def in_reference(cell):
+        return cell in refcells or any(cell.startswith(p) for p in prefixes)
+
+    parents = {}
+    for name, entry in hashes.items():
+        for child in entry['children']:
+            parents.setdefault(child, set()).add(name)
+
+    changed = [name for name in hashes if baseline.get(name) != hashes[name]['hash']]
+    stale = set()
+    pending = list(changed)
+    while pending:
+        cell = pending.pop()
+        if cell in stale:
+            continue
+        stale.add(cell)
+        if cell != top and not in_reference(cell):
+            pending.extend(parents.get(cell, ()))
+
+    # Keep only the cells under the top cell, and not under another
+    # cell that is compared
+
+    compare = set(cell for cell in stale if cell == top or in_reference(cell))
+    order = []
+    covered = set()
+
+    def visit(cell, inside):
+        if cell in covered:
+            return
+        covered.add(cell)
+        for child in hashes[cell]['children']:
+            visit(child, inside or cell in compare)
+        if cell in compare and not inside:
+            order.append(cell)
+
+    if top in hashes:
+        visit(top, False)
+    return changed, order
+
+def write_script(filepath, setup, setupfile, cells):
+    lines = ['# Incremental LVS generated by lvs_plan.py;  compares only the cells',
+		'# changed since the last clean run.', '']
+    lines.extend(setup)
+    lines.append('')
+    for cell in cells:
+        lines.append('lvs "$circuit1 ' + cell + '" "$circuit2 ' + cell + '" ' +
+		setupfile + ' ' + cell + '_comp.out')
+    with open(filepath, 'w') as ofile:
+        ofile.write('\n'.join(lines) + '\n')
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > 1:
+        print('Wrong number of arguments given to lvs_plan.py.')
+        usage()
+        sys.exit(1)
+
+    project_path = arguments[0] if arguments else os.getcwd()
+    spicefile = 'netlist/layout/panamax.spice'
+    lvsfile = 'lvs/panamax.tcl'
+    baselinefile = 'lvs/lvs_baseline.json'
+    scriptfile = 'lvs/panamax_incr.tcl'
+    update = False
+    usecache = True
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-netlist' and value:
+            spicefile = value
+        elif key == '-lvs' and value:
+            lvsfile = value
+        elif key == '-baseline' and value:
+            baselinefile = value
+        elif key == '-script' and value:
+            scriptfile = value
+        elif key == '-update':
+            update = True
+        elif key == '-nocache':
+            usecache = False
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    spicefile = os.path.join(project_path, spicefile)
+    lvsfile = os.path.join(project_path, lvsfile)
+    baselinefile = os.path.join(project_path, baselinefile)
+    scriptfile = os.path.join(project_path, scriptfile)
+    for filepath in (spicefile, lvsfile):
+        if not os.path.isfile(filepath):
+            print('Error:  No file ' + filepath + '.')
+            sys.exit(1)
+
+    hashes = spice_index.read_hashes(spicefile, usecache)
+    setup, top, setupfile, refcells, prefixes = read_lvs_script(lvsfile)
+    if top is None:
+        print('Error:  No "lvs" command found in ' + lvsfile + '.')
+        sys.exit(1)
+    top = top.lower()
+    if top not in hashes:
+        print('Error:  No subcircuit ' + top + ' in ' + spicefile + '.')
+        sys.exit(1)
+
+    if update:
+        with open(baselinefile, 'w') as ofile:
+            json.dump({'version': baseline_version, 'top': top,
+			'cells': dict((name, entry['hash']) for name, entry in hashes.items())},
+			ofile, indent=1, sort_keys=True)
+            ofile.write('\n')
+        print('Saved the hashes of ' + str(len(hashes)) + ' cells to ' + baselinefile + '.')
+        sys.exit(0)
+
+    baseline = {}
+    if os.path.isfile(baselinefile):
+        with open(baselinefile, 'r') as ifile:
+            saved = json.load(ifile)
+        if saved.get('version') == baseline_version and saved.get('top') == top:
+            baseline = saved['cells']
+        else:
+            print('Warning:  Baseline ' + baselinefile + ' does not match;  ignoring it.')
+    else:
+        print('No baseline ' + baselinefile + ';  all cells are stale.')
+
+    changed, cells = plan(hashes, baseline, top, refcells, prefixes)
+    removed = [name for name in baseline if name not in hashes]
+
+    print('Cells:    ' + str(len(hashes)))
+    print('Changed:  ' + str(len(changed)) + (' (' + ', '.join(sorted(changed)) + ')'
+		if changed and len(changed) <= 10 else ''))
+    if removed:
+        print('Removed:  ' + str(len(removed)))
+    if not cells:
+        print('No cells need to be compared.')
+    else:
+        print('Compare:  ' + ', '.join(cells))
+        if top in cells:
+            print('The top cell is stale;  this is a full LVS run.')
+    write_script(scriptfile, setup, setupfile, cells)
+    print('Wrote ' + scriptfile + '.')
+    sys.exit(0)
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# lvs_report.py ---
+#
+# Summarize the output of a netgen LVS run (lvs/panamax_comp.out and
+# lvs/netgen_panamax.log), and compare it against a saved baseline so
+# that only new or fixed mismatches are shown.
+#
+# Both files are read one line at a time, and only the mismatches are
+# kept, so the memory used does not depend on the size of the output.
+# For each cell compared, the record holds the result, the device and
+# net counts of each circuit, the device classes and pins that do not
+# match, the number of unmatched nets and instances, disconnected nodes
+# and property errors.  Pins reported as shorted together in the log
+# file are collected into groups.
+#
+# With "-save=<file>", the summary is written as JSON, and with
+# "-baseline=<file>", it is compared against a summary saved earlier.
+# The exit status is 1 if LVS failed or, when comparing against a
+# baseline, if there are any new mismatches.
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+
+def usage():
+    print("Usage:")
+    print("lvs_report.py [<options>] [<comp_file> [<log_file>]]")
+    print("")
+    print("Defaults are lvs/panamax_comp.out and lvs/netgen_panamax.log.")
+    print("")
+    print("options:")
+    print("    -json                print the summary as JSON")
+    print("    -all                 list every cell, not only those with mismatches")
+    print("    -save=<file>         save the summary to <file>")
+    print("    -baseline=<file>     show the differences from a saved summary")
+    return 0
+
+resultrex = re.compile(r'^(Netlists (?:do not )?match.*)\.$')
+countrex = re.compile(r'Number of (devices|nets): (\d+)')
+summaryrex = re.compile(r'^Circuit 1: (.*?)\s*\|Circuit 2: (.*?)\s*$')
+blackboxrex = re.compile(r'^Circuit 1 cell (\S+) and Circuit 2 cell (\S+) are black boxes')
+classesrex = re.compile(r'^Device classes (\S+) and (\S+) are (not )?equivalent')
+disconnectrex = re.compile(r'^Cell (\S+) \((\d)\) disconnected node: (\S+)')
+shortrex = re.compile(r'^Pins (\S+) and (\S+) are shorted in cell (\S+) \((\d)\)')
+propertyrex = re.compile(r'^\s*(\S+)\s+circuit1:\s*(\S+)\s+circuit2:\s*(\S+)')
+finalrex = re.compile(r'^Final result:\s*(.*)$')
+
+def new_record(name):
+    return {
+	'cell': name,
+	'result': None,
+	'devices': [None, None],
+	'nets': [None, None],
+	'classes': [],
+	'pins': [],
+	'nets_unmatched': 0,
+	'instances_unmatched': 0,
+	'disconnected': [],
+	'properties': [],
+    }
+
+# Split a two-column line of the comparison output at the column
+# separator found in the table header.  Returns the stripped left and
+# right parts.
+
+def columns(line, split):
+    if split is None or len(line) <= split or line[split] != '|':
+        return None
+    return line[:split].strip(), line[split + 1:].strip()
+
+#----------------------------------------------------------------------
+# Generate the per-cell records of a netgen comparison output file,
+# followed by a final record holding the final result.
+#----------------------------------------------------------------------
+
+def read_comp(filepath):
+    record = None
+    table = None
+    split = None
+    pending = []		# Disconnected nodes reported before the summary
+    final = None
+
+    with open(filepath, 'r') as ifile:
+        for line in ifile:
+            line = line.rstrip('\n')
+
+            tmatch = summaryrex.match(line)
+            if tmatch:
+                split = line.index('|')
+                if table == 'summary' and record is not None:
+                    # Another attempt at the same cell;  start over
+                    record.update(new_record(record['cell']))
+                if record is None:
+                    record = new_record(tmatch.group(1))
+                    record['disconnected'] = pending
+                    pending = []
+                continue
+            if line.startswith('Subcircuit summary:'):
+                table = 'summary'
+                continue
+            if line.startswith('Subcircuit pins:'):
+                table = 'pins'
+                continue
+            if line.startswith('NET mismatches'):
+                table = 'nets'
+                continue
+            if line.startswith('DEVICE mismatches'):
+                table = 'devices'
+                continue
+            if line.startswith('-----'):
+                continue
+
+            bmatch = blackboxrex.match(line)
+            if bmatch:
+                record = new_record(bmatch.group(1))
+                record['result'] = 'black box'
+                continue
+
+            cmatch = classesrex.match(line)
+            if cmatch:
+                if record is None:
+                    record = new_record(cmatch.group(1))
+                record['cell'] = cmatch.group(1)
+                if cmatch.group(3):
+                    record['result'] = 'classes not equivalent'
+                yield record
+                record = None
+                table = None
+                continue
+
+            rmatch = resultrex.match(line)
+            if rmatch:
+                if record is not None:
+                    record['result'] = rmatch.group(1)
+                table = None
+                continue
+
+            dmatch = disconnectrex.match(line)
+            if dmatch:
+                node = [int(dmatch.group(2)), dmatch.group(3)]
+                target = record['disconnected'] if record else pending
+                if node not in target:
+                    target.append(node)
+                continue
+
+            fmatch = finalrex.match(line)
+            if fmatch:
+                final = fmatch.group(1)
+                continue
+            if final == '' and line.strip():
+                final = line.strip()
+                continue
+
+            pmatch = propertyrex.match(line)
+            if pmatch and record is not None:
+                record['properties'].append(list(pmatch.groups()))
+                continue
+
+            if record is None or table is None:
+                continue
+            parts = columns(line, split)
+            if parts is None:
+                continue
+            left, right = parts
+
+            if table == 'summary':
+                counts = [countrex.match(left), countrex.match(right)]
+                if counts[0] or counts[1]:
+                    key = (counts[0] or counts[1]).group(1)
+                    record[key] = [int(c.group(2)) if c else None for c in counts]
+                elif '**Mismatch**' in line or '(no matching element)' in line:
+                    record['classes'].append([left.replace(' **Mismatch**', ''),
+				right.replace(' **Mismatch**', '')])
+            elif table == 'pins':
+                if ('**Mismatch**' in line or left.startswith('(no ') or
+				right.startswith('(no ')):
+                    record['pins'].append([left.replace(' **Mismatch**', ''),
+				right.replace(' **Mismatch**', '')])
+            elif table == 'nets':
+                if '(no matching net)' in line:
+                    record['nets_unmatched'] += 1
+            elif table == 'devices':
+                if '(no matching instance)' in line:
+                    record['instances_unmatched'] += 1
+
+    if record is not None:
+        yield record
+    yield {'final': final}
+
+# Return the groups of pins shorted together in the log file, as a
+# list of [cell, circuit, [pins...]] with the pins sorted.
+
+def read_shorts(filepath):
+    groups = {}
+    with open(filepath, 'r') as ifile:
+        for line in ifile:
+            smatch = shortrex.match(line)
+            if not smatch:
+                continue
+            pin1, pin2, cell, circuit = smatch.groups()
+            key = (cell, int(circuit))
+            cellgroups = groups.setdefault(key, [])
+            found = [g for g in cellgroups if pin1 in g or pin2 in g]
+            merged = {pin1, pin2}.union(*found)
+            for g in found:
+                cellgroups.remove(g)
+            cellgroups.append(merged)
+    return [[cell, circuit, sorted(g)] for (cell, circuit), cellgroups
+		in sorted(groups.items()) for g in cellgroups]
+
+#----------------------------------------------------------------------
+# Build the summary of an LVS run.
+#----------------------------------------------------------------------
+
+def has_mismatch(record):
+    return bool(record['classes'] or record['pins'] or record['nets_unmatched']
+		or record['instances_unmatched'] or record['properties']
+		or record['devices'][0] != record['devices'][1]
+		or record['nets'][0] != record['nets'][1]
+		or (record['result'] and 'do not match' in record['result']))
+
+def summarize(compfile, logfile=None):
+    summary = {'final': None, 'cells': [], 'shorts': []}
+    for record in read_comp(compfile):
+        if 'final' in record:
+            summary['final'] = record['final']
+        else:
+            summary['cells'].append(record)
+    if logfile and os.path.isfile(logfile):
+        summary['shorts'] = read_shorts(logfile)
+    return summary
+
+# Reduce a summary to a set of strings, one per mismatch, for comparing
+# two runs.  A cell compared more than once is keyed by its name and
+# the order in which it appears.
+
+def mismatch_keys(summary):
+    keys = set()
+    seen = {}
+    for record in summary['cells']:
+        n = seen.get(record['cell'], 0)
+        seen[record['cell']] = n + 1
+        cell = record['cell'] + ('' if n == 0 else ' #' + str(n + 1))
+        if record['result'] and 'do not match' in record['result']:
+            keys.add(cell + ':  ' + record['result'])
+        for key in ('devices', 'nets'):
+            if record[key][0] != record[key][1]:
+                keys.add(cell + ':  %s %s vs %s' % (key, *record[key]))
+        for left, right in record['classes']:
+            keys.add(cell + ':  class ' + left + ' | ' + right)
+        for left, right in record['pins']:
+            keys.add(cell + ':  pin ' + left + ' | ' + right)
+        for prop in record['properties']:
+            keys.add(cell + ':  property %s %s vs %s' % tuple(prop))
+        if record['nets_unmatched']:
+            keys.add(cell + ':  ' + str(record['nets_unmatched']) + ' unmatched nets')
+        if record['instances_unmatched']:
+            keys.add(cell + ':  ' + str(record['instances_unmatched']) +
+			' unmatched instances')
+    # A group of shorted pins is one key, so that a change to one pin of
+    # the group does not change the key of every other pin
+    for cell, circuit, pins in summary['shorts']:
+        keys.add(cell + ' (' + str(circuit) + '):  shorted ' + ' '.join(sorted(pins)))
+    if summary['final']:
+        keys.add('Final result:  ' + summary['final'])
+    return keys
+
+def print_summary(summary, showall=False):
+    cells = summary['cells']
+    bad = [r for r in cells if has_mismatch(r)]
+    print('Cells compared:  ' + str(len(cells)) + ', with mismatches:  ' + str(len(bad)))
+    for record in (cells if showall else bad):
+        print('')
+        print(record['cell'] + ':  ' + (record['result'] or 'pins only'))
+        print('    devices %s / %s, nets %s / %s' % (*record['devices'], *record['nets']))
+        for left, right in record['classes']:
+            print('    class:  ' + left + ' | ' + right)
+        for left, right in record['pins']:
+            print('    pin:  ' + left + ' | ' + right)
+        for prop in record['properties']:
+            print('    property %s:  %s vs %s' % tuple(prop))
+        if record['nets_unmatched']:
+            print('    unmatched nets:  ' + str(record['nets_unmatched']))
+        if record['instances_unmatched']:
+            print('    unmatched instances:  ' + str(record['instances_unmatched']))
+        for circuit, node in record['disconnected']:
+            print('    disconnected (' + str(circuit) + '):  ' + node)
+    if summary['shorts']:
+        print('')
+        for cell, circuit, pins in summary['shorts']:
+            print('Shorted in ' + cell + ' (' + str(circuit) + '):  ' + ', '.join(pins))
+    print('')
+    print('Final result:  ' + str(summary['final']))
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > 2:
+        print('Wrong number of arguments given to lvs_report.py.')
+        usage()
+        sys.exit(1)
+
+    compfile = arguments[0] if len(arguments) > 0 else 'lvs/panamax_comp.out'
+    logfile = arguments[1] if len(arguments) > 1 else None
+    if logfile is None and len(arguments) == 0:
+        logfile = 'lvs/netgen_panamax.log'
+
+    jsonmode = False
+    showall = False
+    savefile = None
+    basefile = None
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-json':
+            jsonmode = True
+        elif key == '-all':
+            showall = True
+        elif key == '-save' and value:
+            savefile = value
+        elif key == '-baseline' and value:
+            basefile = value
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    if not os.path.isfile(compfile):
+        print('Error:  No LVS comparison file ' + compfile + '.')
+        sys.exit(1)
+
+    summary = summarize(compfile, logfile)
+
+    if basefile:
+        try:
+            with open(basefile, 'r') as ifile:
+                baseline = json.load(ifile)
+        except (OSError, ValueError) as e:
+            print('Error:  Cannot read baseline ' + basefile + ':  ' + str(e))
+            sys.exit(1)
+        oldkeys = mismatch_keys(baseline)
+        newkeys = mismatch_keys(summary)
+        added = sorted(newkeys - oldkeys)
+        fixed = sorted(oldkeys - newkeys)
+        if jsonmode:
+            print(json.dumps({'new': added, 'fixed': fixed}, indent=1))
+        else:
+            for key in added:
+                print('New:    ' + key)
+            for key in fixed:
+                print('Fixed:  ' + key)
+            if not added and not fixed:
+                print('No changes from baseline ' + basefile + '.')
+    elif jsonmode:
+        print(json.dumps(summary, indent=1))
+    else:
+        print_summary(summary, showall)
+
+    if savefile:
+        with open(savefile, 'w') as ofile:
+            json.dump(summary, ofile, indent=1)
+            ofile.write('\n')
+
+    if basefile:
+        sys.exit(1 if added else 0)
+    sys.exit(1 if summary['final'] and 'failed' in summary['final'].lower() else 0)
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# mag_index.py ---
+#
+# Reader for magic database (.mag) files, and an index of the subcell
+# instances of a cell, for checks that would otherwise need a magic
+# session.  A cell is read into:
+#
+#   rects:      layer -> array of x1, y1, x2, y2 values
+#   labels:     list of (layer, text, x1, y1, x2, y2, port number)
+#   subcells:   list of the names of the cells used
+#   paths:      cell name -> path given in the "use" line, if any
+#   uses:       instance tables:  "cell" (position in subcells), "name",
+#		"transform" (six values each) and "box" (four values each)
+#   arrays:     instance number -> array parameters, for arrayed uses
+#   fixed_bbox: the abutment box (FIXED_BBOX property), or None
+#
+# Coordinates are kept in the internal units of the file;  with
+# "magscale n d", a value times n / d is in lambda (0.01um).  Parsed
+# cells are cached (see index_cache.py), and child cells are read from
+# the same directory only when they are needed.
+#
+# From the command line, the instances can be listed by cell name and
+# side of the padframe, and the gaps between abutting padframe cells
+# can be found and checked against doc/padframe.txt.
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+from array import array
+
+import index_cache
+
+# Version of the index format, for the cache
+index_version = 2
+
+# Sides of the chip, and the direction along each side in which the
+# padframe cells are ordered.
+sides = ('north', 'south', 'east', 'west')
+
+def usage():
+    print("Usage:")
+    print("mag_index.py [<options>] <mag_file>")
+    print("")
+    print("options:")
+    print("    -cell=<regexp>       list instances of cells matching <regexp>")
+    print("    -side=<side>         only list instances on one side (north, south, east, west)")
+    print("    -gaps                list gaps between padframe cells")
+    print("    -padframe=<file>     check the padframe against doc/padframe.txt")
+    print("    -nocache             do not read or write the index cache")
+    return 0
+
+#----------------------------------------------------------------------
+# Read a .mag file into a cell dictionary as described above.
+#----------------------------------------------------------------------
+
+def parse_mag(filepath):
+    cell = {
+	'tech': None,
+	'magscale': (1, 1),
+	'rects': {},
+	'labels': [],
+	'subcells': [],
+	'paths': {},
+	'uses': {
+	    'cell': array('i'),
+	    'name': [],
+	    'transform': array('i'),
+	    'box': array('i'),
+	},
+	'arrays': {},
+	'fixed_bbox': None,
+    }
+    uses = cell['uses']
+    subcellnum = {}
+    rects = None
+    label = None
+
+    with open(filepath, 'r') as ifile:
+        for line in ifile:
+            tokens = line.split()
+            if not tokens:
+                continue
+            key = tokens[0]
+            if key == 'rect':
+                if rects is not None:
+                    rects.extend(int(v) for v in tokens[1:5])
+            elif key == '<<':
+                layer = tokens[1]
+                if layer in ('labels', 'properties', 'end', 'checkpaint'):
+                    rects = None
+                else:
+                    rects = cell['rects'].setdefault(layer, array('i'))
+            elif key == 'use':
+                rects = None
+                cellname = tokens[1]
+                if cellname not in subcellnum:
+                    subcellnum[cellname] = len(cell['subcells'])
+                    cell['subcells'].append(cellname)
+                if len(tokens) > 3:
+                    cell['paths'][cellname] = tokens[3]
+                uses['cell'].append(subcellnum[cellname])
+                uses['name'].append(tokens[2] if len(tokens) > 2 else
+			cellname + '_' + str(len(uses['name'])))
+                uses['transform'].extend((1, 0, 0, 0, 1, 0))
+                uses['box'].extend((0, 0, 0, 0))
+            elif key == 'transform':
+                uses['transform'][-6:] = array('i', (int(v) for v in tokens[1:7]))
+            elif key == 'box':
+                uses['box'][-4:] = array('i', (int(v) for v in tokens[1:5]))
+            elif key == 'array':
+                cell['arrays'][len(uses['name']) - 1] = tuple(int(v) for v in tokens[1:7])
+            elif key in ('rlabel', 'flabel'):
+                # "rlabel <layer> [s] x1 y1 x2 y2 <pos> <text>"
+                # "flabel <layer> [s] x1 y1 x2 y2 <pos> <font> <size> <rot>
+                #	<offx> <offy> <text>"
+                i = 3 if tokens[2] == 's' else 2
+                coords = tuple(int(v) for v in tokens[i:i + 4])
+                text = ' '.join(tokens[i + (5 if key == 'rlabel' else 10):])
+                label = [tokens[1], text] + list(coords) + [None]
+                cell['labels'].append(label)
+            elif key == 'port' and label is not None:
+                label[6] = int(tokens[1])
+            elif key == 'string' and len(tokens) == 6 and tokens[1] == 'FIXED_BBOX':
+                cell['fixed_bbox'] = tuple(int(v) for v in tokens[2:6])
+            elif key == 'magscale':
+                cell['magscale'] = (int(tokens[1]), int(tokens[2]))
+            elif key == 'tech':
+                cell['tech'] = tokens[1]
+
+    cell['labels'] = [tuple(label) for label in cell['labels']]
+    return cell
+
+def read_mag(filepath, usecache=True):
+    return index_cache.cached(filepath, 'magindex', index_version, parse_mag,
+		usecache)
+
+# Return the cell "cellname" from the directory "libdir", reading it
+# if it has not been read already.  Cells that are not in "libdir"
+# (such as the PDK I/O cells) are recorded as None.
+
+def load_cell(cells, libdir, cellname, usecache=True):
+    if cellname not in cells:
+        filepath = os.path.join(libdir, cellname + '.mag')
+        if os.path.isfile(filepath):
+            cells[cellname] = read_mag(filepath, usecache)
+        else:
+            cells[cellname] = None
+    return cells[cellname]
+
+#----------------------------------------------------------------------
+# Geometry.
+#----------------------------------------------------------------------
+
+def transform_rect(t, rect):
+    x1 = t[0] * rect[0] + t[1] * rect[1] + t[2]
+    y1 = t[3] * rect[0] + t[4] * rect[1] + t[5]
+    x2 = t[0] * rect[2] + t[1] * rect[3] + t[2]
+    y2 = t[3] * rect[2] + t[4] * rect[3] + t[5]
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+def compose(t, u):
+    # Transform "u" (child) followed by "t" (parent)
+    return (t[0] * u[0] + t[1] * u[3], t[0] * u[1] + t[1] * u[4],
+		t[0] * u[2] + t[1] * u[5] + t[2],
+		t[3] * u[0] + t[4] * u[3], t[3] * u[1] + t[4] * u[4],
+		t[3] * u[2] + t[4] * u[5] + t[5])
+
+def instance_transform(cell, n):
+    return tuple(cell['uses']['transform'][n * 6:n * 6 + 6])
+
+def instance_bbox(cell, n):
+    box = cell['uses']['box'][n * 4:n * 4 + 4]
+    return transform_rect(instance_transform(cell, n), box)
+
+def instance_cellname(cell, n):
+    return cell['subcells'][cell['uses']['cell'][n]]
+
+def microns(cell, value):
+    return value * cell['magscale'][0] / cell['magscale'][1] / 100
+
+# Return the directory holding the subcell "cellname" of a cell read
+# from "libdir".  Paths in the "use" line that refer to an environment
+# variable (such as $PDKPATH) are followed only if the variable is set.
+
+def subcell_dir(cell, libdir, cellname):
+    path = cell['paths'].get(cellname)
+    if path:
+        path = os.path.expandvars(os.path.expanduser(path))
+        if not path.startswith('$'):
+            return os.path.join(libdir, path)
+    return libdir
+
+# Return the rectangles of one layer in a cell and (reading child cells
+# as needed) in all of its subcells, in the coordinates of the cell.
+# Arrayed instances are expanded, and child cells written with a
+# different magscale are scaled to the units of the cell.
+
+def flat_rects(cells, libdir, cell, layer, t=(1, 0, 0, 0, 1, 0), usecache=True):
+    values = cell['rects'].get(layer, ())
+    for i in range(0, len(values), 4):
+        yield transform_rect(t, values[i:i + 4])
+    for n in range(len(cell['uses']['name'])):
+        cellname = instance_cellname(cell, n)
+        childdir = subcell_dir(cell, libdir, cellname)
+        child = load_cell(cells, childdir, cellname, usecache)
+        if child is None:
+            continue
+        ct = compose(t, instance_transform(cell, n))
+        scale = (child['magscale'][0] * cell['magscale'][1] /
+			(child['magscale'][1] * cell['magscale'][0]))
+        if scale != 1:
+            ct = compose(ct, (scale, 0, 0, 0, scale, 0))
+        if n in cell['arrays']:
+            xlo, xhi, xsep, ylo, yhi, ysep = cell['arrays'][n]
+            for ax in range(xhi - xlo + 1):
+                for ay in range(yhi - ylo + 1):
+                    at = compose(ct, (1, 0, ax * xsep / scale, 0, 1, ay * ysep / scale))
+                    yield from flat_rects(cells, childdir, child, layer, at, usecache)
+        else:
+            yield from flat_rects(cells, childdir, child, layer, ct, usecache)
+
+#----------------------------------------------------------------------
+# Padframe queries.
+#----------------------------------------------------------------------
+
+# Return the extent of the padframe:  the bounding box of the corner
+# cells, or if there are none, of all instances in the cell.
+
+def instance_extent(cell):
+    boxes = [instance_bbox(cell, n) for n in range(len(cell['uses']['name']))
+		if 'corner' in instance_cellname(cell, n)]
+    if not boxes:
+        boxes = [instance_bbox(cell, n) for n in range(len(cell['uses']['name']))]
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+		max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+# Return the side of the chip that a box is closest to
+
+def box_side(box, extent):
+    distance = {
+	'west': box[0] - extent[0],
+	'south': box[1] - extent[1],
+	'east': extent[2] - box[2],
+	'north': extent[3] - box[3],
+    }
+    return min(sides, key=lambda side: distance[side])
+
+# Position of a box along a side, for ordering, and its extent along
+# the side.
+
+def along(box, side):
+    if side in ('east', 'west'):
+        return box[1], box[3]
+    return box[0], box[2]
+
+# Return a list of (instance number, cell name, instance name, side,
+# box) for instances whose cell name matches the regular expression
+# "pattern" (if given) and on side "side" (if given), in order along
+# the side.
+
+def find_instances(cell, pattern=None, side=None):
+    extent = instance_extent(cell)
+    prog = re.compile(pattern) if pattern else None
+    found = []
+    for n, name in enumerate(cell['uses']['name']):
+        cellname = instance_cellname(cell, n)
+        if prog and not prog.search(cellname):
+            continue
+        box = instance_bbox(cell, n)
+        bside = box_side(box, extent)
+        if side and bside != side:
+            continue
+        found.append((n, cellname, name, bside, box))
+    found.sort(key=lambda f: (sides.index(f[3]), along(f[4], f[3])))
+    return found
+
+# Return the padframe instances of one side:  those whose outer edge
+# is within 1um of the edge of the chip, in order along the side.  The
+# corner cells are included in every side on which they lie.
+
+def ring_instances(cell, side):
+    extent = instance_extent(cell)
+    tolerance = 100 * cell['magscale'][1] // cell['magscale'][0]
+    ring = []
+    for n, name in enumerate(cell['uses']['name']):
+        box = instance_bbox(cell, n)
+        if ((side == 'west' and box[0] - extent[0] <= tolerance) or
+			(side == 'south' and box[1] - extent[1] <= tolerance) or
+			(side == 'east' and extent[2] - box[2] <= tolerance) or
+			(side == 'north' and extent[3] - box[3] <= tolerance)):
+            ring.append((n, instance_cellname(cell, n), name, side, box))
+    ring.sort(key=lambda f: along(f[4], side))
+    return ring
+
+# Return a list of (instance name, next instance name, gap) for each
+# stretch of one side that is not covered by padframe cells.  The boxes
+# of the I/O cells extend past their abutment boundaries, so the cells
+# overlap their neighbors;  only uncovered stretches are reported.
+
+def abutment_gaps(cell, side):
+    gaps = []
+    last = None
+    for f in ring_instances(cell, side):
+        lo, hi = along(f[4], side)
+        if last is not None and lo > last[1]:
+            gaps.append((last[0], f[2], lo - last[1]))
+        if last is None or hi > last[1]:
+            last = (f[2], hi)
+    return gaps
+
+# Return the span between the corner cells of one side and the length
+# of that span which is covered by padframe cells.
+
+def side_fill(cell, side):
+    ring = ring_instances(cell, side)
+    corners = [f for f in ring if 'corner' in f[1]]
+    if len(corners) < 2:
+        return None
+    start = along(corners[0][4], side)[1]
+    end = along(corners[-1][4], side)[0]
+    filled = 0
+    covered = start
+    for f in ring:
+        lo, hi = along(f[4], side)
+        lo, hi = max(lo, covered), min(hi, end)
+        if hi > lo:
+            filled += hi - lo
+            covered = hi
+    return end - start, filled
+
+# Read the space between corner cells from doc/padframe.txt, as a
+# dictionary of side -> microns.
+
+def read_padframe(filepath):
+    with open(filepath, 'r') as ifile:
+        text = ifile.read()
+    spans = {}
+    hmatch = re.search(r'Horizontal space between corner cells = ([\d.]+)um', text)
+    vmatch = re.search(r'Vertical space between corner cells = ([\d.]+)um', text)
+    if hmatch:
+        spans['north'] = spans['south'] = float(hmatch.group(1))
+    if vmatch:
+        spans['east'] = spans['west'] = float(vmatch.group(1))
+    return spans
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) != 1:
+        print('Wrong number of arguments given to mag_index.py.')
+        usage()
+        sys.exit(1)
+
+    magfile = arguments[0]
+    usecache = True
+    pattern = None
+    side = None
+    gaps = False
+    padframe = None
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-nocache':
+            usecache = False
+        elif key == '-cell' and value:
+            pattern = value
+        elif key == '-side' and value in sides:
+            side = value
+        elif key == '-gaps':
+            gaps = True
+        elif key == '-padframe' and value:
+            padframe = value
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    if not os.path.isfile(magfile):
+        print('Error:  No layout file ' + magfile + '.')
+        sys.exit(1)
+
+    cell = read_mag(magfile, usecache)
+    status = 0
+
+    if not (pattern or side or gaps or padframe):
+        print('Layers:      ' + str(len(cell['rects'])))
+        print('Rects:       ' + str(sum(len(r) // 4 for r in cell['rects'].values())))
+        print('Labels:      ' + str(len(cell['labels'])))
+        print('Subcells:    ' + str(len(cell['subcells'])))
+        print('Instances:   ' + str(len(cell['uses']['name'])))
+
+    if pattern or side:
+        for n, cellname, name, bside, box in find_instances(cell, pattern, side):
+            print('%-6s %-40s %-48s (%g %g) (%g %g)' % (bside, name, cellname,
+			*(microns(cell, v) for v in box)))
+
+    checksides = [side] if side else sides
+    if gaps:
+        for gside in checksides:
+            for prev, next, gap in abutment_gaps(cell, gside):
+                print('%-6s %s to %s:  gap %gum' % (gside, prev, next,
+			microns(cell, gap)))
+
+    if padframe:
+        spans = read_padframe(padframe)
+        for pside in checksides:
+            fill = side_fill(cell, pside)
+            if fill is None:
+                print('Error:  No corner cells found on the ' + pside + ' side.')
+                status = 1
+                continue
+            span, filled = (microns(cell, v) for v in fill)
+            expected = spans.get(pside)
+            print('%-6s corner-to-corner %gum, filled %gum, expected %s' % (pside,
+			span, filled, '%gum' % expected if expected else 'unknown'))
+            if filled != span or (expected and abs(span - expected) > 0.001):
+                print('Error:  Padframe on the ' + pside + ' side does not match.')
+                status = 1
+
+    sys.exit(status)
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# patch_id_gds.py ---
+#
+# Set the project ID and product ID directly in a GDS file of the
+# padframe (e.g., panamax.gds.gz as written by panamax_prep.sh), without
+# regenerating it from the magic database.
+#
+# The GDS is read as a stream of records.  Records of every structure
+# are copied to the output unchanged, except for the structures of the
+# ID ROMs and the ID text block:
+#
+#   project_id_rom_32bit, product_id_rom_8bit:
+#	The via cut (mcon) of each bit is moved to its zero or one
+#	position, using the same via tables as set_project_id.py and
+#	set_product_id.py.
+#
+#   project_id_textblock:
+#	The eight glyph references (ordered right to left, least
+#	significant digit first) are changed to the glyph cells
+#	alpha_0 to alpha_F for the project ID digits.  Any glyph cell
+#	not already in the GDS is generated from mag/hexdigits/.
+#
+# Only one structure is held in memory at a time.  The input and
+# output files are compressed if their names end in ".gz".
+#
+# The ID values are given with the "-project=<value>" and
+# "-product=<value>" options, or taken from the keys "project_id" and
+# "product_id" in the info.yaml file in the project top level directory.
+#----------------------------------------------------------------------
+
+import os
+import sys
+import gzip
+import struct
+
+import id_rom
+
+# GDS record types used here
+HEADER = 0x00
+BGNLIB = 0x01
+UNITS = 0x03
+ENDLIB = 0x04
+BGNSTR = 0x05
+STRNAME = 0x06
+ENDSTR = 0x07
+BOUNDARY = 0x08
+PATH = 0x09
+SREF = 0x0A
+AREF = 0x0B
+TEXT = 0x0C
+LAYER = 0x0D
+DATATYPE = 0x0E
+XY = 0x10
+ENDEL = 0x11
+SNAME = 0x12
+NODE = 0x15
+BOX = 0x2D
+
+# Record types that begin an element
+element_types = (BOUNDARY, PATH, SREF, AREF, TEXT, NODE, BOX)
+
+# GDS (layer, datatype) of the magic layers used by the glyph cells
+glyph_gdslayers = {'metal5': (72, 20)}
+
+def usage():
+    print("Usage:")
+    print("patch_id_gds.py [-project=<value>] [-product=<value>] <input_gds> <output_gds> [<path_to_project>]")
+    print("")
+    print("where:")
+    print("    <value> is the ID value as a hex number,")
+    print("    <input_gds> is the GDS of the padframe (may be gzipped),")
+    print("    <output_gds> is the GDS file to write (gzipped if ending in .gz), and")
+    print("    <path_to_project> is the path to the project top level directory.")
+    print("")
+    print("  ID values not given as options are taken from the info.yaml file.")
+    print("  If <path_to_project> is not given, then it is assumed to be the cwd.")
+    return 0
+
+#----------------------------------------------------------------------
+# Record input and output.  Each record is a tuple of the record type,
+# the data type and the raw bytes of the record (including its header).
+#----------------------------------------------------------------------
+
+def read_records(ifile):
+    while True:
+        header = ifile.read(4)
+        if len(header) < 4:
+            return
+        length, rectype, datatype = struct.unpack('>HBB', header)
+        if length < 4:
+            raise ValueError('Bad GDS record length ' + str(length))
+        data = ifile.read(length - 4)
+        yield rectype, datatype, header + data
+        if rectype == ENDLIB:
+            return
+
+def make_record(rectype, datatype, data):
+    return (rectype, datatype, struct.pack('>HBB', len(data) + 4, rectype,
+		datatype) + data)
+
+def record_string(record):
+    return record[2][4:].rstrip(b'\0').decode('ascii')
+
+def string_data(value):
+    data = value.encode('ascii')
+    if len(data) % 2:
+        data += b'\0'
+    return data
+
+def record_ints(record):
+    data = record[2][4:]
+    return list(struct.unpack('>' + str(len(data) // 4) + 'i', data))
+
+def record_short(record):
+    return struct.unpack('>h', record[2][4:6])[0]
+
+def ints_data(values):
+    return struct.pack('>' + str(len(values)) + 'i', *values)
+
+# Decode a GDS 8-byte real (excess-64, base-16 exponent).
+
+def gds_real(data):
+    exponent = (data[0] & 0x7f) - 64
+    mantissa = int.from_bytes(data[1:8], 'big') / float(1 << 56)
+    value = mantissa * (16.0 ** exponent)
+    return -value if data[0] & 0x80 else value
+
+def open_gds(filename, mode):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode)
+    return open(filename, mode)
+
+#----------------------------------------------------------------------
+# Split the records of a structure into the header records, a list of
+# elements (each a list of records from the element record to ENDEL),
+# and the ENDSTR record.
+#----------------------------------------------------------------------
+
+def split_structure(records):
+    header = []
+    elements = []
+    current = None
+    for record in records:
+        if current is not None:
+            current.append(record)
+            if record[0] == ENDEL:
+                elements.append(current)
+                current = None
+        elif record[0] in element_types:
+            current = [record]
+        elif record[0] == ENDSTR:
+            return header, elements, record
+        else:
+            header.append(record)
+    raise ValueError('Structure not terminated by ENDSTR')
+
+def element_value(element, rectype):
+    for record in element:
+        if record[0] == rectype:
+            return record
+    return None
+
+def element_replace(element, record):
+    return [record if r[0] == record[0] else r for r in element]
+
+#----------------------------------------------------------------------
+# Move the via cuts of an ID ROM structure.  "dbscale" is the number of
+# database units per micron.
+#----------------------------------------------------------------------
+
+def patch_rom(elements, name, id_int, dbscale):
+    rom = id_rom.roms[name]
+    id_bits = id_rom.parse_id(id_rom.format_id(name, id_int), rom['width'])[1]
+
+    # Via boxes in database units (via_rect() returns units of 0.005um)
+    def dbbox(rect):
+        return tuple(int(round(v * dbscale / 200.0)) for v in rect)
+
+    positions = {}
+    for i in range(0, len(rom['coords'])):
+        positions[dbbox(id_rom.via_rect(rom['coords'][i]))] = i
+        positions[dbbox(id_rom.via_rect(rom['coords'][i], True))] = i
+
+    found = {}
+    for index, element in enumerate(elements):
+        if element[0][0] != BOUNDARY:
+            continue
+        layer = record_short(element_value(element, LAYER))
+        datatype = record_short(element_value(element, DATATYPE))
+        if (layer, datatype) != rom['gdslayer']:
+            continue
+        xy = record_ints(element_value(element, XY))
+        xs = xy[0::2]
+        ys = xy[1::2]
+        box = (min(xs), min(ys), max(xs), max(ys))
+        if len(xy) != 10 or box not in positions:
+            continue
+        found.setdefault(positions[box], []).append(index)
+
+    errors = []
+    for i in range(0, len(rom['coords'])):
+        if len(found.get(i, [])) != 1:
+            errors.append('bit ' + str(i) + ' has ' + str(len(found.get(i, []))) + ' via cuts')
+            continue
+        x1, y1, x2, y2 = dbbox(id_rom.via_rect(rom['coords'][i], id_bits[i] == '1'))
+        xy = [x1, y1, x2, y1, x2, y2, x1, y2, x1, y1]
+        index = found[i][0]
+        elements[index] = element_replace(elements[index], make_record(XY, 3, ints_data(xy)))
+    if errors:
+        raise id_rom.IdRomError(rom['cell'] + ': ' + '; '.join(errors))
+    return elements
+
+#----------------------------------------------------------------------
+# Change the glyph references of the ID text block.  Returns the names
+# of the glyph cells used.
+#----------------------------------------------------------------------
+
+def patch_textblock(elements, name, id_int):
+    id_value = id_rom.format_id(name, id_int)
+    glyphs = []
+    for index, element in enumerate(elements):
+        if element[0][0] == SREF and record_string(element_value(element,
+			SNAME)).startswith('alpha_'):
+            glyphs.append((record_ints(element_value(element, XY))[0], index))
+    if len(glyphs) != len(id_value):
+        raise id_rom.IdRomError('Expected ' + str(len(id_value)) +
+		' glyph references in the text block, found ' + str(len(glyphs)))
+
+    used = set()
+    for digit, (x, index) in enumerate(sorted(glyphs, reverse=True)):
+        cellname = 'alpha_' + id_value[len(id_value) - 1 - digit]
+        elements[index] = element_replace(elements[index],
+		make_record(SNAME, 6, string_data(cellname)))
+        used.add(cellname)
+    return used
+
+# Generate the records of a glyph cell structure from the magic layout.
+
+def glyph_structure(project_path, cellname, bgnstr, dbscale):
+    glyph = id_rom.read_glyph(os.path.join(project_path, 'mag', 'hexdigits',
+		cellname + '.mag'))
+    records = [bgnstr, make_record(STRNAME, 6, string_data(cellname))]
+    for layer, rects in sorted(glyph.items()):
+        if layer not in glyph_gdslayers:
+            raise id_rom.IdRomError(cellname + ': no GDS layer for ' + layer)
+        gdslayer, gdstype = glyph_gdslayers[layer]
+        for rect in rects:
+            # Glyph rects are in lambda (0.01um)
+            x1, y1, x2, y2 = (int(round(v * dbscale / 100.0)) for v in rect)
+            records.append(make_record(BOUNDARY, 0, b''))
+            records.append(make_record(LAYER, 2, struct.pack('>h', gdslayer)))
+            records.append(make_record(DATATYPE, 2, struct.pack('>h', gdstype)))
+            records.append(make_record(XY, 3, ints_data([x1, y1, x2, y1,
+			x2, y2, x1, y2, x1, y1])))
+            records.append(make_record(ENDEL, 0, b''))
+    records.append(make_record(ENDSTR, 0, b''))
+    return records
+
+#----------------------------------------------------------------------
+# Copy the GDS from "infile" to "outfile", patching the ID structures.
+# "ids" is a dictionary of ID values keyed by ROM name.  Returns the
+# list of structures that were patched.
+#----------------------------------------------------------------------
+
+def patch_gds(infile, outfile, ids, project_path):
+    cells = {}
+    textblocks = {}
+    for name in ids:
+        cells[id_rom.roms[name]['cell']] = name
+        if id_rom.roms[name]['textblock']:
+            textblocks[id_rom.roms[name]['textblock']] = name
+
+    patched = []
+    defined = set()
+    glyphs_used = set()
+    dbscale = None
+    bgnstr = None
+    structure = None
+
+    with open_gds(infile, 'rb') as ifile, open_gds(outfile, 'wb') as ofile:
+        for record in read_records(ifile):
+            rectype = record[0]
+            if structure is not None:
+                structure.append(record)
+                if rectype != ENDSTR:
+                    continue
+                strname = record_string(structure[1])
+                header, elements, endstr = split_structure(structure[1:])
+                if strname in cells:
+                    elements = patch_rom(elements, cells[strname],
+				ids[cells[strname]], dbscale)
+                else:
+                    glyphs_used |= patch_textblock(elements,
+				textblocks[strname], ids[textblocks[strname]])
+                patched.append(strname)
+                for r in [structure[0]] + header:
+                    ofile.write(r[2])
+                for element in elements:
+                    for r in element:
+                        ofile.write(r[2])
+                ofile.write(endstr[2])
+                structure = None
+                continue
+
+            if rectype == UNITS:
+                # Database units per micron
+                dbscale = 1e-6 / gds_real(record[2][12:20])
+            elif rectype == BGNSTR:
+                bgnstr = record
+            elif rectype == STRNAME:
+                strname = record_string(record)
+                defined.add(strname)
+                if strname in cells or strname in textblocks:
+                    # Hold this structure until its end
+                    structure = [bgnstr, record]
+                    continue
+                ofile.write(bgnstr[2])
+            elif rectype == ENDLIB:
+                # Add any glyph cells not found in the input
+                for cellname in sorted(glyphs_used - defined):
+                    for r in glyph_structure(project_path, cellname, bgnstr, dbscale):
+                        ofile.write(r[2])
+
+            if rectype != BGNSTR:
+                ofile.write(record[2])
+
+    missing = sorted((set(cells) | set(textblocks)) - set(patched))
+    if missing:
+        raise id_rom.IdRomError('Structure(s) not found in GDS: ' + ', '.join(missing))
+    return patched
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+    values = {}
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    for option in optionlist:
+        optname = option[1:].split('=', 1)[0]
+        if optname in id_rom.roms and '=' in option:
+            values[optname] = option.split('=', 1)[1]
+        else:
+            print('Unknown option ' + option + '.')
+            usage()
+            sys.exit(1)
+
+    if len(arguments) < 2 or len(arguments) > 3:
+        print("Wrong number of arguments given to patch_id_gds.py.")
+        usage()
+        sys.exit(0)
+
+    infile, outfile = arguments[0:2]
+    project_path = arguments[2] if len(arguments) > 2 else os.getcwd()
+
+    if not os.path.isfile(infile):
+        print('Error:  GDS file "' + infile + '" does not exist or is not readable.')
+        sys.exit(1)
+    if os.path.abspath(infile) == os.path.abspath(outfile):
+        print('Error:  The output GDS file must be different from the input.')
+        sys.exit(1)
+
+    info = id_rom.read_info_yaml(project_path) or {}
+    ids = {}
+    for name, rom in id_rom.roms.items():
+        value = values.get(name, info.get(rom['key']))
+        if value is None:
+            continue
+        try:
+            ids[name] = id_rom.parse_id(value, rom['width'])[0]
+        except ValueError:
+            print('Error:  Cannot parse ' + rom['label'] + ' "' + value + '".')
+            sys.exit(1)
+        if ids[name] == 0:
+            print('Value zero is an invalid ' + rom['label'] + '.  Exiting.')
+            sys.exit(1)
+
+    if not ids:
+        print('Error:  No info.yaml file and no ID option given.')
+        sys.exit(1)
+
+    try:
+        patched = patch_gds(infile, outfile, ids, project_path)
+    except (id_rom.IdRomError, ValueError, OSError) as e:
+        print('Error:  ' + str(e))
+        if os.path.isfile(outfile):
+            os.remove(outfile)
+        sys.exit(1)
+
+    for strname in patched:
+        print('Patched structure ' + strname)
+    print('Done!')
+    sys.exit(0)
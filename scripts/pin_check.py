@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# pin_check.py ---
+#
+# Check that the padframe pins are the same in the three views of the
+# padframe:
+#
+#   def:      the PINS section of def/panamax.def
+#   spice:    the port list of the top cell in netlist/layout/panamax.spice
+#   verilog:  the ports of the top module in verilog/rtl/panamax.v
+#
+# The three files are read in parallel by a pool of worker processes
+# (each using the cached index of its file, see index_cache.py).  Bus
+# bits are written "name[n]" in all views for the comparison, whatever
+# the bus bit characters of the file ("()" in the DEF file, "<>" in
+# some SPICE netlists).  The pins not found in every view are listed,
+# and pairs of names which appear to be one pin renamed (differing
+# only in case, or a DEF pin whose net has the name used in another
+# view) are reported as such.  The exit status is 1 if the views
+# differ.
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+import concurrent.futures
+
+import def_index
+import spice_index
+import verilog_index
+
+views = ('def', 'spice', 'verilog')
+
+defaults = {
+    'def': 'def/panamax.def',
+    'spice': 'netlist/layout/panamax.spice',
+    'verilog': 'verilog/rtl/panamax.v',
+}
+
+def usage():
+    print("Usage:")
+    print("pin_check.py [<options>] [<project_path>]")
+    print("")
+    print("options:")
+    print("    -def=<file>          DEF file (default " + defaults['def'] + ")")
+    print("    -spice=<file>        layout netlist (default " + defaults['spice'] + ")")
+    print("    -verilog=<file>      verilog netlist (default " + defaults['verilog'] + ")")
+    print("    -top=<cell>          top cell name (default panamax)")
+    print("    -jobs=<n>            number of worker processes (default 3)")
+    print("    -nocache             do not read or write the index caches")
+    return 0
+
+# Rewrite the bus bit of a pin name as "[n]", given the bus bit
+# characters of the file (e.g., "()").  Escaped verilog names lose the
+# backslash.
+
+def normalize(name, busbitchars='[]'):
+    name = name.lstrip('\\')
+    if len(busbitchars) == 2 and name.endswith(busbitchars[1]):
+        start = name.rfind(busbitchars[0])
+        if start > 0 and name[start + 1:-1].isdigit():
+            return name[:start] + '[' + name[start + 1:-1] + ']'
+    return name
+
+# Sort key placing bus bits in numerical order
+
+def pin_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+#----------------------------------------------------------------------
+# Readers for each view, run in the worker processes.  Each returns a
+# dictionary of normalized pin name -> net name (or None).
+#----------------------------------------------------------------------
+
+def def_pins(filepath, top, usecache):
+    index = def_index.read_index(filepath, usecache)
+    busbit = index['busbitchars']
+    return dict((normalize(name, busbit), pin['net'] and normalize(pin['net'], busbit))
+		for name, pin in index['pins'].items())
+
+def spice_pins(filepath, top, usecache):
+    subckts = spice_index.read_spice(filepath, usecache)
+    if top not in subckts:
+        raise ValueError('No subcircuit ' + top + ' in ' + filepath)
+    pins = {}
+    for port in subckts[top]['ports']:
+        name = normalize(normalize(port, '<>'))
+        pins[name] = None
+    return pins
+
+def verilog_pins(filepath, top, usecache):
+    modules = verilog_index.read_verilog(filepath, usecache)
+    if top not in modules:
+        raise ValueError('No module ' + top + ' in ' + filepath)
+    module = modules[top]
+    pins = {}
+    for port in module['ports']:
+        for bit in verilog_index.signal_bits(module, port):
+            pins[normalize(bit)] = None
+    return pins
+
+readers = {'def': def_pins, 'spice': spice_pins, 'verilog': verilog_pins}
+
+# Read all three views, in parallel with "jobs" processes.
+
+def read_views(files, top, usecache=True, jobs=3):
+    if jobs <= 1:
+        return dict((view, readers[view](files[view], top, usecache)) for view in views)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = dict((view, executor.submit(readers[view], files[view], top, usecache))
+			for view in views)
+        return dict((view, future.result()) for view, future in futures.items())
+
+#----------------------------------------------------------------------
+# Compare the pin sets.  Returns a dictionary of pin name -> list of
+# the views missing it, and a list of (view, name, other view, other
+# name) for pins that appear to be renamed.
+#----------------------------------------------------------------------
+
+def compare(pins):
+    allpins = set()
+    for view in views:
+        allpins.update(pins[view])
+    missing = {}
+    for name in allpins:
+        absent = [view for view in views if name not in pins[view]]
+        if absent:
+            missing[name] = absent
+
+    renamed = []
+    for view in views:
+        for other in views:
+            if other == view:
+                continue
+            # Names in "view" but not "other", and the reverse
+            extra = [name for name in pins[view] if name not in pins[other]]
+            lacking = dict((name.lower(), name) for name in pins[other]
+			if name not in pins[view])
+            for name in extra:
+                candidates = [name.lower()]
+                if pins[view][name]:
+                    candidates.append(pins[view][name].lower())
+                for candidate in candidates:
+                    if candidate in lacking:
+                        renamed.append((view, name, other, lacking[candidate]))
+                        break
+    return missing, sorted(renamed)
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > 1:
+        print('Wrong number of arguments given to pin_check.py.')
+        usage()
+        sys.exit(1)
+
+    project_path = arguments[0] if arguments else os.getcwd()
+    files = dict(defaults)
+    top = 'panamax'
+    jobs = 3
+    usecache = True
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key[1:] in views and value:
+            files[key[1:]] = value
+        elif key == '-top' and value:
+            top = value
+        elif key == '-nocache':
+            usecache = False
+        elif key == '-jobs' and value:
+            try:
+                jobs = int(value)
+            except ValueError:
+                print('Error:  Bad value in option "' + option + '"')
+                sys.exit(1)
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    for view in views:
+        files[view] = os.path.join(project_path, files[view])
+        if not os.path.isfile(files[view]):
+            print('Error:  No ' + view + ' file ' + files[view] + '.')
+            sys.exit(1)
+
+    try:
+        pins = read_views(files, top, usecache, jobs)
+    except ValueError as e:
+        print('Error:  ' + str(e) + '.')
+        sys.exit(1)
+
+    missing, renamed = compare(pins)
+    print('Pins:  ' + ', '.join(view + ' ' + str(len(pins[view])) for view in views))
+
+    renames = set()
+    for view, name, other, othername in renamed:
+        print('Renamed:  ' + name + ' (' + view + ') is ' + othername + ' (' + other + ')')
+        renames.add(name)
+        renames.add(othername)
+    for name in sorted(missing, key=pin_key):
+        if name in renames:
+            continue
+        present = [view for view in views if view not in missing[name]]
+        print('Not in ' + ', '.join(missing[name]) + ':  ' + name + '  (in ' +
+			', '.join(present) + ')')
+
+    if missing:
+        print(str(len(missing)) + ' pins differ.')
+        sys.exit(1)
+    print('All pins match.')
+    sys.exit(0)
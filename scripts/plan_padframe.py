@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# plan_padframe.py ---
+#
+# Compute the placement of the padframe cells from the table of cells
+# on each side of the chip (doc/padframe_table.txt), and write it out
+# as a script for magic which places every cell at its final position.
+# This replaces the cell by cell walk along each side done by the
+# "Cell placement" section of gen_padframe.tcl, so that a change to
+# the pads can be re-planned and checked without a magic session.
+#
+# The positions along each side are the running sum of the cell widths
+# from the corner cell, computed for the whole side at once.  The total
+# of each side is checked against the space between the corner cells
+# given in doc/padframe.txt (3184um horizontal, 4784um vertical), and
+# no script is written if any side does not fit exactly.
+#
+# The output script is sourced from magic in the mag/ directory, in
+# place of the "Cell placement" section of gen_padframe.tcl.
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import mag_index
+
+# Geometry of each side of the padframe, from the (fixed) positions of
+# the corner cells:  the point at which the first cell of the side is
+# placed, the position along the side at which the next corner cell
+# begins, the axis along the side (0 = X, 1 = Y), and the options to
+# "getcell" which place a cell with the given point at its corner.
+# All positions are in microns.
+
+frame = {
+    'south': {'start': (200, 0), 'end': 3384, 'axis': 0, 'getcell': '180 child ur'},
+    'east': {'start': (3588, 200), 'end': 4984, 'axis': 1, 'getcell': '90 child ur parent lr'},
+    'north': {'start': (204, 5188), 'end': 3388, 'axis': 0, 'getcell': 'child ul parent ul'},
+    'west': {'start': (0, 204), 'end': 4988, 'axis': 1, 'getcell': '270 child ul'},
+}
+
+corners = [
+    ('corner_sw', '0 0', '180'),
+    ('corner_se', '3384um 0', '90'),
+    ('corner_ne', '3388um 4984um', ''),
+    ('corner_nw', '0 4988um', '270'),
+]
+
+slicerex = re.compile(r'_slice_(\d+)um$')
+
+def usage():
+    print("Usage:")
+    print("plan_padframe.py [<options>] [<project_path>]")
+    print("")
+    print("options:")
+    print("    -table=<file>        padframe table (default doc/padframe_table.txt)")
+    print("    -padframe=<file>     padframe notes with the corner to corner spans")
+    print("                         (default doc/padframe.txt)")
+    print("    -output=<file>       write the magic placement script to <file>")
+    print("    -centers             list the pad centers on each side")
+    return 0
+
+# Positions are kept as integer nanometers so that sums are exact.
+
+def nanometers(value):
+    return int(round(float(value) * 1000))
+
+def microns(value):
+    return '%gum' % (value / 1000) if value else '0'
+
+#----------------------------------------------------------------------
+# Read the padframe table.  Returns a dictionary of cell name -> width,
+# and a dictionary of side -> list of entries (kind, cell, instance,
+# offset, getcell options), where kind is "cell", "move" or "overlay".
+#----------------------------------------------------------------------
+
+def read_table(filepath):
+    widths = {}
+    table = {}
+    entries = None
+    with open(filepath, 'r') as ifile:
+        for lineno, line in enumerate(ifile, 1):
+            tokens = line.split('#', 1)[0].split()
+            if not tokens:
+                continue
+            try:
+                if tokens[0] == 'width':
+                    widths[tokens[1]] = nanometers(tokens[2])
+                elif tokens[0] == 'side':
+                    if tokens[1] not in frame:
+                        raise ValueError('unknown side ' + tokens[1])
+                    entries = table.setdefault(tokens[1], [])
+                elif entries is None:
+                    raise ValueError('cell given before any side')
+                elif tokens[0] == 'spacers':
+                    for value in tokens[1:]:
+                        cellname = 'sky130_ef_io__com_bus_slice_' + value + 'um'
+                        entries.append(('cell', cellname, None, 0, None))
+                elif tokens[0] == 'move':
+                    entries.append(('move', None, None, nanometers(tokens[1]), None))
+                elif tokens[0] == 'overlay':
+                    entries.append(('overlay', tokens[2], tokens[3],
+				nanometers(tokens[1]), ' '.join(tokens[4:]) or None))
+                else:
+                    instname = tokens[1] if len(tokens) > 1 else None
+                    entries.append(('cell', tokens[0], instname, 0, None))
+            except (IndexError, ValueError) as e:
+                raise ValueError(filepath + ' line ' + str(lineno) + ': ' + str(e))
+    return widths, table
+
+def cell_width(widths, cellname):
+    if cellname in widths:
+        return widths[cellname]
+    smatch = slicerex.search(cellname)
+    if smatch:
+        return nanometers(smatch.group(1))
+    raise ValueError('No width given for cell ' + cellname)
+
+#----------------------------------------------------------------------
+# Plan one side.  Returns an array of the position along the side of
+# each entry, and the total length of the side.  Each cell advances the
+# position by its width and each "move" by its offset;  an overlay is
+# placed at the position plus its offset without advancing it.
+#----------------------------------------------------------------------
+
+def plan_side(entries, widths, start):
+    advance = numpy.array([cell_width(widths, e[1]) if e[0] == 'cell' else
+		(e[3] if e[0] == 'move' else 0) for e in entries], dtype=numpy.int64)
+    offset = numpy.array([e[3] if e[0] == 'overlay' else 0 for e in entries],
+		dtype=numpy.int64)
+    ends = numpy.cumsum(advance)
+    positions = start + ends - advance + offset
+    total = int(ends[-1]) if len(ends) else 0
+    return positions, total
+
+# Plan all sides.  Returns a dictionary of side -> (positions, total,
+# span), with the span between the corner cells in nanometers.
+
+def plan_padframe(widths, table):
+    plan = {}
+    for side, entries in table.items():
+        geometry = frame[side]
+        start = nanometers(geometry['start'][geometry['axis']])
+        positions, total = plan_side(entries, widths, start)
+        plan[side] = (positions, total, nanometers(geometry['end']) - start)
+    return plan
+
+# Return a list of (instance, center) of the pads (cells with an
+# instance name) of one side, in microns.
+
+def pad_centers(entries, widths, positions):
+    centers = []
+    for entry, position in zip(entries, positions):
+        if entry[0] == 'cell' and entry[2]:
+            centers.append((entry[2], (int(position) + cell_width(widths, entry[1]) / 2) / 1000))
+    return centers
+
+#----------------------------------------------------------------------
+# Write the placement script for magic.  Each cell is placed with one
+# line, using a zero-size box at the corner point of the cell.
+#----------------------------------------------------------------------
+
+def write_script(ofile, table, plan, tablefile):
+    print('#----------------------------------------------------', file=ofile)
+    print('# Panamax padframe cell placement', file=ofile)
+    print('# Generated by plan_padframe.py from ' + tablefile, file=ofile)
+    print('#----------------------------------------------------', file=ofile)
+    print('# Source this file from magic, in the mag/ directory', file=ofile)
+    print('#----------------------------------------------------', file=ofile)
+    print('', file=ofile)
+    print('suspendall', file=ofile)
+    print('', file=ofile)
+    print('# Corner cells', file=ofile)
+    for instname, position, orient in corners:
+        command = 'box position ' + position + '; getcell sky130_ef_io__corner_pad'
+        if orient:
+            command += ' ' + orient
+        print(command + '; identify ' + instname, file=ofile)
+
+    for side in mag_index.sides:
+        if side not in table:
+            continue
+        geometry = frame[side]
+        axis = geometry['axis']
+        fixed = nanometers(geometry['start'][1 - axis])
+        positions = plan[side][0]
+        print('', file=ofile)
+        print('# ' + side.capitalize() + ' side', file=ofile)
+        for entry, position in zip(table[side], positions):
+            if entry[0] == 'move':
+                continue
+            point = [fixed, fixed]
+            point[axis] = int(position)
+            x, y = microns(point[0]), microns(point[1])
+            command = 'box values ' + ' '.join((x, y, x, y))
+            command += '; getcell ' + entry[1] + ' ' + (entry[4] or geometry['getcell'])
+            if entry[2]:
+                command += '; identify ' + entry[2]
+            print(command, file=ofile)
+
+    print('', file=ofile)
+    print('resumeall', file=ofile)
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > 1:
+        print('Wrong number of arguments given to plan_padframe.py.')
+        usage()
+        sys.exit(1)
+
+    project_path = arguments[0] if arguments else os.getcwd()
+    tablefile = 'doc/padframe_table.txt'
+    padframe = 'doc/padframe.txt'
+    outfile = None
+    centers = False
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-table' and value:
+            tablefile = value
+        elif key == '-padframe' and value:
+            padframe = value
+        elif key == '-output' and value:
+            outfile = value
+        elif key == '-centers':
+            centers = True
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    if numpy is None:
+        print('Error:  plan_padframe.py requires the numpy package.')
+        sys.exit(1)
+
+    tablefile = os.path.join(project_path, tablefile)
+    padframe = os.path.join(project_path, padframe)
+    if not os.path.isfile(tablefile):
+        print('Error:  No padframe table ' + tablefile + '.')
+        sys.exit(1)
+
+    try:
+        widths, table = read_table(tablefile)
+        plan = plan_padframe(widths, table)
+    except ValueError as e:
+        print('Error:  ' + str(e) + '.')
+        sys.exit(1)
+
+    spans = mag_index.read_padframe(padframe) if os.path.isfile(padframe) else {}
+
+    status = 0
+    for side in mag_index.sides:
+        if side not in plan:
+            continue
+        positions, total, span = plan[side]
+        cells = sum(1 for e in table[side] if e[0] == 'cell')
+        pads = sum(1 for e in table[side] if e[0] == 'cell' and e[2])
+        line = '%-6s %3d cells (%d named)  length %gum  span %gum' % (side, cells,
+			pads, total / 1000, span / 1000)
+        if side in spans and nanometers(spans[side]) != span:
+            line += '  (padframe notes give %gum)' % spans[side]
+            status = 1
+        if total != span:
+            line += '  MISMATCH by %gum' % ((total - span) / 1000)
+            status = 1
+        print(line)
+        if centers:
+            for instname, center in pad_centers(table[side], widths, positions):
+                print('    %-24s %g' % (instname, center))
+
+    if status:
+        print('Error:  Padframe does not fit between the corner cells.')
+        sys.exit(status)
+
+    if outfile:
+        with open(outfile, 'w') as ofile:
+            write_script(ofile, table, plan, os.path.relpath(tablefile, project_path))
+        print('Wrote placement script ' + outfile + '.')
+    sys.exit(0)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# prelvs_check.py ---
+#
+# Quick structural comparison of the extracted layout netlist
+# (netlist/layout/panamax.spice) against the padframe verilog
+# (verilog/rtl/panamax.v), to find the top level problems that make
+# the full netgen LVS run (lvs/run_lvs_panamax.sh) fail before running
+# it.  The following are compared for the top cell:
+#
+#   1. Ports:  the pins of the top cell in each netlist, with verilog
+#      buses expanded to one name per bit.
+#   2. Instances:  the number of instances of each cell.  Cells that
+#      are defined in only one of the netlists are flattened into their
+#      contents (as netgen does), so that, e.g., the constant_block
+#      inside each GPIO "connects" cell in the layout is compared with
+#      the constant_block instances in the verilog.
+#   3. Connectivity:  for instances found in both netlists (by name,
+#      or failing that, by their connections to the top level ports),
+#      each pin connection is looked up in both, and the nets of the two
+#      netlists are matched through them.  A layout net that joins more
+#      than one verilog net is a short, and a verilog net that is split
+#      among more than one layout net is an open.  This does not depend
+#      on the nets having the same names in both netlists.
+#
+# Pin names of the instances are taken from the subcircuit definitions
+# in the SPICE netlist, so instances of cells without a definition there
+# are compared by count only.
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+
+import spice_index
+import verilog_index
+
+def usage():
+    print("Usage:")
+    print("prelvs_check.py [<options>] [<project_path>]")
+    print("")
+    print("options:")
+    print("    -spice=<file>        layout netlist (default netlist/layout/panamax.spice)")
+    print("    -verilog=<file>      verilog netlist (default verilog/rtl/panamax.v)")
+    print("    -top=<cell>          top cell name (default panamax)")
+    print("    -nocache             do not read or write the index cache")
+    return 0
+
+busrex = re.compile(r'^(.*)[\[<](\d+)[\]>]$')
+
+#----------------------------------------------------------------------
+# Flatten the instances of a SPICE subcircuit, down to cells in the set
+# "keep" or cells that are not defined.  Returns a list of (name, cell,
+# pins) where "pins" maps each pin name to its net in the top cell, or
+# is None if the cell is not defined.
+#----------------------------------------------------------------------
+
+def flatten_spice(subckts, cellname, keep, prefix='', netmap=None):
+    flat = []
+    for name, cell, nets in subckts[cellname]['instances']:
+        if netmap is not None:
+            nets = [netmap.get(net, prefix + net) for net in nets]
+        instname = prefix + (name[1:] if name[0] in 'xX' else name)
+        child = subckts.get(cell)
+        if child is None:
+            flat.append((instname, cell, None))
+        elif cell in keep or not child['instances']:
+            flat.append((instname, cell, dict(zip(child['ports'], nets))))
+        else:
+            childmap = dict(zip(child['ports'], nets))
+            flat.extend(flatten_spice(subckts, cell, keep, instname + '/', childmap))
+    return flat
+
+# The same for the verilog module, with instance arrays counted once
+# per element.  Returns a list of (name, cell, connections, module).
+
+def flatten_verilog(modules, modname, keep, prefix='', netmap=None):
+    flat = []
+    module = modules[modname]
+    for instance in module['instances']:
+        cell = instance['cell']
+        count = verilog_index.range_width(instance['range']) if instance['range'] else 1
+        connections = instance['connections']
+        if netmap is not None:
+            connections = {pin: map_expression(module, expr, netmap, prefix)
+			for pin, expr in connections.items()}
+        name = prefix + instance['name']
+        if cell in modules and cell not in keep:
+            child = modules[cell]
+            childmap = {}
+            for pin, expr in connections.items():
+                bits = verilog_index.expand_expression(module, expr)
+                childmap.update(zip(verilog_index.expand_expression(child, pin), bits))
+            flat.extend(flatten_verilog(modules, cell, keep, name + '/', childmap))
+            continue
+        for i in range(count):
+            flat.append((name if count == 1 else name + '[' + str(i) + ']',
+			cell, connections if count == 1 else {}, module))
+    return flat
+
+def map_expression(module, expr, netmap, prefix):
+    bits = verilog_index.expand_expression(module, expr)
+    mapped = [netmap.get(bit, prefix + bit) for bit in bits]
+    return '{' + ','.join(mapped) + '}' if len(mapped) != 1 else mapped[0]
+
+#----------------------------------------------------------------------
+# Return the bits of a verilog pin connection as a list of (pin name,
+# net) pairs, using the pin names of the SPICE subcircuit.  "ports" is
+# the port list of the subcircuit.  Pin names are matched without
+# regard to case, and the bits of a bus may be written "pin[n]" or
+# "pin<n>" in the SPICE netlist.  Returns None if the pin is not found
+# or has a different width.
+#----------------------------------------------------------------------
+
+def pin_bits(module, pin, expr, ports):
+    bits = verilog_index.expand_expression(module, expr)
+    if not bits:
+        return []	# Unconnected
+    names = [port for port in ports if port.lower() == pin.lower()]
+    if not names:
+        indexed = []
+        for port in ports:
+            match = busrex.match(port)
+            if match and match.group(1).lower() == pin.lower():
+                indexed.append((int(match.group(2)), port))
+        names = [port for index, port in sorted(indexed, reverse=True)]
+    if len(names) != len(bits):
+        return None
+    return [(name, bit) for name, bit in zip(names, bits)
+		if not bit.startswith("1'b")]
+
+# Instances that were renamed by flattening (e.g., "gpio1_0_const" in
+# the verilog is "gpio1_0_connects/constant_block_0" in the layout) are
+# paired by their connections to the top level ports.  Returns a
+# dictionary of layout instance name -> verilog instance name for the
+# instances of the same cell whose port connections are unique.
+
+def match_by_ports(subckts, snames, vnames, matched, ports):
+    vmatched = set(matched.values())
+    skeys = {}
+    for name, (cell, pins) in snames.items():
+        if name in matched or pins is None:
+            continue
+        key = (cell, frozenset((pin, net) for pin, net in pins.items() if net in ports))
+        skeys.setdefault(key, []).append(name)
+    vkeys = {}
+    for name, (cell, connections, module) in vnames.items():
+        if name in vmatched or cell not in subckts:
+            continue
+        bits = []
+        for pin, expr in connections.items():
+            if isinstance(pin, str):
+                bits.extend(pin_bits(module, pin, expr, subckts[cell]['ports']) or [])
+        key = (cell, frozenset((pin, net) for pin, net in bits if net in ports))
+        vkeys.setdefault(key, []).append(name)
+    pairs = {}
+    for key, names in skeys.items():
+        if key[1] and len(names) == 1 and len(vkeys.get(key, [])) == 1:
+            pairs[names[0]] = vkeys[key][0]
+    return pairs
+
+#----------------------------------------------------------------------
+# Run the comparison.  Returns a dictionary of results.
+#----------------------------------------------------------------------
+
+def compare(subckts, modules, top):
+    scell = subckts[top]
+    vmodule = modules[top]
+    results = {}
+
+    # 1. Ports
+    sports = set(scell['ports'])
+    vports = set()
+    for port in vmodule['ports']:
+        vports.update(verilog_index.signal_bits(vmodule, port))
+    results['ports'] = (len(sports), len(vports))
+    results['missing_ports'] = sorted(vports - sports)
+    results['extra_ports'] = sorted(sports - vports)
+
+    # 2. Instances.  Keep cells that appear in both netlists.
+    sclasses = set(cell for name, cell, nets in scell['instances'])
+    vclasses = set(instance['cell'] for instance in vmodule['instances'])
+    for cellname, subckt in subckts.items():
+        if cellname in vclasses:
+            sclasses.add(cellname)
+    common = sclasses & (vclasses | set(modules))
+    sflat = flatten_spice(subckts, top, common | (vclasses - set(modules)))
+    vflat = flatten_verilog(modules, top, set(subckts))
+
+    scounts = {}
+    for name, cell, pins in sflat:
+        scounts[cell] = scounts.get(cell, 0) + 1
+    vcounts = {}
+    for name, cell, connections, module in vflat:
+        vcounts[cell] = vcounts.get(cell, 0) + 1
+    results['classes'] = sorted((cell, scounts.get(cell, 0), vcounts.get(cell, 0))
+		for cell in set(scounts) | set(vcounts)
+		if scounts.get(cell, 0) != vcounts.get(cell, 0))
+
+    snames = dict((name, (cell, pins)) for name, cell, pins in sflat)
+    vnames = dict((name, (cell, connections, module))
+		for name, cell, connections, module in vflat)
+    matched = dict((name, name) for name in set(snames) & set(vnames))
+    matched.update(match_by_ports(subckts, snames, vnames, matched, sports & vports))
+    results['missing_instances'] = sorted(set(vnames) - set(matched.values()))
+    results['extra_instances'] = sorted(set(snames) - set(matched))
+
+    # 3. Connectivity.  Pair the net of each pin in the layout with the
+    # net of the same pin in the verilog.
+    pairs = set((port, port) for port in sports & vports)
+    compared = 0
+    skipped = []
+    for sname, vname in sorted(matched.items()):
+        scellname, spins = snames[sname]
+        vcellname, connections, module = vnames[vname]
+        if spins is None or scellname != vcellname:
+            continue
+        compared += 1
+        for pin, expr in connections.items():
+            if not isinstance(pin, str):
+                continue
+            bits = pin_bits(module, pin, expr, spins)
+            if bits is None:
+                skipped.append(vname + '/' + pin)
+                continue
+            for spin, vnet in bits:
+                pairs.add((spins[spin], vnet))
+
+    snets = {}
+    vnets = {}
+    for snet, vnet in pairs:
+        snets.setdefault(snet, set()).add(vnet)
+        vnets.setdefault(vnet, set()).add(snet)
+    results['compared'] = compared
+    results['skipped_pins'] = skipped
+    results['shorts'] = sorted((snet, sorted(v)) for snet, v in snets.items() if len(v) > 1)
+    results['opens'] = sorted((vnet, sorted(s)) for vnet, s in vnets.items() if len(s) > 1)
+    return results
+
+def print_results(results):
+    print('Ports:  layout ' + str(results['ports'][0]) + ', verilog ' +
+		str(results['ports'][1]))
+    for port in results['missing_ports']:
+        print('    Missing from layout:  ' + port)
+    for port in results['extra_ports']:
+        print('    Not in verilog:  ' + port)
+
+    print('Instance counts that differ (cell:  layout, verilog):')
+    for cell, scount, vcount in results['classes']:
+        print('    ' + cell + ':  ' + str(scount) + ', ' + str(vcount))
+    for name in results['missing_instances']:
+        print('    Missing from layout:  ' + name)
+    for name in results['extra_instances']:
+        print('    Not in verilog:  ' + name)
+
+    print('Connectivity of ' + str(results['compared']) + ' instances:')
+    for name in results['skipped_pins']:
+        print('    Pin not compared:  ' + name)
+    for snet, vnets in results['shorts']:
+        print('    Short:  layout net ' + snet + ' joins ' + ', '.join(vnets))
+    for vnet, snets in results['opens']:
+        print('    Open:  verilog net ' + vnet + ' is split into ' + ', '.join(snets))
+
+    problems = (len(results['missing_ports']) + len(results['extra_ports']) +
+		len(results['shorts']) + len(results['opens']))
+    print('')
+    if problems:
+        print('Pre-LVS check failed with ' + str(problems) + ' pin and net errors.')
+    else:
+        print('Pre-LVS check passed.')
+    return problems
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) > 1:
+        print('Wrong number of arguments given to prelvs_check.py.')
+        usage()
+        sys.exit(1)
+
+    project_path = arguments[0] if arguments else os.getcwd()
+    spicefile = 'netlist/layout/panamax.spice'
+    verilogfile = 'verilog/rtl/panamax.v'
+    top = 'panamax'
+    usecache = True
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-spice' and value:
+            spicefile = value
+        elif key == '-verilog' and value:
+            verilogfile = value
+        elif key == '-top' and value:
+            top = value
+        elif key == '-nocache':
+            usecache = False
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    spicefile = os.path.join(project_path, spicefile)
+    verilogfile = os.path.join(project_path, verilogfile)
+    for filepath in (spicefile, verilogfile):
+        if not os.path.isfile(filepath):
+            print('Error:  No netlist file ' + filepath + '.')
+            sys.exit(1)
+
+    subckts = spice_index.read_spice(spicefile, usecache)
+    modules = verilog_index.read_verilog(verilogfile, usecache)
+    if top not in subckts:
+        print('Error:  No subcircuit ' + top + ' in ' + spicefile + '.')
+        sys.exit(1)
+    if top not in modules:
+        print('Error:  No module ' + top + ' in ' + verilogfile + '.')
+        sys.exit(1)
+
+    results = compare(subckts, modules, top)
+    sys.exit(1 if print_results(results) else 0)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# set_ids.py ---
+#
+# Set the project ID and the product ID of the padframe in a single
+# invocation.  Each shared file (in particular the RTL top level
+# verilog/rtl/panamax.v) is read and written only once.
+#
+# The values are given with the "-project=<value>" and "-product=<value>"
+# options as 8-digit and 2-digit hex numbers, respectively.  Any value
+# not given as an option is taken from the keys "project_id" and
+# "product_id" in the info.yaml file in the project top level directory.
+# If in "-report" mode, print the values in the same way as the
+# "-report" mode of set_project_id.py and set_product_id.py.
+#
+# See set_project_id.py and set_product_id.py for the layout maps.
+#----------------------------------------------------------------------
+
+import sys
+
+import id_rom
+
+if __name__ == '__main__':
+    sys.exit(id_rom.main(list(id_rom.roms), sys.argv[1:], 'set_ids.py'))
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# spice_index.py ---
+#
+# Streaming reader for extracted SPICE netlists (e.g.,
+# netlist/layout/panamax.spice).  The netlist is read one line at a
+# time (joining "+" continuation lines), and each subcircuit is indexed
+# as:
+#
+#   ports:      port names in order
+#   instances:  list of (name, cell, nets) for "X" lines
+#   elements:   model or element type -> count, for all other devices
+#
+# Instances of cells that are not defined in the netlist (such as the
+# sky130_fd_pr transistors) are devices.  Device counts of the
+# flattened hierarchy are computed once per subcircuit and memoized.
+# The index is cached on disk (see index_cache.py).  A second index
+# holds a canonical hash of each subcircuit (see read_hashes()).
+#----------------------------------------------------------------------
+
+import os
+import sys
+import hashlib
+
+import index_cache
+
+# Version of the index format, for the cache
+index_version = 1
+
+# Number of nets of each primitive element type before the model or value
+element_nets = {'M': 4, 'Q': 3, 'J': 3, 'R': 2, 'C': 2, 'D': 2, 'L': 2,
+		'V': 2, 'I': 2, 'E': 4, 'G': 4, 'F': 2, 'H': 2}
+
+def usage():
+    print("Usage:")
+    print("spice_index.py [<options>] <spice_file>")
+    print("")
+    print("options:")
+    print("    -cell=<name>         print the ports, instances and device counts of a cell")
+    print("    -nocache             do not read or write the index cache")
+    return 0
+
+# Generate the logical lines of a SPICE file, with continuation lines
+# joined and comments removed, as lists of tokens.
+
+def spice_lines(filepath):
+    tokens = []
+    with open(filepath, 'r') as ifile:
+        for line in ifile:
+            if line.startswith('+'):
+                tokens.extend(line[1:].split())
+                continue
+            if tokens:
+                yield tokens
+            if line.startswith('*') or not line.strip():
+                tokens = []
+            else:
+                tokens = line.split()
+    if tokens:
+        yield tokens
+
+#----------------------------------------------------------------------
+# Read a SPICE file into a dictionary of subcircuit name -> subcircuit.
+# Elements outside of any subcircuit are put in the subcircuit ''.
+#----------------------------------------------------------------------
+
+def new_subckt(name, ports):
+    return {'name': name, 'ports': ports, 'instances': [], 'elements': {}}
+
+def parse_spice(filepath):
+    subckts = {}
+    current = None
+    for tokens in spice_lines(filepath):
+        key = tokens[0].lower()
+        if key == '.subckt':
+            ports = [t for t in tokens[2:] if '=' not in t]
+            current = new_subckt(tokens[1], ports)
+            subckts[tokens[1]] = current
+            continue
+        elif key == '.ends':
+            current = None
+            continue
+        elif key.startswith('.'):
+            continue
+
+        if current is None:
+            current = subckts.setdefault('', new_subckt('', []))
+        letter = key[0].upper()
+        if letter == 'X':
+            args = [t for t in tokens[1:] if '=' not in t]
+            current['instances'].append((tokens[0], args[-1], args[:-1]))
+        else:
+            nets = element_nets.get(letter, 2)
+            args = [t for t in tokens[1 + nets:] if '=' not in t]
+            model = args[0] if args and not args[0][0].isdigit() else letter
+            current['elements'][model] = current['elements'].get(model, 0) + 1
+    return subckts
+
+def read_spice(filepath, usecache=True):
+    return index_cache.cached(filepath, 'spiceindex', index_version, parse_spice,
+		usecache)
+
+#----------------------------------------------------------------------
+# Queries.
+#----------------------------------------------------------------------
+
+# Return the device counts of a cell (model -> count), either of the
+# cell itself (instances of undefined cells and primitive elements) or,
+# if "flat" is True, of the whole hierarchy below it.  Results are
+# saved in "memo".
+
+def device_counts(subckts, cellname, flat=False, memo=None):
+    if memo is None:
+        memo = {}
+    key = (cellname, flat)
+    if key in memo:
+        return memo[key]
+    subckt = subckts[cellname]
+    counts = dict(subckt['elements'])
+    for name, cell, nets in subckt['instances']:
+        if cell not in subckts:
+            counts[cell] = counts.get(cell, 0) + 1
+        elif flat:
+            for model, n in device_counts(subckts, cell, True, memo).items():
+                counts[model] = counts.get(model, 0) + n
+    memo[key] = counts
+    return counts
+
+# Return a dictionary of instance cell name -> count for a cell
+
+def instance_counts(subckts, cellname):
+    counts = {}
+    for name, cell, nets in subckts[cellname]['instances']:
+        counts[cell] = counts.get(cell, 0) + 1
+    return counts
+
+# Return the top cell:  the subcircuit that is not instantiated by any
+# other subcircuit (the last one in the file, if there are several).
+
+def top_cell(subckts):
+    used = set()
+    for subckt in subckts.values():
+        used.update(cell for name, cell, nets in subckt['instances'])
+    tops = [name for name in subckts if name and name not in used]
+    return tops[-1] if tops else None
+
+#----------------------------------------------------------------------
+# Canonical hashes.  Each subcircuit is hashed in a form that does not
+# depend on the order of its devices, on the names of its devices or
+# on the names of its internal nets, so that re-extracting an
+# unchanged cell gives the same hash.  Net and cell names are compared
+# without regard to case, as in netgen.  A device is hashed as its
+# type, model (for an instance of a subcircuit, the cell name and its
+# port list), parameters and the labels of its nets.  Port nets are
+# labeled by name;  internal nets are labeled by refining their
+# connections to labeled device terminals until the labeling no
+# longer separates any more nets.  Drain and source of transistors, and
+# the two terminals of resistors and capacitors, are interchangeable.
+#
+# The index maps each subcircuit name to:
+#
+#   hash:      SHA-256 of the canonical form
+#   ports:     port names in order
+#   children:  names of the subcircuits instantiated in it
+#----------------------------------------------------------------------
+
+hash_version = 1
+
+# Return the positions of the terminals of a device that may be swapped
+
+def swappable(letter, model, nets):
+    if len(nets) == 4 and (letter == 'M' or 'fet' in model):
+        return (0, 2)
+    if len(nets) == 2 and (letter in 'RC' or '__res' in model or '__cap' in model):
+        return (0, 1)
+    return None
+
+def parse_devices(filepath):
+    subckts = {}
+    current = None
+    for tokens in spice_lines(filepath):
+        tokens = [t.lower() for t in tokens]
+        key = tokens[0]
+        if key == '.subckt':
+            current = {'ports': [t for t in tokens[2:] if '=' not in t], 'devices': []}
+            subckts[tokens[1]] = current
+            continue
+        elif key == '.ends':
+            current = None
+            continue
+        elif key.startswith('.') or current is None:
+            continue
+
+        letter = key[0].upper()
+        params = sorted(t for t in tokens[1:] if '=' in t)
+        if letter == 'X':
+            args = [t for t in tokens[1:] if '=' not in t]
+            model = args[-1]
+            nets = args[:-1]
+        else:
+            nnets = element_nets.get(letter, 2)
+            nets = tokens[1:1 + nnets]
+            args = [t for t in tokens[1 + nnets:] if '=' not in t]
+            if args and not args[0][0].isdigit():
+                model = args.pop(0)
+            else:
+                model = ''
+            params = args + params
+        current['devices'].append((letter, model, nets, params))
+    return subckts
+
+def short_hash(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+def canonical_hash(subckt, interfaces):
+    ports = set(subckt['ports'])
+    devices = []
+    labels = {}
+    for letter, model, nets, params in subckt['devices']:
+        sig = letter + ' ' + interfaces.get(model, model) + ' ' + ' '.join(params)
+        devices.append((sig, nets, swappable(letter, model, nets)))
+        for net in nets:
+            labels.setdefault(net, ('p:' + net) if net in ports else 'n')
+
+    # Device form with the current labels, and the terminal class of
+    # each net position (swappable terminals share a class)
+    def device_form(sig, nets, swap):
+        terms = [labels[net] for net in nets]
+        if swap:
+            a, b = sorted((terms[swap[0]], terms[swap[1]]))
+            terms[swap[0]], terms[swap[1]] = a, b
+        return sig + '(' + ','.join(terms) + ')'
+
+    nclasses = len(set(labels.values()))
+    while True:
+        incidence = dict((net, []) for net in labels)
+        for sig, nets, swap in devices:
+            form = device_form(sig, nets, swap)
+            for i, net in enumerate(nets):
+                tclass = swap[0] if swap and i in swap else i
+                incidence[net].append(form + '#' + str(tclass))
+        for net, forms in incidence.items():
+            if net not in ports:
+                labels[net] = short_hash(labels[net] + '|' + '|'.join(sorted(forms)))
+        count = len(set(labels.values()))
+        if count <= nclasses:
+            break
+        nclasses = count
+
+    sha = hashlib.sha256()
+    sha.update((' '.join(subckt['ports']) + '\n').encode())
+    for form in sorted(device_form(sig, nets, swap) for sig, nets, swap in devices):
+        sha.update((form + '\n').encode())
+    return sha.hexdigest()
+
+def hash_spice(filepath):
+    subckts = parse_devices(filepath)
+    interfaces = dict((name, name + '(' + ','.join(subckt['ports']) + ')')
+		for name, subckt in subckts.items())
+    index = {}
+    for name, subckt in subckts.items():
+        children = sorted(set(model for letter, model, nets, params in subckt['devices']
+		if letter == 'X' and model in subckts))
+        index[name] = {'hash': canonical_hash(subckt, interfaces),
+		'ports': subckt['ports'], 'children': children}
+    return index
+
+def read_hashes(filepath, usecache=True):
+    return index_cache.cached(filepath, 'spicehash', hash_version, hash_spice, usecache)
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) != 1:
+        print('Wrong number of arguments given to spice_index.py.')
+        usage()
+        sys.exit(1)
+
+    spicefile = arguments[0]
+    usecache = True
+    cellname = None
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-nocache':
+            usecache = False
+        elif key == '-cell' and value:
+            cellname = value
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    if not os.path.isfile(spicefile):
+        print('Error:  No netlist file ' + spicefile + '.')
+        sys.exit(1)
+
+    subckts = read_spice(spicefile, usecache)
+    if cellname is None:
+        cellname = top_cell(subckts)
+        print('Subcircuits:  ' + str(len([s for s in subckts if s])))
+        print('Top cell:     ' + str(cellname))
+    if cellname not in subckts:
+        print('Error:  No subcircuit ' + cellname + ' in ' + spicefile + '.')
+        sys.exit(1)
+
+    subckt = subckts[cellname]
+    print('Ports:        ' + str(len(subckt['ports'])))
+    print('Instances:')
+    for cell, n in sorted(instance_counts(subckts, cellname).items()):
+        print('    %5d  %s' % (n, cell))
+    print('Devices (flattened):')
+    for model, n in sorted(device_counts(subckts, cellname, True).items()):
+        print('    %5d  %s' % (n, model))
+    sys.exit(0)
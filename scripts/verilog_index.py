@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+# SPDX-FileCopyrightText: 2025 Open Circuit Design, LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# SPDX-License-Identifier: Apache-2.0
+
+#----------------------------------------------------------------------
+#
+# verilog_index.py ---
+#
+# Structural reader for the gate-level and padframe verilog files
+# (e.g., verilog/rtl/panamax.v).  Only the structure is read:  for each
+# module, the ports (with direction and bus range), parameters, wires,
+# and instances with their named port connections.  Behavioral code
+# (assign statements, generate blocks, always blocks) is skipped.
+#
+# Compiler directives are ignored, so that both branches of "`ifdef"
+# blocks are read;  for the padframe this means that the power pins
+# are always included, as they are in the layout.
+#
+# The line number and byte offset of each module, parameter and
+# instance are recorded, so that, e.g., the PROJECT_ID parameter can be
+# found or rewritten without scanning the file.  The index is cached on
+# disk (see index_cache.py).
+#----------------------------------------------------------------------
+
+import os
+import re
+import sys
+import bisect
+
+import index_cache
+
+# Version of the index format, for the cache
+index_version = 1
+
+def usage():
+    print("Usage:")
+    print("verilog_index.py [<options>] <verilog_file>")
+    print("")
+    print("options:")
+    print("    -module=<name>       print the ports, parameters and instances of a module")
+    print("    -parameter=<name>    print the value and position of a parameter")
+    print("    -instance=<name>     print the connections of an instance")
+    print("    -nocache             do not read or write the index cache")
+    return 0
+
+tokenrex = re.compile(r'''
+	(?P<space>\s+)
+	| (?P<comment>//[^\n]*|/\*.*?\*/)
+	| (?P<directive>`[^\n]*)
+	| (?P<string>"(?:\\.|[^"\\])*")
+	| (?P<number>(?:\d+)?\s*'[sS]?[bBoOdDhH]\s*[0-9a-fA-FxXzZ_?]+|\d[\d_]*(?:\.\d+)?)
+	| (?P<ident>\\\S+|[A-Za-z_][A-Za-z0-9_$]*)
+	| (?P<punct>.)
+''', re.VERBOSE | re.DOTALL)
+
+# Keywords that start declarations of ports and nets
+declarations = ('input', 'output', 'inout', 'wire', 'reg', 'tri', 'supply0',
+		'supply1', 'wand', 'wor', 'logic')
+
+# Blocks that are skipped, and the keyword that ends each
+skipblocks = {'generate': 'endgenerate', 'function': 'endfunction',
+		'task': 'endtask', 'specify': 'endspecify', 'primitive': 'endprimitive'}
+
+#----------------------------------------------------------------------
+# Split verilog source text into a list of (kind, text, offset) tokens,
+# dropping white space, comments and compiler directives.
+#----------------------------------------------------------------------
+
+def tokenize(text):
+    tokens = []
+    for match in tokenrex.finditer(text):
+        kind = match.lastgroup
+        if kind in ('space', 'comment', 'directive'):
+            continue
+        tokens.append((kind, match.group(), match.start()))
+    return tokens
+
+class TokenStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, n=0):
+        if self.pos + n < len(self.tokens):
+            return self.tokens[self.pos + n][1]
+        return None
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token[1]
+
+    def offset(self, n=0):
+        if self.pos + n < len(self.tokens):
+            return self.tokens[self.pos + n][2]
+        return None
+
+    def expect(self, text):
+        token = self.next()
+        if token != text:
+            raise SyntaxError('Expected "' + text + '" but found "' + token +
+			'" at offset ' + str(self.tokens[self.pos - 1][2]))
+
+    # Return the tokens up to the matching close of the bracket just read
+    def group(self, close):
+        opening = {')': '(', ']': '[', '}': '{'}[close]
+        depth = 1
+        collected = []
+        while True:
+            token = self.next()
+            if token == opening:
+                depth += 1
+            elif token == close:
+                depth -= 1
+                if depth == 0:
+                    return collected
+            collected.append(token)
+
+    # Skip to the end of the statement, including the ";"
+    def skip_statement(self):
+        depth = 0
+        while True:
+            token = self.next()
+            if token in ('(', '[', '{', 'begin'):
+                depth += 1
+            elif token in (')', ']', '}', 'end'):
+                depth -= 1
+            elif token == ';' and depth <= 0:
+                return
+
+#----------------------------------------------------------------------
+# Range and expression helpers.
+#----------------------------------------------------------------------
+
+def parse_range(tokens):
+    # "[msb:lsb]" tokens (without brackets) to (msb, lsb), or None if
+    # the range is not made of constants.
+    text = ''.join(tokens)
+    match = re.match(r'^(\d+):(\d+)$', text)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = re.match(r'^(\d+)$', text)
+    if match:
+        return int(match.group(1)), int(match.group(1))
+    return None
+
+def read_range(stream):
+    if stream.peek() != '[':
+        return None
+    stream.next()
+    return parse_range(stream.group(']'))
+
+def new_module(name, offset):
+    return {
+	'name': name,
+	'offset': offset,
+	'ports': [],		# port names in order
+	'portinfo': {},		# name -> {'direction', 'range'}
+	'parameters': {},	# name -> {'value', 'offset', 'length'}
+	'wires': {},		# name -> range (or None)
+	'instances': [],	# list of instance dictionaries
+    }
+
+# Read a port or net declaration after the keyword.  Returns the names
+# declared, leaving the stream at the terminating "," ")" or ";".
+
+def read_declaration(stream, module, keyword, inheader=False):
+    direction = keyword if keyword in ('input', 'output', 'inout') else None
+    while stream.peek() in declarations + ('signed', 'unsigned', 'var'):
+        stream.next()
+    wrange = read_range(stream)
+    names = []
+    while True:
+        name = stream.next()
+        names.append(name)
+        if direction:
+            if name not in module['portinfo']:
+                if name not in module['ports']:
+                    module['ports'].append(name)
+            module['portinfo'][name] = {'direction': direction, 'range': wrange}
+        else:
+            module['wires'][name] = wrange
+        if stream.peek() == '=':
+            # Net declaration assignment;  skip the expression
+            depth = 0
+            while not (depth == 0 and stream.peek() in (',', ';', ')')):
+                token = stream.next()
+                depth += token in ('(', '[', '{')
+                depth -= token in (')', ']', '}')
+        if stream.peek() != ',':
+            break
+        # In an ANSI header, a comma may be followed by another direction
+        if inheader and stream.peek(1) in declarations:
+            break
+        stream.next()
+    return names
+
+# Read a parameter declaration after the keyword.  The offset and
+# length of the value text are recorded with the value.
+
+def read_parameter(stream, module, offset):
+    while stream.peek(1) not in ('=', None):
+        stream.next()	# type or range tokens
+    while True:
+        name = stream.next()
+        stream.expect('=')
+        value = []
+        start = stream.offset()
+        depth = 0
+        while not (depth == 0 and stream.peek() in (',', ';', ')')):
+            token = stream.next()
+            depth += token in ('(', '[', '{')
+            depth -= token in (')', ']', '}')
+            value.append(token)
+        end = stream.offset(-1) + len(stream.tokens[stream.pos - 1][1])
+        module['parameters'][name] = {'value': ''.join(value),
+		'offset': offset, 'value_offset': start, 'length': end - start}
+        if stream.peek() != ',' or stream.peek(1) in ('parameter', 'localparam'):
+            return
+        stream.next()
+
+# Read the port connections of an instance, after the opening "(".
+# Returns a dictionary of pin name -> expression text, or for ordered
+# connections, position -> expression text.
+
+def read_connections(stream):
+    connections = {}
+    position = 0
+    while stream.peek() != ')':
+        if stream.peek() == '.':
+            stream.next()
+            pin = stream.next()
+            stream.expect('(')
+            connections[pin] = ''.join(stream.group(')'))
+        else:
+            expr = []
+            depth = 0
+            while not (depth == 0 and stream.peek() in (',', ')')):
+                token = stream.next()
+                depth += token in ('(', '[', '{')
+                depth -= token in (')', ']', '}')
+                expr.append(token)
+            connections[position] = ''.join(expr)
+        position += 1
+        if stream.peek() == ',':
+            stream.next()
+    stream.next()
+    return connections
+
+#----------------------------------------------------------------------
+# Parse one module, starting after the keyword "module".
+#----------------------------------------------------------------------
+
+def parse_module(stream, offset):
+    module = new_module(stream.next(), offset)
+
+    if stream.peek() == '#':
+        stream.next()
+        stream.expect('(')
+        while stream.peek() != ')':
+            poffset = stream.offset()
+            if stream.peek() in ('parameter', 'localparam'):
+                stream.next()
+            read_parameter(stream, module, poffset)
+            if stream.peek() == ',':
+                stream.next()
+        stream.next()
+
+    if stream.peek() == '(':
+        stream.next()
+        while stream.peek() != ')':
+            token = stream.peek()
+            if token in declarations:
+                read_declaration(stream, module, stream.next(), inheader=True)
+            else:
+                module['ports'].append(stream.next())
+            if stream.peek() == ',':
+                stream.next()
+        stream.next()
+    stream.expect(';')
+
+    while True:
+        toffset = stream.offset()
+        token = stream.next()
+        if token == 'endmodule':
+            break
+        elif token in ('parameter', 'localparam'):
+            read_parameter(stream, module, toffset)
+            stream.expect(';')
+        elif token in declarations:
+            read_declaration(stream, module, token)
+            stream.expect(';')
+        elif token in skipblocks:
+            end = skipblocks[token]
+            while stream.next() != end:
+                pass
+        elif token in ('always', 'initial', 'always_comb', 'always_ff'):
+            # Statement, or a begin/end block
+            depth = 0
+            while True:
+                token = stream.next()
+                if token == 'begin':
+                    depth += 1
+                elif token == 'end':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                elif token == ';' and depth == 0:
+                    break
+        elif token in ('assign', 'genvar', 'integer', 'defparam', 'real', 'time',
+			'event', 'specparam'):
+            stream.skip_statement()
+        elif token == ';':
+            continue
+        else:
+            # Instance:  cell [#(params)] name [range] ( connections ) ;
+            instance = {'cell': token, 'name': None, 'range': None,
+			'parameters': {}, 'connections': {}, 'offset': toffset}
+            if stream.peek() == '#':
+                stream.next()
+                stream.expect('(')
+                instance['parameters'] = read_connections(stream)
+            while True:
+                instance['name'] = stream.next()
+                instance['range'] = read_range(stream)
+                stream.expect('(')
+                instance['connections'] = read_connections(stream)
+                module['instances'].append(instance)
+                if stream.peek() != ',':
+                    break
+                stream.next()
+                instance = dict(instance, name=None, range=None, connections={})
+            stream.expect(';')
+
+    return module
+
+#----------------------------------------------------------------------
+# Read a verilog file and return a dictionary of module name -> module.
+# The file is decoded as latin-1 so that character offsets are byte
+# offsets.  Each recorded offset is given a line number as well.
+#----------------------------------------------------------------------
+
+def parse_verilog_text(text):
+    stream = TokenStream(tokenize(text))
+    modules = {}
+    while stream.peek() is not None:
+        offset = stream.offset()
+        if stream.next() in ('module', 'macromodule'):
+            module = parse_module(stream, offset)
+            modules[module['name']] = module
+
+    newlines = [m.start() for m in re.finditer('\n', text)]
+    def line(offset):
+        return bisect.bisect_right(newlines, offset - 1) + 1
+    for module in modules.values():
+        module['line'] = line(module['offset'])
+        for parameter in module['parameters'].values():
+            parameter['line'] = line(parameter['offset'])
+        for instance in module['instances']:
+            instance['line'] = line(instance['offset'])
+    return modules
+
+def parse_verilog(filepath):
+    with open(filepath, 'r', encoding='latin-1') as ifile:
+        return parse_verilog_text(ifile.read())
+
+def read_verilog(filepath, usecache=True):
+    return index_cache.cached(filepath, 'verilogindex', index_version,
+		parse_verilog, usecache)
+
+# Return the module defining parameter "name" and the parameter record,
+# looking first in module "modname" if given.  Returns (None, None) if
+# the parameter is not found.
+
+def find_parameter(modules, name, modname=None):
+    order = ([modules[modname]] if modname in modules else []) + list(modules.values())
+    for module in order:
+        if name in module['parameters']:
+            return module, module['parameters'][name]
+    return None, None
+
+#----------------------------------------------------------------------
+# Connectivity helpers.
+#----------------------------------------------------------------------
+
+# Return the width of a range (msb, lsb), or 1 for None
+
+def range_width(wrange):
+    return 1 if wrange is None else abs(wrange[0] - wrange[1]) + 1
+
+# Return the bit names of a signal in the module, most significant bit
+# first, as "name[i]" for buses and "name" for single bits.
+
+def signal_bits(module, name):
+    info = module['portinfo'].get(name)
+    wrange = info['range'] if info else module['wires'].get(name)
+    if wrange is None:
+        return [name]
+    step = -1 if wrange[0] >= wrange[1] else 1
+    return [name + '[' + str(i) + ']' for i in range(wrange[0], wrange[1] + step, step)]
+
+# Expand a connection expression into a list of bit names, most
+# significant bit first.  Constants are returned as "1'b0" style bits.
+
+def expand_expression(module, expr):
+    expr = expr.strip()
+    if not expr:
+        return []
+    if expr.startswith('{') and expr.endswith('}'):
+        bits = []
+        depth = 0
+        part = ''
+        for char in expr[1:-1]:
+            if char == ',' and depth == 0:
+                bits.extend(expand_expression(module, part))
+                part = ''
+                continue
+            depth += char in '([{'
+            depth -= char in ')]}'
+            part += char
+        bits.extend(expand_expression(module, part))
+        return bits
+    match = re.match(r"^(\d+)'[bB]([01xXzZ_]+)$", expr)
+    if match:
+        digits = match.group(2).replace('_', '').zfill(int(match.group(1)))
+        return ["1'b" + d for d in digits[-int(match.group(1)):]]
+    match = re.match(r'^(\\?\S+?)\[(\d+):(\d+)\]$', expr)
+    if match:
+        msb, lsb = int(match.group(2)), int(match.group(3))
+        step = -1 if msb >= lsb else 1
+        return [match.group(1) + '[' + str(i) + ']' for i in range(msb, lsb + step, step)]
+    if re.match(r'^(\\?\S+?)\[(\d+)\]$', expr):
+        return [expr]
+    return signal_bits(module, expr)
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+
+    optionlist = []
+    arguments = []
+
+    for option in sys.argv[1:]:
+        if option.find('-', 0) == 0:
+            optionlist.append(option)
+        else:
+            arguments.append(option)
+
+    if len(arguments) != 1:
+        print('Wrong number of arguments given to verilog_index.py.')
+        usage()
+        sys.exit(1)
+
+    verilogfile = arguments[0]
+    usecache = True
+    modname = None
+    paramname = None
+    instname = None
+
+    for option in optionlist:
+        optionpair = option.split('=', 1)
+        key = optionpair[0]
+        value = optionpair[1] if len(optionpair) > 1 else None
+        if key == '-nocache':
+            usecache = False
+        elif key == '-module' and value:
+            modname = value
+        elif key == '-parameter' and value:
+            paramname = value
+        elif key == '-instance' and value:
+            instname = value
+        else:
+            print('Unknown option "' + option + '"')
+            usage()
+            sys.exit(1)
+
+    if not os.path.isfile(verilogfile):
+        print('Error:  No verilog file ' + verilogfile + '.')
+        sys.exit(1)
+
+    modules = read_verilog(verilogfile, usecache)
+    status = 0
+
+    if modname and modname not in modules:
+        print('Error:  No module ' + modname + ' in ' + verilogfile + '.')
+        sys.exit(1)
+
+    if paramname:
+        module, parameter = find_parameter(modules, paramname, modname)
+        if parameter is None:
+            print('Error:  No parameter ' + paramname + ' in ' + verilogfile + '.')
+            status = 1
+        else:
+            print(module['name'] + '.' + paramname + ' = ' + parameter['value'] +
+			'  (line ' + str(parameter['line']) + ', offset ' +
+			str(parameter['offset']) + ')')
+
+    if instname:
+        found = False
+        for module in modules.values():
+            if modname and module['name'] != modname:
+                continue
+            for instance in module['instances']:
+                if instance['name'] != instname:
+                    continue
+                found = True
+                print(module['name'] + '.' + instname + ':  ' + instance['cell'] +
+			'  (line ' + str(instance['line']) + ')')
+                for pin, expr in instance['connections'].items():
+                    print('    ' + str(pin) + ':  ' + expr)
+        if not found:
+            print('Error:  No instance ' + instname + ' in ' + verilogfile + '.')
+            status = 1
+
+    if not (paramname or instname):
+        for module in modules.values():
+            if modname and module['name'] != modname:
+                continue
+            print('module ' + module['name'] + '  (line ' + str(module['line']) + ')')
+            print('    ports:       ' + str(len(module['ports'])))
+            print('    wires:       ' + str(len(module['wires'])))
+            print('    instances:   ' + str(len(module['instances'])))
+            for name, parameter in module['parameters'].items():
+                print('    parameter ' + name + ' = ' + parameter['value'] +
+			'  (line ' + str(parameter['line']) + ')')
+
+    sys.exit(status)